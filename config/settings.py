@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from datetime import timedelta
+from importlib.util import find_spec
 import os
 from pathlib import Path
 
@@ -48,14 +49,12 @@ INSTALLED_APPS = [
     "rest_framework",
     "rest_framework.authtoken",
     "drf_spectacular",
-    "debug_toolbar",
     "train_station",
     "user",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -64,6 +63,12 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# The debug toolbar middleware is sync only and would make every request
+# under ASGI run in a thread, so the toolbar is only enabled for development
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(1, "debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -95,9 +100,83 @@ DATABASES = {
         "NAME": os.environ.get("POSTGRES_DB"),
         "USER": os.environ.get("POSTGRES_USER"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Connections are taken from a pool shared by the threads of each process
+# and go back to it at the end of every request, which also works under ASGI.
+# With DATABASE_POOL=0 every thread keeps its own connection open
+# for CONN_MAX_AGE seconds instead
+if bool(int(os.environ.get("DATABASE_POOL", 1))):
+    DATABASES["default"]["ENGINE"] = "train_station.pooled_postgresql"
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            # connections open at once per process and database, at least 1
+            "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", 10)),
+            # seconds a request waits for a connection before failing
+            "timeout": float(os.environ.get("DATABASE_POOL_TIMEOUT", 10)),
+            # seconds an unused connection is kept open
+            "max_idle": float(os.environ.get("DATABASE_POOL_MAX_IDLE", 300)),
+            # seconds a connection can stay unused without being checked
+            "check_after": float(
+                os.environ.get("DATABASE_POOL_CHECK_AFTER", 30)
+            ),
+        }
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(
+        os.environ.get("CONN_MAX_AGE", 60)
+    )
+
+# "POSTGRES_REPLICA_HOSTS" should be a single string of read replica hosts
+# with a space between each. Safe list and retrieve reads of the journey and
+# order endpoints are spread over them, everything else uses the primary.
+# Pointing it at POSTGRES_HOST makes the primary a stand-in replica locally
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(),
+    1,
+):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{number}")
+
+DATABASE_ROUTERS = ["train_station.replicas.ReplicaRouter"]
+
+# Time in seconds reads of a user stay on the primary after they write,
+# so a new order shows up in their order list before the replicas catch up.
+# The pins are kept in the cache, so REDIS_URL is needed with several processes
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Without REDIS_URL every process keeps its own LRU cache, so catalog
+# changes made by one process reach the others only after the timeout
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Time in seconds catalog responses (stations, routes, trains, train types
+# and crew members) stay cached unless invalidated by a change
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", 600))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -143,6 +222,30 @@ STATIC_URL = "static/"
 MEDIA_ROOT = "/vol/web/media/"
 MEDIA_URL = "/media/"
 
+# Media files are stored under the hash of their content, so identical
+# uploads are kept once and every file can be cached forever
+STORAGES = {
+    "default": {
+        "BACKEND": "train_station.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
+# Uploads are streamed to disk and hashed chunk by chunk as they arrive
+FILE_UPLOAD_HANDLERS = ["train_station.storage.HashingFileUploadHandler"]
+
+# Directory keeping the generated timetable export until the schedule changes
+TIMETABLE_EXPORT_ROOT = os.environ.get(
+    "TIMETABLE_EXPORT_ROOT",
+    "/vol/web/exports/",
+)
+
+# Threads per process resizing uploaded station and train images,
+# 0 resizes them during the upload request
+IMAGE_VARIANT_WORKERS = int(os.environ.get("IMAGE_VARIANT_WORKERS", 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -158,12 +261,47 @@ REST_FRAMEWORK = {
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/day",
         "user": "5000/day",
+        # platform displays polling the departures board of a station
+        "departures": "60/min",
+        # load balancer checks of the health endpoint
+        "health": "120/min",
     },
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# Fast orjson renderer and parser instead of the stdlib json ones and
+# MessagePack negotiated with "Accept: application/msgpack", each used
+# when its package is installed unless disabled with FAST_RENDERERS=0
+if bool(int(os.environ.get("FAST_RENDERERS", 1))):
+    if find_spec("orjson"):
+        REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"][0] = (
+            "train_station.renderers.ORJSONRenderer"
+        )
+        REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"][0] = (
+            "train_station.renderers.ORJSONParser"
+        )
+
+    if find_spec("msgpack"):
+        REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].insert(
+            1,
+            "train_station.renderers.MessagePackRenderer",
+        )
+        REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].insert(
+            1,
+            "train_station.renderers.MessagePackParser",
+        )
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Train Station API',
     'DESCRIPTION': 'API service for a train management system',
@@ -171,6 +309,32 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Longest time in minutes a client can hold seats before ordering them
+SEAT_HOLD_MAX_MINUTES = int(os.environ.get("SEAT_HOLD_MAX_MINUTES", 15))
+
+# Journey planner: minimal time for changing trains and the age in seconds
+# after which the in-memory connection index is rebuilt from the database
+PLANNER_MIN_TRANSFER_MINUTES = int(
+    os.environ.get("PLANNER_MIN_TRANSFER_MINUTES", 10)
+)
+PLANNER_INDEX_MAX_AGE = int(os.environ.get("PLANNER_INDEX_MAX_AGE", 300))
+
+# Age in seconds after which the in-memory station indexes (coordinates
+# and the autocomplete trie of names) are rebuilt from the database
+STATION_INDEX_MAX_AGE = int(os.environ.get("STATION_INDEX_MAX_AGE", 300))
+
+# Station departure boards: hours ahead of which journeys are kept and
+# the age in seconds after which the boards are rebuilt from the database,
+# picking up changes made by other processes
+DEPARTURE_BOARD_HORIZON_HOURS = int(
+    os.environ.get("DEPARTURE_BOARD_HORIZON_HOURS", 24)
+)
+DEPARTURE_BOARD_MAX_AGE = int(os.environ.get("DEPARTURE_BOARD_MAX_AGE", 60))
+
+# Fail requests exceeding the query budget of their viewset action
+# instead of only logging a warning, meant for tests and development
+QUERY_BUDGET_RAISE = bool(int(os.environ.get("QUERY_BUDGET_RAISE", 0)))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -8,8 +8,12 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from train_station.storage import serve_media
+from train_station.views import HealthView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("health/", HealthView.as_view(), name="health"),
     path(
         "api/train-station/",
         include("train_station.urls", namespace="train_station")
@@ -26,5 +30,11 @@ urlpatterns = [
         SpectacularRedocView.as_view(url_name="schema"),
         name="redoc",
     ),
-    path("__debug__/", include("debug_toolbar.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+] + static(
+    settings.MEDIA_URL,
+    document_root=settings.MEDIA_ROOT,
+    view=serve_media,
+)
+
+if settings.DEBUG:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
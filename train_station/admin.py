@@ -8,6 +8,9 @@ from .models import (
     Train,
     Journey,
     Order,
+    PeakPeriod,
+    SeatHold,
+    Tariff,
     Ticket,
 )
 
@@ -27,5 +30,8 @@ admin.site.register(Station)
 admin.site.register(Route)
 admin.site.register(TrainType)
 admin.site.register(Train)
+admin.site.register(Tariff)
+admin.site.register(PeakPeriod)
 admin.site.register(Journey)
 admin.site.register(Ticket)
+admin.site.register(SeatHold)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TrainStationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "train_station"
+
+    def ready(self):
+        from . import signals  # noqa: F401
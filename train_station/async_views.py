@@ -0,0 +1,118 @@
+from typing import AsyncIterator, Iterable
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework.response import Response
+
+
+async def iterate_in_thread(chunks: Iterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Async iterator over a sync one, each chunk is produced on the thread
+    of sync code. An ASGI server reads a sync streaming response whole
+    before sending it, an async one is sent chunk by chunk
+    """
+    iterator = iter(chunks)
+    end = object()
+    try:
+        while (chunk := await sync_to_async(next)(iterator, end)) is not end:
+            yield chunk
+    finally:
+        # a generator of a disconnected client cleans up after itself
+        if hasattr(iterator, "close"):
+            await sync_to_async(iterator.close)()
+
+
+class AsyncReadMixin:
+    """
+    Serves GET actions of a viewset from an async view when the viewset
+    defines an async counterpart named "a" + action, e.g. alist.
+    Data is fetched with the async ORM interface, so under ASGI the
+    event loop keeps serving other requests while one waits for the database.
+    Every other method is handled by the regular sync viewset
+    """
+
+    @classmethod
+    def as_async_view(cls, actions, **initkwargs):
+        sync_view = cls.as_view(dict(actions), **initkwargs)
+        async_sync_view = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            action = actions.get(request.method.lower())
+            if request.method != "GET" or not hasattr(cls, f"a{action}"):
+                return await async_sync_view(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = actions
+            for method, action in actions.items():
+                setattr(self, method, getattr(self, action))
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+
+            return await self.adispatch(request, *args, **kwargs)
+
+        # same as csrf_exempt, which wraps views in a sync function
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # authentication, permissions and throttling
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs,
+        )
+        return self.response
+
+    async def aget_queryset(self):
+        # get_queryset may build in-memory indexes from the database
+        return await sync_to_async(self.get_queryset)()
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(await self.aget_queryset())
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError):
+            raise Http404
+
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(await self.aget_queryset())
+
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(
+                queryset,
+                self.request,
+                view=self,
+            )
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(
+            [obj async for obj in queryset],
+            many=True,
+        )
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
@@ -0,0 +1,255 @@
+import heapq
+import re
+import time
+import unicodedata
+from collections import Counter
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import Count
+
+
+APOSTROPHES = re.compile(r"['’ʼ`]")
+SEPARATORS = re.compile(r"[\W_]+")
+
+# Ukrainian national transliteration, letters with a different spelling
+# at the start of a word are listed as (initial, elsewhere)
+NATIONAL = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e",
+    "є": ("ye", "ie"), "ж": "zh", "з": "z", "и": "y", "і": "i",
+    "ї": ("yi", "i"), "й": ("y", "i"), "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ь": "", "ю": ("yu", "iu"), "я": ("ya", "ia"),
+    "ё": "yo", "ъ": "", "ы": "y", "э": "e",
+}
+
+# older spellings still typed by many, such as Kiev for Киев
+COMMON = {
+    **NATIONAL,
+    "г": "g", "е": "e", "є": "ye", "и": "i", "ї": "yi", "й": "y",
+    "ю": "yu", "я": "ya",
+}
+
+
+def transliterate(text: str, table: dict) -> str:
+    """Latin spelling of a lowercase Cyrillic text"""
+    letters = []
+    initial = True
+    for char in text:
+        spelling = table.get(char, char)
+        if isinstance(spelling, tuple):
+            spelling = spelling[0 if initial else 1]
+        letters.append(spelling)
+        initial = not char.isalpha()
+
+    return "".join(letters)
+
+
+def fold(text: str) -> str:
+    """
+    Case- and accent-folded text with every run of separators
+    replaced by a single space
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return SEPARATORS.sub(" ", text).strip()
+
+
+def variants(text: str) -> set[str]:
+    """Folded spellings of the text, as written and transliterated"""
+    text = APOSTROPHES.sub("", unicodedata.normalize("NFC", text.casefold()))
+
+    return {
+        fold(text),
+        fold(transliterate(text, NATIONAL)),
+        fold(transliterate(text, COMMON)),
+    } - {""}
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.ids = set()
+
+
+class StationTrie:
+    """
+    In-memory prefix trie of station names for autocompletion.
+    Every spelling of a name and of each of its words from the second one
+    on is inserted, every node keeps the ids of the stations below it.
+    Matches are ranked by the number of journeys from and to the station.
+    Built lazily from the database, kept up to date by station and journey
+    changes committed by this process, dropped on route changes and
+    timetable imports and fully rebuilt once it gets older
+    than STATION_INDEX_MAX_AGE seconds
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._root = None
+            self._names = {}
+            self._keys = {}
+            self._journeys = Counter()
+            self._built_at = 0.0
+
+    @staticmethod
+    def _station_keys(name: str) -> set[str]:
+        keys = set()
+        for spelling in variants(name):
+            words = spelling.split(" ")
+            keys.update(" ".join(words[start:]) for start in range(len(words)))
+
+        return keys
+
+    def _insert(self, station_id: int, name: str) -> None:
+        keys = self._station_keys(name)
+        for key in keys:
+            node = self._root
+            node.ids.add(station_id)
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+                node.ids.add(station_id)
+
+        self._names[station_id] = name
+        self._keys[station_id] = keys
+
+    def _delete(self, station_id: int) -> None:
+        for key in self._keys.pop(station_id, ()):
+            # nodes shared with another key may be pruned already
+            path = [self._root]
+            for char in key:
+                node = path[-1].children.get(char)
+                if node is None:
+                    break
+                path.append(node)
+
+            for node in path:
+                node.ids.discard(station_id)
+            for depth in range(len(path) - 1, 0, -1):
+                if path[depth].ids:
+                    break
+                del path[depth - 1].children[key[depth - 1]]
+
+        self._names.pop(station_id, None)
+
+    def _build(self) -> None:
+        from .models import Route, Station
+
+        self._root = _Node()
+        self._names = {}
+        self._keys = {}
+        for station_id, name in Station.objects.values_list("id", "name"):
+            self._insert(station_id, name)
+
+        journeys = Counter()
+        for field in ("origin_id", "destination_id"):
+            for station_id, count in (
+                Route.objects.values(field)
+                .annotate(count=Count("journeys"))
+                .values_list(field, "count")
+            ):
+                journeys[station_id] += count
+
+        self._journeys = journeys
+        self._built_at = time.monotonic()
+
+    def _ensure_built(self) -> None:
+        if (
+            self._root is None
+            or time.monotonic() - self._built_at
+            > settings.STATION_INDEX_MAX_AGE
+        ):
+            self._build()
+
+    def search(self, query: str, limit: int) -> list[tuple[int, str, int]]:
+        """
+        (station id, name, journey count) of at most `limit` stations
+        with a name or a word of it starting with the query,
+        in any spelling, most journeys first
+        """
+        with self._lock:
+            self._ensure_built()
+
+            matches = set()
+            for spelling in variants(query):
+                node = self._root
+                for char in spelling:
+                    node = node.children.get(char)
+                    if node is None:
+                        break
+                else:
+                    matches |= node.ids
+
+            best = heapq.nsmallest(
+                limit,
+                matches,
+                key=lambda station_id: (
+                    -self._journeys[station_id],
+                    self._names[station_id],
+                    station_id,
+                ),
+            )
+            return [
+                (
+                    station_id,
+                    self._names[station_id],
+                    self._journeys[station_id],
+                )
+                for station_id in best
+            ]
+
+    def update_station(self, station_id: int, name: str) -> None:
+        with self._lock:
+            if self._root is None:
+                return
+
+            self._delete(station_id)
+            self._insert(station_id, name)
+
+    def remove_station(self, station_id: int) -> None:
+        with self._lock:
+            if self._root is None:
+                return
+
+            self._delete(station_id)
+            self._journeys.pop(station_id, None)
+
+    def route_ends(self, route_id: int) -> tuple[int, int] | None:
+        """
+        Origin and destination ids of the route, read only once the trie
+        is built, so a journey change looks them up before its route
+        may be deleted and counts them after the transaction commits
+        """
+        from .models import Route
+
+        if self._root is None:
+            return None
+
+        return (
+            Route.objects.filter(id=route_id)
+            .values_list("origin_id", "destination_id")
+            .first()
+        )
+
+    def count_journey(
+        self,
+        ends: tuple[int, int] | None,
+        change: int,
+    ) -> None:
+        """Adds `change` to the journey counts of the ends of a route"""
+        with self._lock:
+            if self._root is None or ends is None:
+                return
+
+            for station_id in ends:
+                self._journeys[station_id] += change
+
+
+station_trie = StationTrie()
@@ -0,0 +1,116 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+
+VERSION_KEY = "catalog:version:{}"
+
+
+def _version_key(model) -> str:
+    label = model if isinstance(model, str) else model._meta.label_lower
+    return VERSION_KEY.format(label)
+
+
+def get_versions(models) -> list[int]:
+    """
+    Current cache versions of the models, or of other shared data named
+    by a string, a version missing from the cache is started from
+    the current time so that entries stored under an evicted version
+    are never served again
+    """
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def bump_version(model) -> int:
+    """
+    Invalidates every cached response that depends on the model,
+    returns the new version
+    """
+    key = _version_key(model)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+
+class CatalogCacheMixin:
+    """
+    Caches list and retrieve responses of a viewset keyed on the
+    request path and query parameters. Entries are invalidated by
+    bumping the version of any of `cache_models` on save and delete
+    """
+
+    cache_models = ()
+
+    def get_cache_key(self, request) -> str:
+        query = sorted(request.query_params.lists())
+        digest = hashlib.sha256(
+            f"{request.get_host()}{request.path}?{query}".encode()
+        ).hexdigest()
+        versions = ".".join(map(str, get_versions(self.cache_models)))
+
+        return f"catalog:{self.basename}:{versions}:{digest}"
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    response.data,
+                    timeout=settings.CATALOG_CACHE_TIMEOUT,
+                )
+            return response
+
+        return Response(data)
+
+    async def _acached_response(self, handler, request, *args, **kwargs):
+        key = await sync_to_async(self.get_cache_key)(request)
+        data = await cache.aget(key)
+
+        if data is None:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(
+                    key,
+                    response.data,
+                    timeout=settings.CATALOG_CACHE_TIMEOUT,
+                )
+            return response
+
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self._acached_response(
+            super().alist,
+            request,
+            *args,
+            **kwargs,
+        )
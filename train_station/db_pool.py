@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections. Up to `max_size`
+    connections are opened on demand with the `connect` callable passed
+    to getconn(), callers wait up to `timeout` seconds for one to be
+    returned when all of them are in use. Connections idle for longer
+    than `check_after` seconds are checked before they are handed out,
+    the ones idle for longer than `max_idle` seconds are closed
+    """
+
+    def __init__(
+        self,
+        close,
+        check,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_idle: float = 300.0,
+        check_after: float = 30.0,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self._close = close
+        self._check = check
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.pid = os.getpid()
+
+        # (connection, time it was returned), the most recent on the right
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+
+        self.requests = 0
+        self.requests_waiting = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.connection_errors = 0
+        self.connections_lost = 0
+
+    def getconn(self, connect):
+        start = time.monotonic()
+        with self._condition:
+            self.requests += 1
+
+        while True:
+            connection, returned_at = self._reserve(start)
+
+            if connection is None:
+                return self._open(connect)
+
+            if time.monotonic() - returned_at < self.check_after:
+                return connection
+            if self._check(connection):
+                return connection
+
+            self._discard(connection)
+
+    def putconn(self, connection, discard: bool = False) -> None:
+        if os.getpid() != self.pid:
+            return
+        if discard:
+            self._discard(connection)
+            return
+
+        now = time.monotonic()
+        expired = []
+
+        with self._condition:
+            self._idle.append((connection, now))
+            while self._idle and now - self._idle[0][1] > self.max_idle:
+                expired.append(self._idle.popleft()[0])
+                self._size -= 1
+            self._condition.notify()
+
+        for connection in expired:
+            self._close(connection)
+
+    def close(self) -> None:
+        """Closes the idle connections"""
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self) -> dict:
+        with self._condition:
+            idle = len(self._idle)
+            in_use = self._size - idle
+
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "in_use": in_use,
+                "idle": idle,
+                "utilization": round(in_use / self.max_size, 3),
+                "requests": self.requests,
+                "requests_waiting": self.requests_waiting,
+                "wait_ms": round(self.wait_seconds * 1000, 1),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+                "timeouts": self.timeouts,
+                "connections_opened": self.connections_opened,
+                "connection_errors": self.connection_errors,
+                "connections_lost": self.connections_lost,
+            }
+
+    def _reserve(self, start: float):
+        """
+        Takes the most recently returned idle connection, or a slot
+        for a new connection which is returned as (None, None)
+        """
+        with self._condition:
+            while not self._idle and self._size >= self.max_size:
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available "
+                        f"in {self.timeout} seconds"
+                    )
+
+                self.requests_waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self.requests_waiting -= 1
+
+            waited = time.monotonic() - start
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+            if self._idle:
+                return self._idle.pop()
+
+            self._size += 1
+            return None, None
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self.connection_errors += 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self.connections_opened += 1
+        return connection
+
+    def _discard(self, connection) -> None:
+        with self._condition:
+            self._size -= 1
+            self.connections_lost += 1
+            self._condition.notify()
+
+        self._close(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory) -> ConnectionPool:
+    """
+    Pool stored under the key, created with factory() on first use
+    and again in processes forked after it was created
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = factory()
+        return pool
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
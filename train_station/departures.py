@@ -0,0 +1,275 @@
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import bump_version, get_versions
+from .seat_map import count_taken
+
+
+# shared version of the boards, bumped by every change made to them
+BOARD_VERSION = "departures"
+
+
+class Departure(NamedTuple):
+    journey_id: int
+    origin_id: int
+    destination_id: int
+    destination: str
+    train: str
+    departure_time: datetime
+    arrival_time: datetime
+    seats_available: int
+
+
+class DepartureBoard:
+    """
+    In-memory boards of the upcoming departures of every station,
+    sorted by departure time, with the seats left on each journey and
+    the seats held on it, so the tickets available are computed live
+    without querying journeys. Only journeys departing within
+    DEPARTURE_BOARD_HORIZON_HOURS are kept. Built lazily from the database,
+    kept up to date by journey, seat map and seat hold changes committed
+    by this process and fully rebuilt once it gets older than
+    DEPARTURE_BOARD_MAX_AGE seconds or the shared cache version of the
+    boards is bumped by a change made in another process
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._boards = None
+            self._stations = set()
+            self._departures = {}
+            self._holds = {}
+            self._built_at = 0.0
+            self._version = None
+
+    @staticmethod
+    def _horizon() -> tuple[datetime, datetime]:
+        now = timezone.now()
+        return now, now + timedelta(
+            hours=settings.DEPARTURE_BOARD_HORIZON_HOURS
+        )
+
+    @staticmethod
+    def _rows(journeys):
+        return journeys.values_list(
+            "id",
+            "route__origin_id",
+            "route__destination_id",
+            "route__destination__name",
+            "train__name",
+            "train__train_type__name",
+            "departure_time",
+            "arrival_time",
+            "seats_available",
+        )
+
+    @staticmethod
+    def _to_departure(
+        journey_id: int,
+        origin_id: int,
+        destination_id: int,
+        destination: str,
+        train_name: str,
+        train_type: str,
+        departure_time: datetime,
+        arrival_time: datetime,
+        seats_available: int,
+    ) -> Departure:
+        return Departure(
+            journey_id,
+            origin_id,
+            destination_id,
+            destination,
+            f"{train_name} ({train_type})",
+            departure_time,
+            arrival_time,
+            seats_available,
+        )
+
+    def _build(self) -> None:
+        from .models import Journey, SeatHold, Station
+
+        start, end = self._horizon()
+        journeys = Journey.objects.filter(
+            departure_time__gte=start,
+            departure_time__lt=end,
+        )
+
+        boards = {}
+        departures = {}
+        for row in self._rows(journeys).iterator():
+            departure = self._to_departure(*row)
+            departures[departure.journey_id] = departure
+            boards.setdefault(departure.origin_id, []).append(
+                (departure.departure_time.timestamp(), departure.journey_id)
+            )
+        for board in boards.values():
+            board.sort()
+
+        holds = {}
+        for hold_id, journey_id, expires_at, seat_map in (
+            SeatHold.objects.active()
+            .filter(journey__in=journeys)
+            .values_list("id", "journey_id", "expires_at", "seat_map")
+        ):
+            holds.setdefault(journey_id, {})[hold_id] = (
+                expires_at.timestamp(),
+                count_taken(seat_map),
+            )
+
+        self._stations = set(Station.objects.values_list("id", flat=True))
+        self._boards = boards
+        self._departures = departures
+        self._holds = holds
+        self._built_at = time.monotonic()
+
+    def _ensure_built(self, version: int) -> None:
+        if (
+            self._boards is None
+            or self._version != version
+            or time.monotonic() - self._built_at
+            > settings.DEPARTURE_BOARD_MAX_AGE
+        ):
+            self._build()
+            self._version = version
+
+    def _publish(self) -> None:
+        """
+        Bumps the shared version after a change was applied to the boards
+        of this process, which keep up with it unless another process
+        made a change in between, the others rebuild on their next read
+        """
+        version = bump_version(BOARD_VERSION)
+        with self._lock:
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def invalidate(self) -> None:
+        """Drops the boards of every process, rebuilt on their next read"""
+        self.reset()
+        bump_version(BOARD_VERSION)
+
+    def has_station(self, station_id: int) -> bool:
+        version = get_versions((BOARD_VERSION,))[0]
+        with self._lock:
+            self._ensure_built(version)
+            return station_id in self._stations
+
+    def departures(self, station_id: int, limit: int) -> list[dict]:
+        """
+        At most `limit` next departures from the station, each with
+        the tickets still available for sale on the journey
+        """
+        now = time.time()
+        version = get_versions((BOARD_VERSION,))[0]
+        with self._lock:
+            self._ensure_built(version)
+            board = self._boards.get(station_id, ())
+            start = bisect_left(board, (now,))
+
+            results = []
+            for _, journey_id in board[start:start + limit]:
+                departure = self._departures[journey_id]
+                held = sum(
+                    count
+                    for expires_at, count in self._holds.get(
+                        journey_id, {}
+                    ).values()
+                    if expires_at > now
+                )
+                results.append(
+                    {
+                        **departure._asdict(),
+                        "tickets_available": max(
+                            departure.seats_available - held,
+                            0,
+                        ),
+                    }
+                )
+
+            return results
+
+    def update_journey(self, journey_id: int) -> None:
+        """Reads the journey again and moves it to its place on the boards"""
+        from .models import Journey
+
+        if self._boards is not None:
+            start, end = self._horizon()
+            row = self._rows(
+                Journey.objects.filter(
+                    id=journey_id,
+                    departure_time__gte=start,
+                    departure_time__lt=end,
+                )
+            ).first()
+
+            with self._lock:
+                if self._boards is not None:
+                    self._remove(journey_id)
+                    if row is not None:
+                        departure = self._to_departure(*row)
+                        self._departures[journey_id] = departure
+                        insort(
+                            self._boards.setdefault(departure.origin_id, []),
+                            (departure.departure_time.timestamp(), journey_id),
+                        )
+
+        self._publish()
+
+    def remove_journey(self, journey_id: int) -> None:
+        with self._lock:
+            if self._boards is not None:
+                self._remove(journey_id)
+                self._holds.pop(journey_id, None)
+
+        self._publish()
+
+    def _remove(self, journey_id: int) -> None:
+        departure = self._departures.pop(journey_id, None)
+        if departure is None:
+            return
+
+        board = self._boards[departure.origin_id]
+        key = (departure.departure_time.timestamp(), journey_id)
+        index = bisect_left(board, key)
+        if index < len(board) and board[index] == key:
+            del board[index]
+
+    def update_seats(self, journey_id: int, seats_available: int) -> None:
+        with self._lock:
+            departure = self._departures.get(journey_id)
+            if departure is not None:
+                self._departures[journey_id] = departure._replace(
+                    seats_available=seats_available
+                )
+
+        self._publish()
+
+    def add_hold(self, hold) -> None:
+        with self._lock:
+            if hold.journey_id in self._departures:
+                self._holds.setdefault(hold.journey_id, {})[hold.id] = (
+                    hold.expires_at.timestamp(),
+                    count_taken(hold.seat_map),
+                )
+
+        self._publish()
+
+    def remove_hold(self, journey_id: int, hold_id: int) -> None:
+        with self._lock:
+            self._holds.get(journey_id, {}).pop(hold_id, None)
+
+        self._publish()
+
+
+departure_board = DepartureBoard()
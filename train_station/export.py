@@ -0,0 +1,173 @@
+import csv
+import hashlib
+import io
+import os
+import uuid
+import zipfile
+from contextlib import suppress
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Journey, Route, Station, Train, TrainType
+
+
+TIMETABLE_MODELS = (Station, Route, TrainType, Train, Journey)
+
+# rows written to the archive between two chunks sent to the client
+ROWS_PER_CHUNK = 1000
+
+
+class _ZipStream:
+    """
+    Write-only, unseekable file object for zipfile,
+    the written bytes are taken out with pop() as they are produced
+    """
+
+    def __init__(self) -> None:
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def timetable_version() -> str:
+    """
+    Changes whenever stations, routes, trains or journeys change.
+    Derived from the row count and the last update of every table,
+    so all processes give the same data the same version
+    """
+    state = [
+        model.objects.aggregate(count=Count("id"), last=Max("updated_at"))
+        for model in TIMETABLE_MODELS
+    ]
+    return hashlib.sha256(repr(state).encode()).hexdigest()[:16]
+
+
+def timetable_tables() -> Iterator[tuple[str, tuple, Iterable]]:
+    """(file name, header, rows) of every file of the timetable export"""
+    yield (
+        "stations.csv",
+        ("station_id", "station_name", "station_lat", "station_lon"),
+        Station.objects.order_by("id")
+        .values_list("id", "name", "latitude", "longitude")
+        .iterator(),
+    )
+    yield (
+        "routes.csv",
+        ("route_id", "origin_id", "destination_id", "distance"),
+        Route.objects.order_by("id")
+        .values_list("id", "origin_id", "destination_id", "distance")
+        .iterator(),
+    )
+    yield (
+        "trains.csv",
+        ("train_id", "train_name", "train_type", "cars", "seats_in_car"),
+        Train.objects.order_by("id")
+        .values_list("id", "name", "train_type__name", "cars", "seats_in_car")
+        .iterator(),
+    )
+    yield (
+        "journeys.csv",
+        (
+            "journey_id",
+            "route_id",
+            "train_id",
+            "departure_time",
+            "arrival_time",
+        ),
+        _journey_rows(),
+    )
+
+
+def _journey_rows() -> Iterator[tuple]:
+    rows = (
+        Journey.objects.order_by("departure_time", "id")
+        .values_list(
+            "id",
+            "route_id",
+            "train_id",
+            "departure_time",
+            "arrival_time",
+        )
+        .iterator(chunk_size=ROWS_PER_CHUNK)
+    )
+    for *ids, departure_time, arrival_time in rows:
+        yield (*ids, departure_time.isoformat(), arrival_time.isoformat())
+
+
+def stream_timetable() -> Iterator[bytes]:
+    """
+    Zip archive of the timetable CSV files, produced chunk by chunk
+    from database cursors so memory use does not depend on its size
+    """
+    stream = _ZipStream()
+
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, header, rows in timetable_tables():
+            with archive.open(name, "w", force_zip64=True) as entry:
+                text = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+                writer = csv.writer(text)
+                writer.writerow(header)
+
+                for count, row in enumerate(rows, 1):
+                    writer.writerow(row)
+                    if count % ROWS_PER_CHUNK == 0:
+                        text.flush()
+                        yield stream.pop()
+
+                text.flush()
+                text.detach()
+
+            yield stream.pop()
+
+    yield stream.pop()
+
+
+def export_path(version: str) -> str:
+    return os.path.join(
+        settings.TIMETABLE_EXPORT_ROOT,
+        f"timetable-{version}.zip",
+    )
+
+
+def stream_and_store(version: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Passes the chunks through while writing them to the export file
+    of the version, which is only put in place once it is complete.
+    Exports of earlier versions are removed afterwards
+    """
+    path = export_path(version)
+    os.makedirs(settings.TIMETABLE_EXPORT_ROOT, exist_ok=True)
+    partial_path = f"{path}.{uuid.uuid4().hex}.part"
+
+    try:
+        with open(partial_path, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+                yield chunk
+    except BaseException:
+        os.remove(partial_path)
+        raise
+
+    os.replace(partial_path, path)
+
+    for name in os.listdir(settings.TIMETABLE_EXPORT_ROOT):
+        other = os.path.join(settings.TIMETABLE_EXPORT_ROOT, name)
+        if (
+            other != path
+            and name.startswith("timetable-")
+            and name.endswith(".zip")
+        ):
+            with suppress(FileNotFoundError):
+                os.remove(other)
@@ -0,0 +1,150 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal, ROUND_HALF_UP
+from threading import Lock
+from typing import Optional
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .cache import get_versions
+
+
+CENT = Decimal("0.01")
+
+
+class Fares:
+    """
+    Tariff tables compiled for lookups without queries: for every
+    train type the sorted lower bounds of its distance bands with their
+    base price and price per kilometre, and the list of peak periods
+    """
+
+    def __init__(
+        self,
+        bands: dict[int, tuple[list[int], list[tuple[Decimal, Decimal]]]],
+        peaks: list[tuple[Optional[int], time, time, Decimal]],
+    ) -> None:
+        self._bands = bands
+        self._peaks = peaks
+
+    def multiplier(self, departure_time: datetime) -> Decimal:
+        """
+        Highest multiplier of the peak periods covering the departure,
+        naive departure times are taken as local
+        """
+        if timezone.is_aware(departure_time):
+            departure_time = timezone.localtime(departure_time)
+        weekday = departure_time.weekday()
+        moment = departure_time.time()
+
+        multiplier = Decimal(1)
+        for peak_weekday, start, end, peak_multiplier in self._peaks:
+            if peak_weekday is not None and peak_weekday != weekday:
+                continue
+
+            if start <= end:
+                covered = start <= moment < end
+            else:
+                covered = moment >= start or moment < end
+
+            if covered:
+                multiplier = max(multiplier, peak_multiplier)
+
+        return multiplier
+
+    def price(
+        self,
+        train_type_id: int,
+        distance: int,
+        departure_time: datetime,
+    ) -> Optional[Decimal]:
+        """
+        Fare of a ticket, None when no tariff of the train type
+        covers the distance
+        """
+        if train_type_id not in self._bands:
+            return None
+
+        distances, prices = self._bands[train_type_id]
+        index = bisect_right(distances, distance) - 1
+        if index < 0:
+            return None
+
+        base_price, price_per_km = prices[index]
+        price = (base_price + price_per_km * distance) * self.multiplier(
+            departure_time
+        )
+
+        return price.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def journey_price(self, journey) -> Optional[Decimal]:
+        """Fare of a ticket for the journey, its route and train are used"""
+        return self.price(
+            journey.train.train_type_id,
+            journey.route.distance,
+            journey.departure_time,
+        )
+
+
+class FareTable:
+    """
+    Compiled tariffs shared by the threads of a process. Built lazily
+    from the primary database, a lagging replica would keep old prices
+    under the new version, and rebuilt when the cache version of tariffs
+    or peak periods changes, so every process sees a change
+    on its next lookup
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._fares = None
+            self._versions = None
+
+    def _build(self) -> Fares:
+        from .models import PeakPeriod, Tariff
+
+        bands = defaultdict(lambda: ([], []))
+        for train_type_id, min_distance, base_price, price_per_km in (
+            Tariff.objects.using(DEFAULT_DB_ALIAS)
+            .order_by("train_type_id", "min_distance")
+            .values_list(
+                "train_type_id",
+                "min_distance",
+                "base_price",
+                "price_per_km",
+            )
+        ):
+            distances, prices = bands[train_type_id]
+            distances.append(min_distance)
+            prices.append((base_price, price_per_km))
+
+        peaks = list(
+            PeakPeriod.objects.using(DEFAULT_DB_ALIAS).values_list(
+                "weekday",
+                "start_time",
+                "end_time",
+                "multiplier",
+            )
+        )
+
+        return Fares(dict(bands), peaks)
+
+    def get(self) -> Fares:
+        from .models import PeakPeriod, Tariff
+
+        versions = get_versions((Tariff, PeakPeriod))
+        with self._lock:
+            if self._fares is None or self._versions != versions:
+                self._fares = self._build()
+                self._versions = versions
+
+            return self._fares
+
+
+fare_table = FareTable()
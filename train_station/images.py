@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connections, transaction
+from PIL import Image, ImageOps
+
+from .cache import bump_version
+
+
+logger = logging.getLogger(__name__)
+
+# longest side in pixels of every variant, images are never upscaled
+VARIANTS = {"full": 1920, "card": 640, "thumbnail": 160}
+
+# format name, file extension and Pillow save options
+FORMATS = (
+    ("webp", "webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    (
+        "jpeg",
+        "jpg",
+        {
+            "format": "JPEG",
+            "quality": 82,
+            "optimize": True,
+            "progressive": True,
+        },
+    ),
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_path(name: str, variant: str, extension: str) -> str:
+    """
+    uploads/trains/a.png -> uploads/trains/variants/a-card.webp, the
+    content-addressed storage keeps only the directory and the extension
+    """
+    directory, filename = os.path.split(name)
+    stem, _ = os.path.splitext(filename)
+
+    return os.path.join(directory, "variants", f"{stem}-{variant}.{extension}")
+
+
+def render_variants(file) -> dict[str, tuple[int, int, dict[str, bytes]]]:
+    """
+    Encodes every variant of the image in every format, as
+    {variant: (width, height, {format: bytes})}. Each variant is scaled
+    down from the previous larger one instead of from the original
+    """
+    with Image.open(file) as image:
+        # JPEGs are decoded at a reduced scale when they are large enough
+        image.draft("RGB", (VARIANTS["full"], VARIANTS["full"]))
+        image = ImageOps.exif_transpose(image)
+
+    if image.mode not in ("RGB", "RGBA"):
+        transparent = (
+            "A" in image.getbands() or "transparency" in image.info
+        )
+        image = image.convert("RGBA" if transparent else "RGB")
+
+    variants = {}
+    for variant, size in VARIANTS.items():
+        image.thumbnail((size, size), Image.LANCZOS)
+
+        flat = image
+        if image.mode == "RGBA":
+            flat = Image.new("RGB", image.size, "white")
+            flat.paste(image, mask=image.getchannel("A"))
+
+        encoded = {}
+        for format_name, _, options in FORMATS:
+            buffer = BytesIO()
+            (image if format_name == "webp" else flat).save(buffer, **options)
+            encoded[format_name] = buffer.getvalue()
+
+        variants[variant] = (image.width, image.height, encoded)
+
+    return variants
+
+
+def generate_variants(model, pk: int, name: str) -> dict:
+    """
+    Stores the variants of the image of the object and saves their
+    names to its `image_variants`, unless the image was replaced meanwhile
+    """
+    storage = model._meta.get_field("image").storage
+
+    with storage.open(name, "rb") as file:
+        rendered = render_variants(file)
+
+    image_variants = {}
+    for variant, (width, height, encoded) in rendered.items():
+        image_variants[variant] = {"width": width, "height": height}
+        for format_name, extension, _ in FORMATS:
+            image_variants[variant][format_name] = storage.save(
+                variant_path(name, variant, extension),
+                ContentFile(encoded[format_name]),
+            )
+
+    if model.objects.filter(pk=pk, image=name).update(
+        image_variants=image_variants
+    ):
+        bump_version(model)
+
+    return image_variants
+
+
+def _generate_logged(model, pk: int, name: str) -> None:
+    # the upload is already committed, a failure only leaves it without
+    # variants until generate_image_variants is run
+    try:
+        generate_variants(model, pk, name)
+    except Exception:
+        logger.exception("Image variants of %s %s failed", model.__name__, pk)
+
+
+def _generate_in_worker(model, pk: int, name: str) -> None:
+    close_old_connections()
+    try:
+        _generate_logged(model, pk, name)
+    finally:
+        connections.close_all()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                thread_name_prefix="image-variants",
+            )
+        return _executor
+
+
+def schedule_variants(instance) -> None:
+    """
+    Generates the variants of the image of the instance in the worker
+    pool once the current transaction commits, or in the calling thread
+    when IMAGE_VARIANT_WORKERS is 0
+    """
+    model, pk, name = type(instance), instance.pk, instance.image.name
+
+    def submit() -> None:
+        if settings.IMAGE_VARIANT_WORKERS:
+            _get_executor().submit(_generate_in_worker, model, pk, name)
+        else:
+            _generate_logged(model, pk, name)
+
+    transaction.on_commit(submit)
+
+
+def variant_urls(image_variants: dict, storage, request=None) -> dict:
+    """Replaces the stored file names of the variants with their URLs"""
+    urls = {}
+    for variant, files in image_variants.items():
+        urls[variant] = {"width": files["width"], "height": files["height"]}
+        for format_name, _, _ in FORMATS:
+            url = storage.url(files[format_name])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant][format_name] = url
+
+    return urls
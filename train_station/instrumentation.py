@@ -0,0 +1,94 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries and their total time"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class QueryBudgetMixin:
+    """
+    Records the number and time of SQL queries made while handling
+    a viewset action and reports them in the Server-Timing header.
+    Actions listed in `query_budgets` that exceed their budget are logged,
+    or fail with QueryBudgetExceeded when QUERY_BUDGET_RAISE is set
+    """
+
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        recorder = QueryRecorder()
+
+        with ExitStack() as stack:
+            self._record_queries(stack, recorder)
+            response = super().dispatch(request, *args, **kwargs)
+
+        self.report_queries(recorder, response)
+        return response
+
+    async def adispatch(self, request, *args, **kwargs):
+        # connections are thread local, the wrappers are installed
+        # on the thread running the async ORM queries of this request
+        recorder = QueryRecorder()
+        stack = ExitStack()
+
+        await sync_to_async(self._record_queries)(stack, recorder)
+        try:
+            response = await super().adispatch(request, *args, **kwargs)
+        finally:
+            await sync_to_async(stack.close)()
+
+        self.report_queries(recorder, response)
+        return response
+
+    @staticmethod
+    def _record_queries(stack: ExitStack, recorder: QueryRecorder) -> None:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+    def report_queries(self, recorder, response) -> None:
+        action = getattr(self, "action", None)
+        duration = recorder.duration * 1000
+        message = (
+            f"{self.__class__.__name__}.{action}: "
+            f"{recorder.count} queries in {duration:.1f} ms"
+        )
+
+        response["Server-Timing"] = (
+            f'db;dur={duration:.1f};desc="{recorder.count} queries"'
+        )
+
+        budget = self.query_budgets.get(action)
+        if budget is None or recorder.count <= budget:
+            logger.debug(message)
+            return
+
+        message = f"{message}, budget is {budget}"
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+
+        logger.warning(message)
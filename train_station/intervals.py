@@ -0,0 +1,62 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Iterable, NamedTuple
+
+
+class Interval(NamedTuple):
+    start: datetime
+    end: datetime
+    key: int
+
+
+class IntervalIndex:
+    """
+    Sorted half-open [start, end) intervals of one resource,
+    e.g. the journeys of a train or of a crew member.
+    A lookup bisects on start times and only looks back as far as
+    the longest interval, so it stays O(log n + k) for timetables
+    where a journey is much shorter than the whole indexed period
+    """
+
+    def __init__(self, intervals: Iterable[Interval] = ()) -> None:
+        self._intervals = sorted(intervals)
+        self._longest = max(
+            (interval.end - interval.start for interval in self._intervals),
+            default=timedelta(0),
+        )
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def add(self, interval: Interval) -> None:
+        insort(self._intervals, interval)
+        self._longest = max(self._longest, interval.end - interval.start)
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Interval]:
+        """Intervals sharing any moment with [start, end)"""
+        first = bisect_left(self._intervals, (start - self._longest,))
+        last = bisect_left(self._intervals, (end,))
+
+        return [
+            interval
+            for interval in self._intervals[first:last]
+            if interval.end > start
+        ]
+
+
+def find_overlaps(
+    intervals: Iterable[Interval],
+) -> list[tuple[Interval, Interval]]:
+    """
+    Pairs of overlapping intervals found with a single sweep
+    over the intervals sorted by start, earlier interval first
+    """
+    overlaps = []
+    active = []
+
+    for interval in sorted(intervals):
+        active = [other for other in active if other.end > interval.start]
+        overlaps.extend((other, interval) for other in active)
+        active.append(interval)
+
+    return overlaps
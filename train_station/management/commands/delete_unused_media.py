@@ -0,0 +1,88 @@
+import os
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+
+from train_station.images import FORMATS
+from train_station.models import Station, Train
+
+
+class Command(BaseCommand):
+    """Django command to delete uploaded files no station or train uses"""
+    help = (
+        "Deletes images and image variants under uploads/ that are "
+        "not referenced by any station or train"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help=(
+                "Seconds since a file was last modified before it can be "
+                "deleted, so uploads in progress are kept"
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the unused files without deleting them",
+        )
+
+    def handle(self, *args, **options):
+        referenced = self.referenced_files()
+        cutoff = time.time() - options["min_age"]
+
+        deleted = 0
+        freed = 0
+        for name in self.stored_files("uploads"):
+            if name in referenced:
+                continue
+            if default_storage.get_modified_time(name).timestamp() > cutoff:
+                continue
+
+            size = default_storage.size(name)
+            if options["dry_run"]:
+                self.stdout.write(name)
+            else:
+                default_storage.delete(name)
+            deleted += 1
+            freed += size
+
+        verb = "Found" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {deleted} unused files, {freed} bytes"
+            )
+        )
+
+    @staticmethod
+    def referenced_files() -> set[str]:
+        referenced = set()
+
+        for model in (Station, Train):
+            for image, image_variants in (
+                model.objects.exclude(image="")
+                .exclude(image=None)
+                .values_list("image", "image_variants")
+                .iterator()
+            ):
+                referenced.add(image)
+                for files in image_variants.values():
+                    referenced.update(
+                        files[format_name] for format_name, _, _ in FORMATS
+                    )
+
+        return referenced
+
+    def stored_files(self, directory):
+        if not default_storage.exists(directory):
+            return
+
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name).replace("\\", "/")
+        for name in directories:
+            yield from self.stored_files(os.path.join(directory, name))
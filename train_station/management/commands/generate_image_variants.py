@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+
+from train_station.images import generate_variants
+from train_station.models import Station, Train
+
+
+class Command(BaseCommand):
+    """Django command to generate missing station and train image variants"""
+    help = (
+        "Generates resized variants of station and train images "
+        "uploaded before they were generated on upload"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Regenerate the variants of every image",
+        )
+
+    def handle(self, *args, **options):
+        generated = 0
+
+        for model in (Station, Train):
+            queryset = model.objects.exclude(image="").exclude(image=None)
+            if not options["all"]:
+                queryset = queryset.filter(image_variants={})
+
+            for pk, name in queryset.values_list("pk", "image").iterator():
+                generate_variants(model, pk, name)
+                generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated variants of {generated} images")
+        )
@@ -0,0 +1,64 @@
+import argparse
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from train_station.timetable import TIMETABLE_FIELDS, TimetableImporter
+
+
+class Command(BaseCommand):
+    """Django command to bulk import journeys from a CSV timetable"""
+    help = (
+        "Imports journeys from a CSV file with the columns "
+        f"{', '.join(TIMETABLE_FIELDS)}. Invalid rows are reported and skipped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "file",
+            type=argparse.FileType("r", encoding="utf-8"),
+            help="Path to the timetable, - to read it from stdin",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows validated and inserted at once",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate the timetable without saving any journeys",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be positive")
+
+        importer = TimetableImporter(
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+            progress=self.report_progress if options["verbosity"] else None,
+            on_error=self.report_error,
+        )
+
+        file = options["file"]
+        try:
+            result = importer.run(file)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        verb = "Validated" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {result.imported} journeys, "
+                f"skipped {result.skipped} invalid rows"
+            )
+        )
+
+    def report_error(self, error):
+        self.stderr.write(f"Line {error.line}: {error.message}")
+
+    def report_progress(self, imported, skipped):
+        self.stdout.write(f"{imported} journeys imported, {skipped} skipped")
@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from train_station.cache import bump_version
+from train_station.models import Route
+
+
+class Command(BaseCommand):
+    """Django command to recompute stored distances of all routes"""
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of routes updated per query",
+        )
+
+    def handle(self, *args, **options):
+        updated = Route.recompute_distances(
+            Route.objects.all(),
+            batch_size=options["batch_size"],
+        )
+        bump_version(Route)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Recomputed distances of {updated} routes")
+        )
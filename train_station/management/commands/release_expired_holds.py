@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from train_station.models import SeatHold
+
+
+class Command(BaseCommand):
+    """Django command to delete seat holds that have expired"""
+    def handle(self, *args, **kwargs):
+        deleted, _ = SeatHold.objects.expired().delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {deleted} expired seat holds")
+        )
@@ -1,20 +1,51 @@
+import random
 import time
 from django.db import connection
 from django.db.utils import OperationalError
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution until the database is available"""
-    def handle(self, *args, **kwargs):
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait before giving up",
+        )
+        parser.add_argument(
+            "--max-delay",
+            type=float,
+            default=5,
+            help="Longest pause in seconds between two attempts",
+        )
+
+    def handle(self, *args, **options):
         self.stdout.write("Waiting for database...")
 
+        deadline = time.monotonic() + options["timeout"]
+        delay = 0.1
+
         while True:
             try:
                 connection.ensure_connection()
             except OperationalError:
-                self.stdout.write("Database unavailable, waiting 1 second...")
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {options['timeout']} "
+                        "seconds"
+                    )
+
+                # full jitter keeps restarted containers from retrying at once
+                pause = min(random.uniform(0, delay), remaining)
+                self.stdout.write(
+                    f"Database unavailable, waiting {pause:.2f} seconds..."
+                )
+                time.sleep(pause)
+                delay = min(delay * 2, options["max_delay"])
             else:
                 break
 
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.5 on 2026-10-17 05:45
+
+from django.db import migrations, models
+
+
+def fill_seat_maps(apps, schema_editor):
+    Journey = apps.get_model("train_station", "Journey")
+
+    for journey in Journey.objects.select_related("train").iterator():
+        cars, seats_in_car = journey.train.cars, journey.train.seats_in_car
+        bits = bytearray((cars * seats_in_car + 7) // 8)
+        for car, seat in journey.tickets.values_list("car", "seat"):
+            if 1 <= car <= cars and 1 <= seat <= seats_in_car:
+                position = (car - 1) * seats_in_car + (seat - 1)
+                bits[position // 8] |= 1 << position % 8
+        journey.seat_map = bytes(bits)
+        journey.save(update_fields=["seat_map"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journey',
+            name='seat_map',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(fill_seat_maps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.5 on 2026-10-17 05:49
+
+from django.db import migrations, models
+
+
+def fill_seats_available(apps, schema_editor):
+    Journey = apps.get_model("train_station", "Journey")
+
+    for journey in Journey.objects.select_related("train").iterator():
+        journey.seats_available = (
+            journey.train.cars * journey.train.seats_in_car
+            - int.from_bytes(journey.seat_map, "little").bit_count()
+        )
+        journey.save(update_fields=["seats_available"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0003_seathold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journey',
+            name='seats_available',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_seats_available, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(condition=models.Q(('seats_available__gt', 0)), fields=['departure_time'], name='journey_with_seats_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-17 05:53
+
+from math import asin, cos, radians, sin, sqrt
+
+from django.db import migrations, models
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distance in whole km, frozen copy of train_station.models.haversine"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = (
+        sin((lat2 - lat1) / 2) ** 2
+        + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    )
+    return int(2 * asin(sqrt(a)) * 6371)
+
+
+def fill_route_distances(apps, schema_editor):
+    Route = apps.get_model("train_station", "Route")
+
+    for route in Route.objects.select_related("origin", "destination"):
+        route.distance = haversine(
+            route.origin.latitude,
+            route.origin.longitude,
+            route.destination.latitude,
+            route.destination.longitude,
+        )
+        route.save(update_fields=["distance"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0004_journey_seats_available'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='distance',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(fill_route_distances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0005_route_distance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['route', 'departure_time'], name='journey_route_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['train', 'departure_time'], name='journey_train_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['departure_time', 'id'], name='journey_departure_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(models.F('user'), models.OrderBy(models.F('created_at'), descending=True), name='order_user_created_idx'),
+        ),
+    ]
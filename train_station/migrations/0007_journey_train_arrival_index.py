@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-17 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0006_journey_order_range_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['train', 'arrival_time'], name='journey_train_arrival_idx'),
+        ),
+    ]
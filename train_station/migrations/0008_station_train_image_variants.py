@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-17 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0007_journey_train_arrival_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='train',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.5 on 2026-10-17 06:45
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0008_station_train_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeakPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], null=True)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('multiplier', models.DecimalField(decimal_places=2, max_digits=4)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.CreateModel(
+            name='Tariff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_distance', models.PositiveIntegerField(default=0)),
+                ('base_price', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('price_per_km', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=6)),
+                ('train_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tariffs', to='train_station.traintype')),
+            ],
+            options={
+                'ordering': ['train_type', 'min_distance'],
+                'unique_together': {('train_type', 'min_distance')},
+            },
+        ),
+    ]
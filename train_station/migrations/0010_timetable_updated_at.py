@@ -0,0 +1,38 @@
+# Generated by Django 4.2.5 on 2026-10-17 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0009_tariffs_ticket_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journey',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='train',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='traintype',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
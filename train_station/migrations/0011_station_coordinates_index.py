@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-17 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_station', '0010_timetable_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['latitude', 'longitude'], name='station_coordinates_idx'),
+        ),
+    ]
@@ -1,21 +1,41 @@
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta
 import os
 import uuid
 from django.utils import timezone
-from typing import Type
+from typing import Iterable, Sequence, Type
 from decimal import Decimal
+from functools import partial
 from math import radians, sin, cos, asin, sqrt
 
 from django.core.exceptions import ValidationError
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models.lookups import Exact
 from django.utils.text import slugify
 
+from .departures import departure_board
+from .fares import fare_table
+from .seat_map import SeatMap, count_taken
+
 
 class CrewMember(models.Model):
     first_name = models.CharField(max_length=255)
     last_name = models.CharField(max_length=255)
 
+    @classmethod
+    def lock(cls, crew_ids: Iterable[int]) -> None:
+        """
+        Locks the rows of the crew members until the transaction ends,
+        in id order so concurrent lockers never deadlock
+        """
+        list(
+            cls.objects.select_for_update()
+            .filter(id__in=crew_ids)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name}"
 
@@ -42,6 +62,17 @@ class Station(models.Model):
     latitude = models.DecimalField(max_digits=7, decimal_places=4)
     longitude = models.DecimalField(max_digits=7, decimal_places=4)
     image = models.ImageField(null=True, upload_to=station_image_file_path)
+    # resized copies of the image, see train_station.images
+    image_variants = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["latitude", "longitude"],
+                name="station_coordinates_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -69,6 +100,40 @@ def haversine(
     return int(c * earth_radius)
 
 
+def haversine_many(
+    lat1: Sequence[Decimal],
+    lon1: Sequence[Decimal],
+    lat2: Sequence[Decimal],
+    lon2: Sequence[Decimal],
+) -> list[int]:
+    """
+    Column-wise haversine over equally long sequences of coordinates,
+    returns the distance for every i-th pair of points
+    """
+    earth_radius = 6371  # radius of the Earth in km
+
+    lat1, lon1, lat2, lon2 = (
+        [radians(value) for value in column]
+        for column in (lat1, lon1, lat2, lon2)
+    )
+    cos_lat1 = [cos(value) for value in lat1]
+    cos_lat2 = [cos(value) for value in lat2]
+
+    return [
+        int(
+            2
+            * asin(sqrt(sin(dlat / 2) ** 2 + cl1 * cl2 * sin(dlon / 2) ** 2))
+            * earth_radius
+        )
+        for dlat, dlon, cl1, cl2 in zip(
+            (b - a for a, b in zip(lat1, lat2)),
+            (b - a for a, b in zip(lon1, lon2)),
+            cos_lat1,
+            cos_lat2,
+        )
+    ]
+
+
 class Route(models.Model):
     origin = models.ForeignKey(
         Station,
@@ -81,15 +146,12 @@ class Route(models.Model):
         related_name="inbound_routes",
     )
 
-    @property
-    def distance(self) -> int:
-        distance = haversine(
-            self.origin.latitude,
-            self.origin.longitude,
-            self.destination.latitude,
-            self.destination.longitude,
-        )
-        return distance
+    distance = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"{self.origin} - {self.destination}"
@@ -118,14 +180,58 @@ class Route(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        self.distance = haversine(
+            self.origin.latitude,
+            self.origin.longitude,
+            self.destination.latitude,
+            self.destination.longitude,
+        )
         super(Route, self).save(*args, **kwargs)
 
+    @classmethod
+    def recompute_distances(cls, queryset, batch_size: int = 1000) -> int:
+        """
+        Recomputes distances of the routes in batches, reading only
+        coordinates of their stations, returns the number of routes updated
+        """
+        rows = queryset.values_list(
+            "id",
+            "origin__latitude",
+            "origin__longitude",
+            "destination__latitude",
+            "destination__longitude",
+        ).order_by("id")
+
+        updated = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                updated += cls._update_distances(batch)
+                batch = []
+
+        if batch:
+            updated += cls._update_distances(batch)
+
+        return updated
+
+    @classmethod
+    def _update_distances(cls, rows) -> int:
+        ids, *coordinates = zip(*rows)
+        now = timezone.now()
+        routes = [
+            cls(id=route_id, distance=distance, updated_at=now)
+            for route_id, distance in zip(ids, haversine_many(*coordinates))
+        ]
+        return cls.objects.bulk_update(routes, ["distance", "updated_at"])
+
     class Meta:
         unique_together = ("origin", "destination")
 
 
 class TrainType(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.name
@@ -147,6 +253,9 @@ class Train(models.Model):
         related_name="trains",
     )
     image = models.ImageField(null=True, upload_to=train_image_file_path)
+    # resized copies of the image, see train_station.images
+    image_variants = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def capacity(self) -> int:
@@ -156,6 +265,107 @@ class Train(models.Model):
         return f"{self.name} ({self.train_type})"
 
 
+class Tariff(models.Model):
+    """
+    Ticket price on trains of the type for routes at least `min_distance`
+    kilometres long, up to the next band of the same train type
+    """
+
+    train_type = models.ForeignKey(
+        TrainType,
+        on_delete=models.CASCADE,
+        related_name="tariffs",
+    )
+    min_distance = models.PositiveIntegerField(default=0)
+    base_price = models.DecimalField(max_digits=8, decimal_places=2)
+    price_per_km = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        default=Decimal("0"),
+    )
+
+    def __str__(self) -> str:
+        return f"{self.train_type} from {self.min_distance} km"
+
+    class Meta:
+        unique_together = ("train_type", "min_distance")
+        ordering = ["train_type", "min_distance"]
+
+
+class PeakPeriod(models.Model):
+    """
+    Multiplier of the fares of journeys departing between the local times,
+    on the weekday or every day. Periods ending before they start
+    run past midnight, overlapping periods use the highest multiplier
+    """
+
+    WEEKDAYS = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+
+    name = models.CharField(max_length=255)
+    weekday = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        choices=WEEKDAYS,
+    )
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    multiplier = models.DecimalField(max_digits=4, decimal_places=2)
+
+    def __str__(self) -> str:
+        return f"{self.name} (x{self.multiplier})"
+
+    @staticmethod
+    def validate_multiplier(
+        multiplier: Decimal,
+        error_to_raise: Type[Exception],
+    ) -> None:
+        if multiplier <= 0:
+            raise error_to_raise(
+                {"multiplier": "multiplier must be greater than 0"}
+            )
+
+    def clean(self):
+        PeakPeriod.validate_multiplier(self.multiplier, ValidationError)
+
+    def save(self, *args, **kwargs):
+        self.full_clean()
+        super(PeakPeriod, self).save(*args, **kwargs)
+
+
+class JourneyQuerySet(models.QuerySet):
+    def with_all_crew(self, crew_ids: Iterable[int]):
+        """
+        Journeys with every one of the crew members, matched by a single
+        grouped subquery over the through table, so the cost does not
+        grow with the number of ids and no distinct() is needed
+        """
+        crew_ids = set(crew_ids)
+        through = Journey.crew.through
+        matching = (
+            through.objects.filter(crewmember_id__in=crew_ids)
+            .values("journey_id")
+            .annotate(matched=models.Count("crewmember_id"))
+            .filter(matched=len(crew_ids))
+            .values("journey_id")
+        )
+        return self.filter(id__in=matching)
+
+    def with_any_crew(self, crew_ids: Iterable[int]):
+        """Journeys with at least one of the crew members"""
+        matching = Journey.crew.through.objects.filter(
+            crewmember_id__in=set(crew_ids)
+        ).values("journey_id")
+        return self.filter(id__in=matching)
+
+
 class Journey(models.Model):
     route = models.ForeignKey(
         Route,
@@ -170,14 +380,173 @@ class Journey(models.Model):
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
     crew = models.ManyToManyField(CrewMember)
+    seat_map = models.BinaryField(default=bytes, editable=False)
+    seats_available = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = JourneyQuerySet.as_manager()
 
     def __str__(self) -> str:
         return (
             f"{self.route} ({self.departure_time.strftime('%d %b %Y %H:%M')})"
         )
 
+    def get_seat_map(self) -> SeatMap:
+        return SeatMap(self.train.cars, self.train.seats_in_car, self.seat_map)
+
+    def get_occupied_seat_map(self) -> SeatMap:
+        """Seat map with the seats of active holds marked as taken too"""
+        seat_map = self.get_seat_map()
+
+        holds = getattr(self, "active_holds", None)
+        if holds is None:
+            holds = self.holds.active()
+
+        for hold in holds:
+            seat_map.merge(hold.seat_map)
+
+        return seat_map
+
+    @property
+    def tickets_available(self) -> int:
+        holds = getattr(self, "active_holds", None)
+        if holds is None:
+            holds = self.holds.active()
+
+        held = sum(count_taken(hold.seat_map) for hold in holds)
+        return max(self.seats_available - held, 0)
+
+    def _write_seat_map(self, seat_map: SeatMap) -> None:
+        self.seat_map = bytes(seat_map)
+        self.seats_available = (
+            seat_map.cars * seat_map.seats_in_car - seat_map.taken_count
+        )
+        Journey.objects.filter(id=self.id).update(
+            seat_map=self.seat_map,
+            seats_available=self.seats_available,
+        )
+        transaction.on_commit(
+            partial(
+                departure_board.update_seats,
+                self.id,
+                self.seats_available,
+            )
+        )
+
+    @classmethod
+    def update_seat_map(
+        cls,
+        journey_id: int,
+        taken: Iterable[tuple[int, int]] = (),
+        released: Iterable[tuple[int, int]] = (),
+    ) -> None:
+        """
+        Marks seats of a journey as taken or released
+        while holding a lock on the journey row
+        """
+        with transaction.atomic():
+            journey = (
+                cls.objects.select_for_update(of=("self",))
+                .select_related("train")
+                .filter(id=journey_id)
+                .first()
+            )
+            if journey is None:
+                return
+
+            seat_map = journey.get_seat_map()
+            seat_map.release_all(released)
+            seat_map.take_all(taken)
+            journey._write_seat_map(seat_map)
+
+    @classmethod
+    def book_seats(
+        cls,
+        seats: dict[int, list[tuple[int, int]]],
+        error_to_raise: Type[Exception],
+        hold: "SeatHold" = None,
+    ) -> None:
+        """
+        Marks seats of several journeys as taken at once, raising an error
+        if any of them is already taken or held by somebody else.
+        Must be called inside a transaction,
+        journey rows stay locked until it ends
+        """
+        journeys = (
+            cls.objects.select_for_update(of=("self",))
+            .select_related("train")
+            .filter(id__in=seats)
+            .order_by("id")
+        )
+        holds = SeatHold.objects.active().filter(journey_id__in=seats)
+        if hold is not None:
+            holds = holds.exclude(id=hold.id)
+
+        held_seats = defaultdict(list)
+        for other_hold in holds:
+            held_seats[other_hold.journey_id].append(other_hold.seat_map)
+
+        for journey in journeys:
+            seat_map = journey.get_seat_map()
+            occupied = journey.get_seat_map()
+            for data in held_seats[journey.id]:
+                occupied.merge(data)
+
+            for car, seat in seats[journey.id]:
+                if occupied.is_taken(car, seat):
+                    raise error_to_raise(
+                        {
+                            "seat": f"seat {seat} in car {car} "
+                            f"is already taken"
+                        }
+                    )
+                seat_map.take(car, seat)
+                occupied.take(car, seat)
+            journey._write_seat_map(seat_map)
+
+    def rebuild_seat_map(self) -> None:
+        """Recomputes the seat map from the tickets of the journey"""
+        seat_map = SeatMap(self.train.cars, self.train.seats_in_car)
+        seat_map.take_all(
+            (car, seat)
+            for car, seat in self.tickets.values_list("car", "seat")
+            if seat_map.in_range(car, seat)
+        )
+        self._write_seat_map(seat_map)
+
     class Meta:
         ordering = ["departure_time"]
+        indexes = [
+            models.Index(
+                fields=["departure_time"],
+                condition=models.Q(seats_available__gt=0),
+                name="journey_with_seats_idx",
+            ),
+            models.Index(
+                fields=["route", "departure_time"],
+                name="journey_route_departure_idx",
+            ),
+            # the two train indexes bound one end each of the overlap
+            # lookup of validate_train_availability, they do not prevent
+            # overlaps themselves: the check is only reliable because
+            # Journey.save runs it holding a lock on the train row, and
+            # rows written around save(), e.g. by bulk_create, are not
+            # checked. An exclusion constraint over tstzrange would fail
+            # to migrate while overlaps stored before the validation
+            # remain, those are listed by the train conflicts endpoint
+            models.Index(
+                fields=["train", "departure_time"],
+                name="journey_train_departure_idx",
+            ),
+            models.Index(
+                fields=["departure_time", "id"],
+                name="journey_departure_id_idx",
+            ),
+            models.Index(
+                fields=["train", "arrival_time"],
+                name="journey_train_arrival_idx",
+            ),
+        ]
 
     @staticmethod
     def validate_time(
@@ -194,12 +563,79 @@ class Journey(models.Model):
                 }
             )
 
+    @staticmethod
+    def validate_train_availability(
+        train: Train | int,
+        departure_time: datetime,
+        arrival_time: datetime,
+        error_to_raise: Type[Exception],
+        journey_id: int | None = None,
+    ) -> None:
+        conflicts = (
+            Journey.objects.filter(
+                train=train,
+                departure_time__lt=arrival_time,
+                arrival_time__gt=departure_time,
+            )
+            .exclude(id=journey_id)
+            .values_list("id", flat=True)
+        )
+        if conflicts:
+            raise error_to_raise(
+                {
+                    "train": "train is already assigned to "
+                    f"overlapping journeys {list(conflicts)}"
+                }
+            )
+
+    @staticmethod
+    def validate_crew_availability(
+        crew_ids: Iterable[int],
+        departure_time: datetime,
+        arrival_time: datetime,
+        error_to_raise: Type[Exception],
+        journey_id: int | None = None,
+    ) -> None:
+        conflicts = (
+            Journey.crew.through.objects.filter(
+                crewmember_id__in=crew_ids,
+                journey__departure_time__lt=arrival_time,
+                journey__arrival_time__gt=departure_time,
+            )
+            .exclude(journey_id=journey_id)
+            .values_list("crewmember_id", flat=True)
+            .distinct()
+        )
+        if conflicts:
+            raise error_to_raise(
+                {
+                    "crew": "crew members "
+                    f"{sorted(conflicts)} are already assigned to "
+                    "overlapping journeys"
+                }
+            )
+
     def clean(self):
         Journey.validate_time(
             self.departure_time,
             self.arrival_time,
             ValidationError,
         )
+        Journey.validate_train_availability(
+            self.train_id,
+            self.departure_time,
+            self.arrival_time,
+            ValidationError,
+            journey_id=self.id,
+        )
+        if self.id:
+            Journey.validate_crew_availability(
+                self.crew.values("id"),
+                self.departure_time,
+                self.arrival_time,
+                ValidationError,
+                journey_id=self.id,
+            )
 
     def save(
         self,
@@ -208,10 +644,176 @@ class Journey(models.Model):
         using=None,
         update_fields=None,
     ):
-        self.full_clean()
-        return super(Journey, self).save(
-            force_insert, force_update, using, update_fields
+        with transaction.atomic(using=using):
+            self.lock_assignment()
+            self.full_clean()
+            if self._state.adding:
+                self.seats_available = (
+                    self.train.capacity - count_taken(self.seat_map)
+                )
+            return super(Journey, self).save(
+                force_insert, force_update, using, update_fields
+            )
+
+    def lock_assignment(self) -> None:
+        """
+        Locks the rows of the train and crew members of the journey until
+        the transaction ends, so journeys sharing any of them are checked
+        for overlaps one after another
+        """
+        list(
+            Train.objects.select_for_update()
+            .filter(id=self.train_id)
+            .values_list("id", flat=True)
+        )
+        if self.id:
+            CrewMember.lock(self.crew.values("id"))
+
+
+class SeatHoldQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class SeatHold(models.Model):
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    journey = models.ForeignKey(
+        Journey,
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+    )
+    seat_map = models.BinaryField(default=bytes, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = SeatHoldQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f"{self.journey} (until {self.expires_at})"
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def get_seat_map(self) -> SeatMap:
+        train = self.journey.train
+        return SeatMap(train.cars, train.seats_in_car, self.seat_map)
+
+    @property
+    def seats(self) -> list[dict]:
+        return [
+            {"car": car, "seat": seat}
+            for car, seat in self.get_seat_map().taken_seats()
+        ]
+
+    @property
+    def is_active(self) -> bool:
+        return self.expires_at > timezone.now()
+
+    @classmethod
+    def place(
+        cls,
+        journey_id: int,
+        user,
+        seats: list[tuple[int, int]],
+        duration: timedelta,
+        error_to_raise: Type[Exception],
+    ) -> "SeatHold":
+        """
+        Holds free seats of a journey for the given duration,
+        raising an error if any of them is taken or already held
+        """
+        with transaction.atomic():
+            journey = (
+                Journey.objects.select_for_update(of=("self",))
+                .select_related("train")
+                .get(id=journey_id)
+            )
+            occupied = journey.get_occupied_seat_map()
+            seat_map = SeatMap(journey.train.cars, journey.train.seats_in_car)
+
+            for car, seat in seats:
+                Ticket.validate_ticket(
+                    car,
+                    seat,
+                    journey.train,
+                    error_to_raise,
+                )
+                if occupied.is_taken(car, seat):
+                    raise error_to_raise(
+                        {
+                            "seat": f"seat {seat} in car {car} "
+                            f"is not available"
+                        }
+                    )
+                seat_map.take(car, seat)
+
+            return cls.objects.create(
+                journey=journey,
+                user=user,
+                seat_map=bytes(seat_map),
+                expires_at=timezone.now() + duration,
+            )
+
+    def validate_redemption(
+        self,
+        user,
+        seats: list[tuple[int, int, int]],
+        error_to_raise: Type[Exception],
+    ) -> None:
+        """
+        Checks that the hold can be redeemed by the user
+        for the given (journey, car, seat) triples
+        """
+        if self.user_id != user.id or not self.is_active:
+            raise error_to_raise({"hold": "hold is expired or invalid"})
+
+        seat_map = self.get_seat_map()
+        for journey_id, car, seat in seats:
+            if (
+                journey_id != self.journey_id
+                or not seat_map.in_range(car, seat)
+                or not seat_map.is_taken(car, seat)
+            ):
+                raise error_to_raise(
+                    {
+                        "hold": f"seat {seat} in car {car} "
+                        f"is not covered by the hold"
+                    }
+                )
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotates orders with the sum of the prices of their tickets,
+        computed by the database in a subquery per order. The total is
+        null when any ticket has no price, as its fare is unknown
+        """
+        totals = (
+            Ticket.objects.filter(order=models.OuterRef("pk"))
+            .order_by()
+            .values("order")
+            .annotate(
+                total=models.Case(
+                    models.When(
+                        Exact(models.Count("price"), models.Count("id")),
+                        then=models.Sum("price"),
+                    ),
+                    default=None,
+                    output_field=models.DecimalField(),
+                )
+            )
+            .values("total")
         )
+        return self.annotate(total=models.Subquery(totals))
 
 
 class Order(models.Model):
@@ -222,11 +824,20 @@ class Order(models.Model):
         related_name="orders",
     )
 
+    objects = OrderQuerySet.as_manager()
+
     def __str__(self) -> str:
         return str(self.created_at)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                "user",
+                models.F("created_at").desc(),
+                name="order_user_created_idx",
+            ),
+        ]
 
 
 class Ticket(models.Model):
@@ -242,6 +853,13 @@ class Ticket(models.Model):
         on_delete=models.CASCADE,
         related_name="tickets",
     )
+    # fare at booking time, later tariff changes do not affect it
+    price = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True,
+    )
 
     @staticmethod
     def validate_ticket(
@@ -281,6 +899,8 @@ class Ticket(models.Model):
         update_fields=None,
     ):
         self.full_clean()
+        if self.price is None:
+            self.price = fare_table.get().journey_price(self.journey)
         return super(Ticket, self).save(
             force_insert, force_update, using, update_fields
         )
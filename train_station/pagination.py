@@ -0,0 +1,272 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardResultSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset fetching the count and the page asynchronously"""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number,
+                    message=str(exc),
+                )
+            )
+
+        bottom = (number - 1) * paginator.per_page
+        top = bottom + paginator.per_page
+        if top + paginator.orphans >= paginator.count:
+            top = paginator.count
+        self.page = Page(
+            [obj async for obj in queryset[bottom:top]],
+            number,
+            paginator,
+        )
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a unique tuple of fields,
+    e.g. ("departure_time", "id"). Pages are fetched with a
+    WHERE (fields) > (cursor) condition instead of an OFFSET
+    and no COUNT query is made, so deep pages cost the same as the first
+    """
+
+    ordering = ("-id",)
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request)
+        return self._set_results(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset fetching the page asynchronously"""
+        queryset = self._page_queryset(queryset, request)
+        return self._set_results([obj async for obj in queryset])
+
+    def _page_queryset(self, queryset, request):
+        """Page of the queryset with one extra row telling if there is more"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = [field.lstrip("-") for field in self.ordering]
+        self.descending = self.ordering[0].startswith("-")
+
+        self.cursor = self.decode_cursor(request, queryset.model)
+        self.reverse = bool(self.cursor and self.cursor["reverse"])
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._flip(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+
+        if self.cursor:
+            queryset = queryset.filter(
+                self._after(
+                    self.cursor["values"],
+                    self.descending != self.reverse,
+                )
+            )
+
+        return queryset[:self.page_size + 1]
+
+    def _set_results(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = bool(results)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None and bool(results)
+
+        self.results = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        return self.encode_cursor(self.results[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        return self.encode_cursor(self.results[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        values = [
+            obj._meta.get_field(field).value_to_string(obj)
+            for field in self.fields
+        ]
+        token = base64.urlsafe_b64encode(
+            json.dumps({"v": values, "r": reverse}).encode()
+        ).decode()
+
+        return replace_query_param(
+            remove_query_param(self.base_url, "pagination"),
+            self.cursor_query_param,
+            token,
+        )
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, cursor["v"], strict=True)
+            ]
+            reverse = bool(cursor["r"])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {"values": values, "reverse": reverse}
+
+    def _after(self, values, descending):
+        """
+        Builds (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ...
+        for the keyset fields, using < for descending order
+        """
+        lookup = "lt" if descending else "gt"
+        conditions = []
+        for index, field in enumerate(self.fields):
+            equal = dict(zip(self.fields[:index], values[:index]))
+            conditions.append(
+                Q(**equal, **{f"{field}__{lookup}": values[index]})
+            )
+
+        return reduce(or_, conditions)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class KeysetPaginationMixin:
+    """
+    Switches a viewset from page number to keyset pagination
+    when the client asks for it with ?pagination=cursor
+    or follows a cursor link
+    """
+
+    keyset_pagination_class = KeysetPagination
+
+    def use_keyset_pagination(self) -> bool:
+        request = getattr(self, "request", None)
+        if request is None:
+            return False
+
+        params = request.query_params
+        return (
+            params.get("pagination") == "cursor"
+            or self.keyset_pagination_class.cursor_query_param in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.use_keyset_pagination():
+            self._paginator = self.keyset_pagination_class()
+
+        return super().paginator
+
+
+class JourneyKeysetPagination(KeysetPagination):
+    ordering = ("departure_time", "id")
+
+
+class OrderKeysetPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,216 @@
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+
+
+class Connection(NamedTuple):
+    departure: float
+    journey_id: int
+    arrival: float
+    origin_id: int
+    destination_id: int
+
+
+class Itinerary(NamedTuple):
+    departure: float
+    arrival: float
+    journey_ids: list[int]
+
+    @property
+    def transfers(self) -> int:
+        return len(self.journey_ids) - 1
+
+
+class ConnectionIndex:
+    """
+    In-memory array of all journeys as connections between
+    two stations, sorted by departure time. Built lazily from the database,
+    kept up to date by journey and route signals of this process
+    and fully rebuilt once it gets older than PLANNER_INDEX_MAX_AGE seconds
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._connections = None
+            self._by_journey = {}
+            self._built_at = 0.0
+
+    @staticmethod
+    def _to_connection(
+        journey_id: int,
+        origin_id: int,
+        destination_id: int,
+        departure_time: datetime,
+        arrival_time: datetime,
+    ) -> Connection:
+        return Connection(
+            departure_time.timestamp(),
+            journey_id,
+            arrival_time.timestamp(),
+            origin_id,
+            destination_id,
+        )
+
+    def _build(self) -> None:
+        from .models import Journey
+
+        rows = Journey.objects.values_list(
+            "id",
+            "route__origin_id",
+            "route__destination_id",
+            "departure_time",
+            "arrival_time",
+        )
+        connections = sorted(
+            self._to_connection(*row) for row in rows.iterator()
+        )
+
+        self._connections = connections
+        self._by_journey = {
+            connection.journey_id: connection for connection in connections
+        }
+        self._built_at = time.monotonic()
+
+    def get_connections(self) -> list[Connection]:
+        with self._lock:
+            if (
+                self._connections is None
+                or time.monotonic() - self._built_at
+                > settings.PLANNER_INDEX_MAX_AGE
+            ):
+                self._build()
+
+            return self._connections
+
+    def update_journey(self, journey) -> None:
+        connection = self._to_connection(
+            journey.id,
+            journey.route.origin_id,
+            journey.route.destination_id,
+            journey.departure_time,
+            journey.arrival_time,
+        )
+        with self._lock:
+            if self._connections is None:
+                return
+
+            connections = self._without(journey.id)
+            insort(connections, connection)
+            self._connections = connections
+            self._by_journey[journey.id] = connection
+
+    def remove_journey(self, journey_id: int) -> None:
+        with self._lock:
+            if self._connections is None:
+                return
+
+            self._connections = self._without(journey_id)
+            self._by_journey.pop(journey_id, None)
+
+    def _without(self, journey_id: int) -> list[Connection]:
+        """Copy of the connections without the one of the journey"""
+        connections = list(self._connections)
+        connection = self._by_journey.get(journey_id)
+
+        if connection is not None:
+            index = bisect_left(connections, connection)
+            if (
+                index < len(connections)
+                and connections[index] == connection
+            ):
+                del connections[index]
+
+        return connections
+
+
+connection_index = ConnectionIndex()
+
+
+def plan_journeys(
+    origin_id: int,
+    destination_id: int,
+    after: datetime,
+    max_transfers: int,
+    connections: Optional[list[Connection]] = None,
+) -> list[Itinerary]:
+    """
+    Finds earliest-arrival itineraries from the origin to the destination
+    station departing not earlier than `after` with the connection scan
+    algorithm. Returns one itinerary per number of legs that arrives
+    strictly earlier than any itinerary with fewer transfers
+    """
+    if connections is None:
+        connections = connection_index.get_connections()
+
+    max_legs = max_transfers + 1
+    transfer_time = timedelta(
+        minutes=settings.PLANNER_MIN_TRANSFER_MINUTES
+    ).total_seconds()
+    start = after.timestamp()
+    infinity = float("inf")
+
+    # arrivals[legs][station] is the earliest arrival at the station
+    # using exactly that many legs, parents[legs][station] is the last leg
+    arrivals = [{} for _ in range(max_legs + 1)]
+    parents = [{} for _ in range(max_legs + 1)]
+    best = infinity
+
+    first = bisect_left(connections, (start,))
+    for connection in connections[first:]:
+        if connection.departure >= best:
+            break
+
+        for legs in range(max_legs, 0, -1):
+            if legs == 1:
+                reachable = connection.origin_id == origin_id
+            else:
+                ready = arrivals[legs - 1].get(connection.origin_id)
+                reachable = (
+                    ready is not None
+                    and ready + transfer_time <= connection.departure
+                )
+
+            if not reachable or connection.arrival >= arrivals[legs].get(
+                connection.destination_id, infinity
+            ):
+                continue
+
+            arrivals[legs][connection.destination_id] = connection.arrival
+            parents[legs][connection.destination_id] = connection
+
+            if connection.destination_id == destination_id:
+                best = min(best, connection.arrival)
+
+    itineraries = []
+    earliest = infinity
+    for legs in range(1, max_legs + 1):
+        arrival = arrivals[legs].get(destination_id)
+        if arrival is None or arrival >= earliest:
+            continue
+
+        earliest = arrival
+        path = []
+        station_id = destination_id
+        for step in range(legs, 0, -1):
+            connection = parents[step][station_id]
+            path.append(connection)
+            station_id = connection.origin_id
+        path.reverse()
+
+        itineraries.append(
+            Itinerary(
+                path[0].departure,
+                path[-1].arrival,
+                [connection.journey_id for connection in path],
+            )
+        )
+
+    return itineraries
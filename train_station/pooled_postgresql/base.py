@@ -0,0 +1,92 @@
+from contextlib import suppress
+from functools import partial
+
+import psycopg2
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+from psycopg2 import extensions
+
+from ..db_pool import ConnectionPool, get_pool
+from .creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend taking its connections from a pool shared
+    by the threads of the process, a connection closed by Django at the
+    end of a request goes back to the pool. The pool is configured with
+    OPTIONS["pool"], see ConnectionPool for the accepted keys
+    """
+
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self) -> ConnectionPool:
+        settings_dict = self.settings_dict
+        key = (
+            self.alias,
+            settings_dict["HOST"],
+            settings_dict["PORT"],
+            settings_dict["NAME"],
+            settings_dict["USER"],
+        )
+
+        return get_pool(
+            key,
+            partial(
+                ConnectionPool,
+                close=self._close_connection,
+                check=self._check_connection,
+                **settings_dict["OPTIONS"].get("pool", {}),
+            ),
+        )
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        return self.pool.getconn(
+            partial(super().get_new_connection, conn_params)
+        )
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(
+                    self.connection,
+                    discard=not self._reset_connection(self.connection),
+                )
+
+    @staticmethod
+    def _reset_connection(connection) -> bool:
+        """Rolls back an open transaction, False if the connection is broken"""
+        if connection.closed:
+            return False
+
+        status = connection.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+
+        return True
+
+    @staticmethod
+    def _check_connection(connection) -> bool:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+
+        return True
+
+    @staticmethod
+    def _close_connection(connection) -> None:
+        with suppress(psycopg2.Error):
+            connection.close()
@@ -0,0 +1,16 @@
+from django.db.backends.postgresql import creation
+
+from ..db_pool import close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    # PostgreSQL refuses to drop or copy a database with open connections,
+    # so the idle connections kept by the pools are closed first
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        close_pools()
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
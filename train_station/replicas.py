@@ -0,0 +1,79 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+
+PIN_KEY = "replica:pin:{}"
+
+# database alias reads of the current request are sent to
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def pin_to_primary(user) -> None:
+    """Sends reads of the user to the primary for REPLICA_STICKY_SECONDS"""
+    if settings.DATABASE_REPLICAS and user.is_authenticated:
+        cache.set(
+            PIN_KEY.format(user.pk),
+            True,
+            timeout=settings.REPLICA_STICKY_SECONDS,
+        )
+
+
+def is_pinned(user) -> bool:
+    return user.is_authenticated and bool(cache.get(PIN_KEY.format(user.pk)))
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica chosen for the current request,
+    if any, and everything else to the primary database
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    """
+    Reads of the `replica_actions` of a viewset made with a safe method
+    go to one of DATABASE_REPLICAS picked per request. After a user
+    writes through the viewset their reads stay on the primary for
+    REPLICA_STICKY_SECONDS, so they always see their own changes
+    """
+
+    replica_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        # authentication and permission checks read from the primary
+        _read_alias.set(None)
+        super().initial(request, *args, **kwargs)
+
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and not is_pinned(request.user)
+        ):
+            _read_alias.set(random.choice(settings.DATABASE_REPLICAS))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        _read_alias.set(None)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request.user)
+
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,78 @@
+from typing import Iterable, Iterator
+
+
+def count_taken(data: bytes) -> int:
+    """Counts taken seats in a packed seat bitmap"""
+    return int.from_bytes(data, "little").bit_count()
+
+
+class SeatMap:
+    """
+    Compact seat occupancy bitmap of a journey.
+    Every seat of a train is stored as a single bit, car by car
+    """
+
+    def __init__(
+        self,
+        cars: int,
+        seats_in_car: int,
+        data: bytes = b"",
+    ) -> None:
+        self.cars = cars
+        self.seats_in_car = seats_in_car
+
+        size = (cars * seats_in_car + 7) // 8
+        bits = bytearray(data)[:size]
+        self.bits = bits + bytearray(size - len(bits))
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.bits)
+
+    def in_range(self, car: int, seat: int) -> bool:
+        return 1 <= car <= self.cars and 1 <= seat <= self.seats_in_car
+
+    def _position(self, car: int, seat: int) -> int:
+        if not self.in_range(car, seat):
+            raise IndexError(f"seat ({car}, {seat}) is out of range")
+
+        return (car - 1) * self.seats_in_car + (seat - 1)
+
+    def is_taken(self, car: int, seat: int) -> bool:
+        position = self._position(car, seat)
+        return bool(self.bits[position // 8] & (1 << position % 8))
+
+    def take(self, car: int, seat: int) -> None:
+        position = self._position(car, seat)
+        self.bits[position // 8] |= 1 << position % 8
+
+    def release(self, car: int, seat: int) -> None:
+        position = self._position(car, seat)
+        self.bits[position // 8] &= ~(1 << position % 8) & 0xFF
+
+    def take_all(self, seats: Iterable[tuple[int, int]]) -> None:
+        for car, seat in seats:
+            self.take(car, seat)
+
+    def release_all(self, seats: Iterable[tuple[int, int]]) -> None:
+        for car, seat in seats:
+            self.release(car, seat)
+
+    def merge(self, data: bytes) -> None:
+        """Marks seats taken in another bitmap of the same layout as taken"""
+        for index, byte in enumerate(bytearray(data)[:len(self.bits)]):
+            self.bits[index] |= byte
+
+    @property
+    def taken_count(self) -> int:
+        return count_taken(self.bits)
+
+    def taken_seats(self) -> Iterator[tuple[int, int]]:
+        """Yields taken (car, seat) pairs ordered by car and seat"""
+        for index, byte in enumerate(self.bits):
+            while byte:
+                low_bit = byte & -byte
+                position = index * 8 + low_bit.bit_length() - 1
+                byte ^= low_bit
+
+                car, seat = divmod(position, self.seats_in_car)
+                yield car + 1, seat + 1
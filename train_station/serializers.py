@@ -1,7 +1,16 @@
+import base64
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 
+from .fares import fare_table
+from .images import variant_urls
 from .models import (
     CrewMember,
     Station,
@@ -10,8 +19,47 @@ from .models import (
     Train,
     Journey,
     Order,
+    SeatHold,
     Ticket,
 )
+from .seat_map import count_taken
+
+
+@extend_schema_field(OpenApiTypes.OBJECT)
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    URLs and sizes of the resized copies of the image of the model,
+    {variant: {width, height, webp, jpeg}}, empty until they are generated
+    """
+
+    def __init__(self, model, **kwargs):
+        self.storage = model._meta.get_field("image").storage
+        kwargs.setdefault("source", "image_variants")
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return variant_urls(value, self.storage, self.context.get("request"))
+
+
+class FareField(serializers.DecimalField):
+    """
+    Current fare of a ticket for the journey, null without a tariff.
+    Uses the compiled tariffs passed in the serializer context as "fares"
+    when the view has loaded them, otherwise loads them into the context
+    of the root serializer once, so no lookup is made per journey
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.update(source="*", read_only=True, allow_null=True)
+        super().__init__(max_digits=8, decimal_places=2, **kwargs)
+
+    def to_representation(self, journey):
+        fares = self.context.get("fares")
+        if fares is None:
+            fares = self.context["fares"] = fare_table.get()
+        price = fares.journey_price(journey)
+
+        return None if price is None else super().to_representation(price)
 
 
 class CrewMemberSerializer(serializers.ModelSerializer):
@@ -27,16 +75,52 @@ class CrewMemberListSerializer(serializers.ModelSerializer):
 
 
 class StationSerializer(serializers.ModelSerializer):
+    images = ImageVariantsField(Station)
+
     class Meta:
         model = Station
-        fields = ("id", "name", "image", "latitude", "longitude")
+        fields = ("id", "name", "image", "images", "latitude", "longitude")
         read_only_fields = ("image",)
 
 
+class StationNearbySerializer(StationSerializer):
+    distance = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Station
+        fields = (
+            "id",
+            "name",
+            "image",
+            "images",
+            "latitude",
+            "longitude",
+            "distance",
+        )
+
+
+class StationAutocompleteSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    journeys = serializers.IntegerField()
+
+
+class StationDepartureSerializer(serializers.Serializer):
+    journey = serializers.IntegerField(source="journey_id")
+    destination_id = serializers.IntegerField()
+    destination = serializers.CharField()
+    train = serializers.CharField()
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    tickets_available = serializers.IntegerField()
+
+
 class StationImageSerializer(serializers.ModelSerializer):
+    images = ImageVariantsField(Station)
+
     class Meta:
         model = Station
-        fields = ("id", "image")
+        fields = ("id", "image", "images")
 
 
 class RouteSerializer(serializers.ModelSerializer):
@@ -88,6 +172,7 @@ class TrainListSerializer(TrainSerializer):
         slug_field="name",
         read_only=True,
     )
+    images = ImageVariantsField(Train)
 
     class Meta:
         model = Train
@@ -96,6 +181,7 @@ class TrainListSerializer(TrainSerializer):
             "name",
             "train_type",
             "image",
+            "images",
             "cars",
             "seats_in_car",
             "capacity",
@@ -107,21 +193,66 @@ class TrainRetrieveSerializer(TrainListSerializer):
 
 
 class TrainImageSerializer(serializers.ModelSerializer):
+    images = ImageVariantsField(Train)
+
     class Meta:
         model = Train
-        fields = ("id", "image")
+        fields = ("id", "image", "images")
+
+
+class TrainConflictSerializer(serializers.Serializer):
+    journey = serializers.IntegerField()
+    conflicting_journey = serializers.IntegerField()
+    overlap_start = serializers.DateTimeField()
+    overlap_end = serializers.DateTimeField()
 
 
 class JourneySerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         data = super(JourneySerializer, self).validate(attrs=attrs)
+
+        journey_id = self.instance.id if self.instance else None
+        if self.instance:
+            # a partial update is checked together with the kept fields
+            attrs = {
+                "train": self.instance.train,
+                "departure_time": self.instance.departure_time,
+                "arrival_time": self.instance.arrival_time,
+                "crew": self.instance.crew.all(),
+                **attrs,
+            }
+
         Journey.validate_time(
             attrs["departure_time"],
             attrs["arrival_time"],
             ValidationError,
         )
+        Journey.validate_train_availability(
+            attrs["train"],
+            attrs["departure_time"],
+            attrs["arrival_time"],
+            ValidationError,
+            journey_id=journey_id,
+        )
+        if attrs.get("crew"):
+            Journey.validate_crew_availability(
+                [crew_member.id for crew_member in attrs["crew"]],
+                attrs["departure_time"],
+                attrs["arrival_time"],
+                ValidationError,
+                journey_id=journey_id,
+            )
         return data
 
+    def create(self, validated_data):
+        # the journey and its crew are checked under the same locks
+        with transaction.atomic():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            return super().update(instance, validated_data)
+
     class Meta:
         model = Journey
         fields = (
@@ -138,6 +269,7 @@ class JourneyListSerializer(JourneySerializer):
     route = serializers.StringRelatedField()
     train = serializers.StringRelatedField()
     train_image = serializers.ImageField(source="train.image", read_only=True)
+    train_images = ImageVariantsField(Train, source="train.image_variants")
     train_capacity = serializers.IntegerField(
         source="train.capacity",
         read_only=True,
@@ -148,6 +280,7 @@ class JourneyListSerializer(JourneySerializer):
         read_only=True,
     )
     tickets_available = serializers.IntegerField(read_only=True)
+    price = FareField()
 
     class Meta:
         model = Journey
@@ -158,13 +291,73 @@ class JourneyListSerializer(JourneySerializer):
             "arrival_time",
             "train",
             "train_image",
+            "train_images",
             "train_capacity",
             "crew",
             "tickets_available",
+            "price",
         )
 
 
+class JourneyItinerarySerializer(serializers.Serializer):
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    transfers = serializers.IntegerField()
+    legs = JourneyListSerializer(many=True)
+
+
+class TicketJourneyField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves journeys from the batch preloaded by the parent
+    list serializer instead of querying them one by one
+    """
+
+    def to_internal_value(self, data):
+        journeys = getattr(self.parent, "preloaded_journeys", None) or {}
+        try:
+            return journeys[int(data)]
+        except (TypeError, ValueError, KeyError):
+            return super().to_internal_value(data)
+
+
+class TicketBulkSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            journey_ids = set()
+            for ticket in data:
+                try:
+                    journey_ids.add(int(ticket["journey"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            self.child.preloaded_journeys = Journey.objects.select_related(
+                "train",
+                "route",
+            ).in_bulk(journey_ids)
+
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        data = super(TicketBulkSerializer, self).validate(attrs)
+        seats = set()
+        for ticket in attrs:
+            seat = (ticket["journey"].id, ticket["car"], ticket["seat"])
+            if seat in seats:
+                raise ValidationError(
+                    {
+                        "seat": f"seat {ticket['seat']} "
+                        f"in car {ticket['car']} "
+                        f"is ordered more than once"
+                    }
+                )
+            seats.add(seat)
+        return data
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    journey = TicketJourneyField(
+        queryset=Journey.objects.select_related("train", "route")
+    )
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
         Ticket.validate_ticket(
@@ -182,28 +375,24 @@ class TicketSerializer(serializers.ModelSerializer):
             "car",
             "seat",
             "journey",
+            "price",
         )
+        read_only_fields = ("price",)
+        # seats are checked against the locked seat maps of the journeys
+        # on creation rather than with a query per ticket
+        validators = []
+        list_serializer_class = TicketBulkSerializer
 
 
 class TicketListSerializer(TicketSerializer):
     journey = JourneyListSerializer(read_only=True)
 
 
-class TicketSeatSerializer(TicketSerializer):
-    class Meta:
-        model = Ticket
-        fields = ("car", "seat")
-
-
 class JourneyRetrieveSerializer(JourneySerializer):
     route = RouteListSerializer(read_only=True)
     train = TrainListSerializer(read_only=True)
     crew = CrewMemberListSerializer(many=True, read_only=True)
-    taken_seats = TicketSeatSerializer(
-        source="tickets",
-        many=True,
-        read_only=True
-    )
+    taken_seats = serializers.SerializerMethodField()
 
     class Meta:
         model = Journey
@@ -217,26 +406,299 @@ class JourneyRetrieveSerializer(JourneySerializer):
             "taken_seats",
         )
 
+    def get_taken_seats(self, obj) -> list[dict]:
+        return [
+            {"car": car, "seat": seat}
+            for car, seat in obj.get_occupied_seat_map().taken_seats()
+        ]
+
+
+class JourneySeatMapSerializer(serializers.ModelSerializer):
+    cars = serializers.IntegerField(source="train.cars", read_only=True)
+    seats_in_car = serializers.IntegerField(
+        source="train.seats_in_car",
+        read_only=True,
+    )
+    tickets_available = serializers.IntegerField(read_only=True)
+    seat_map = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Journey
+        fields = (
+            "id",
+            "cars",
+            "seats_in_car",
+            "tickets_available",
+            "seat_map",
+        )
+
+    def get_seat_map(self, obj) -> str:
+        """
+        Base64 encoded bitmap of seats taken or held, one bit per seat.
+        Seat (car, seat) is stored at position
+        (car - 1) * seats_in_car + (seat - 1), least significant bit first
+        """
+        return base64.b64encode(bytes(obj.get_occupied_seat_map())).decode()
+
+
+class SeatSerializer(serializers.Serializer):
+    car = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    seats = SeatSerializer(many=True, allow_empty=False)
+    minutes = serializers.IntegerField(
+        write_only=True,
+        min_value=1,
+        max_value=settings.SEAT_HOLD_MAX_MINUTES,
+        default=settings.SEAT_HOLD_MAX_MINUTES,
+    )
+
+    class Meta:
+        model = SeatHold
+        fields = ("token", "journey", "seats", "minutes", "expires_at")
+        read_only_fields = ("token", "expires_at")
+
+    def create(self, validated_data):
+        return SeatHold.place(
+            validated_data["journey"].id,
+            validated_data["user"],
+            [(seat["car"], seat["seat"]) for seat in validated_data["seats"]],
+            timedelta(minutes=validated_data["minutes"]),
+            ValidationError,
+        )
+
 
 class OrderSerializer(serializers.ModelSerializer):
     tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+    hold = serializers.SlugRelatedField(
+        slug_field="token",
+        queryset=SeatHold.objects.select_related("journey__train"),
+        required=False,
+        write_only=True,
+    )
 
     class Meta:
         model = Order
-        fields = ("id", "created_at", "tickets")
+        fields = ("id", "created_at", "tickets", "hold")
+
+    def validate(self, attrs):
+        data = super(OrderSerializer, self).validate(attrs=attrs)
+        if attrs.get("hold"):
+            attrs["hold"].validate_redemption(
+                self.context["request"].user,
+                [
+                    (ticket["journey"].id, ticket["car"], ticket["seat"])
+                    for ticket in attrs["tickets"]
+                ],
+                ValidationError,
+            )
+        return data
 
     def create(self, validated_data):
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
+            hold = validated_data.pop("hold", None)
             order = Order.objects.create(**validated_data)
+
+            seats = defaultdict(list)
             for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
+                seats[ticket_data["journey"].id].append(
+                    (ticket_data["car"], ticket_data["seat"])
+                )
+            Journey.book_seats(seats, ValidationError, hold=hold)
+            if hold is not None:
+                hold.delete()
+
+            fares = fare_table.get()
+            Ticket.objects.bulk_create(
+                Ticket(
+                    order=order,
+                    price=fares.journey_price(ticket_data["journey"]),
+                    **ticket_data,
+                )
+                for ticket_data in tickets_data
+            )
             return order
 
 
+class OrderHistorySerializer(serializers.ListSerializer):
+    """
+    Serializes a page of orders from values() rows of their tickets,
+    journeys, crew and active seat holds instead of a model instance
+    and a field tree per ticket. Every journey is serialized once
+    and shared by all of its tickets, the output matches the
+    nested TicketListSerializer and JourneyListSerializer
+    """
+
+    price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def to_representation(self, data):
+        orders = list(data)
+        datetime_field = serializers.DateTimeField()
+
+        tickets = defaultdict(list)
+        for ticket_id, order_id, car, seat, journey_id, ticket_price in (
+            Ticket.objects.filter(order__in=orders)
+            .order_by("car", "seat")
+            .values_list(
+                "id",
+                "order_id",
+                "car",
+                "seat",
+                "journey_id",
+                "price",
+            )
+        ):
+            tickets[order_id].append(
+                (ticket_id, car, seat, journey_id, self._price(ticket_price))
+            )
+
+        journey_ids = {
+            journey_id
+            for order_tickets in tickets.values()
+            for *_, journey_id, _ in order_tickets
+        }
+        journeys = self._journeys(journey_ids, datetime_field)
+
+        return [
+            {
+                "id": order.id,
+                "created_at": datetime_field.to_representation(
+                    order.created_at
+                ),
+                "tickets": [
+                    {
+                        "id": ticket_id,
+                        "car": car,
+                        "seat": seat,
+                        "journey": journeys[journey_id],
+                        "price": ticket_price,
+                    }
+                    for (
+                        ticket_id,
+                        car,
+                        seat,
+                        journey_id,
+                        ticket_price,
+                    ) in tickets[order.id]
+                ],
+                "total": self._price(order.total),
+            }
+            for order in orders
+        ]
+
+    def _price(self, value) -> str | None:
+        if value is None:
+            return None
+        return self.price_field.to_representation(value)
+
+    def _journeys(self, journey_ids, datetime_field) -> dict[int, dict]:
+        if not journey_ids:
+            return {}
+
+        crew = defaultdict(list)
+        for journey_id, first_name, last_name in (
+            Journey.crew.through.objects.filter(journey_id__in=journey_ids)
+            .order_by("crewmember_id")
+            .values_list(
+                "journey_id",
+                "crewmember__first_name",
+                "crewmember__last_name",
+            )
+        ):
+            crew[journey_id].append(f"{first_name} {last_name}")
+
+        held = defaultdict(int)
+        for journey_id, seat_map in (
+            SeatHold.objects.active()
+            .filter(journey_id__in=journey_ids)
+            .values_list("journey_id", "seat_map")
+        ):
+            held[journey_id] += count_taken(seat_map)
+
+        request = self.context.get("request")
+        image_storage = Train._meta.get_field("image").storage
+        fares = self.context.get("fares") or fare_table.get()
+
+        journeys = {}
+        for (
+            journey_id,
+            departure_time,
+            arrival_time,
+            seats_available,
+            origin,
+            destination,
+            distance,
+            train_name,
+            train_type_id,
+            train_type,
+            train_image,
+            train_image_variants,
+            cars,
+            seats_in_car,
+        ) in Journey.objects.filter(id__in=journey_ids).values_list(
+            "id",
+            "departure_time",
+            "arrival_time",
+            "seats_available",
+            "route__origin__name",
+            "route__destination__name",
+            "route__distance",
+            "train__name",
+            "train__train_type_id",
+            "train__train_type__name",
+            "train__image",
+            "train__image_variants",
+            "train__cars",
+            "train__seats_in_car",
+        ):
+            if train_image:
+                train_image = image_storage.url(train_image)
+                if request is not None:
+                    train_image = request.build_absolute_uri(train_image)
+
+            journeys[journey_id] = {
+                "id": journey_id,
+                "route": f"{origin} - {destination}",
+                "departure_time": datetime_field.to_representation(
+                    departure_time
+                ),
+                "arrival_time": datetime_field.to_representation(
+                    arrival_time
+                ),
+                "train": f"{train_name} ({train_type})",
+                "train_image": train_image or None,
+                "train_images": variant_urls(
+                    train_image_variants,
+                    image_storage,
+                    request,
+                ),
+                "train_capacity": cars * seats_in_car,
+                "crew": crew[journey_id],
+                "tickets_available": max(
+                    seats_available - held[journey_id],
+                    0,
+                ),
+                "price": self._price(
+                    fares.price(train_type_id, distance, departure_time)
+                ),
+            }
+
+        return journeys
+
+
 class OrderListSerializer(serializers.ModelSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+    total = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        read_only=True,
+        allow_null=True,
+    )
 
     class Meta:
         model = Order
-        fields = ("id", "created_at", "tickets")
+        fields = ("id", "created_at", "tickets", "total")
+        list_serializer_class = OrderHistorySerializer
@@ -0,0 +1,294 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.db.models.signals import (
+    m2m_changed,
+    pre_save,
+    post_save,
+    post_delete,
+)
+from django.dispatch import receiver
+
+from .autocomplete import station_trie
+from .cache import bump_version
+from .departures import departure_board
+from .intervals import Interval, find_overlaps
+from .models import (
+    CrewMember,
+    Station,
+    Route,
+    TrainType,
+    Train,
+    Journey,
+    PeakPeriod,
+    SeatHold,
+    Tariff,
+    Ticket,
+)
+from .planner import connection_index
+from .spatial import station_grid
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_seat(sender, instance, **kwargs):
+    instance._previous_seat = (
+        Ticket.objects.filter(id=instance.id)
+        .values_list("journey_id", "car", "seat")
+        .first()
+        if instance.id
+        else None
+    )
+
+
+@receiver(post_save, sender=Ticket)
+def take_ticket_seat(sender, instance, created, **kwargs):
+    previous_seat = getattr(instance, "_previous_seat", None)
+    seat = (instance.car, instance.seat)
+
+    if previous_seat and previous_seat[0] != instance.journey_id:
+        Journey.update_seat_map(previous_seat[0], released=[previous_seat[1:]])
+        previous_seat = None
+
+    Journey.update_seat_map(
+        instance.journey_id,
+        taken=[seat],
+        released=[previous_seat[1:]] if previous_seat else (),
+    )
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seat(sender, instance, **kwargs):
+    Journey.update_seat_map(
+        instance.journey_id,
+        released=[(instance.car, instance.seat)],
+    )
+
+
+@receiver(pre_save, sender=Train)
+def remember_train_layout(sender, instance, **kwargs):
+    instance._previous_layout = (
+        Train.objects.filter(id=instance.id)
+        .values_list("cars", "seats_in_car")
+        .first()
+        if instance.id
+        else None
+    )
+
+
+@receiver(post_save, sender=Train)
+def rebuild_train_seat_maps(sender, instance, created, **kwargs):
+    previous_layout = getattr(instance, "_previous_layout", None)
+
+    if previous_layout and previous_layout != (
+        instance.cars,
+        instance.seats_in_car,
+    ):
+        for journey in instance.journeys.select_related("train"):
+            journey.rebuild_seat_map()
+        SeatHold.objects.filter(journey__train=instance).delete()
+
+
+@receiver(pre_save, sender=Journey)
+def remember_journey_train_and_route(sender, instance, **kwargs):
+    instance._previous_train_id, instance._previous_route_id = (
+        Journey.objects.filter(id=instance.id)
+        .values_list("train_id", "route_id")
+        .first()
+        if instance.id
+        else None
+    ) or (None, None)
+
+
+@receiver(post_save, sender=Journey)
+def rebuild_journey_seat_map(sender, instance, created, **kwargs):
+    previous_train_id = getattr(instance, "_previous_train_id", None)
+
+    if previous_train_id and previous_train_id != instance.train_id:
+        instance.rebuild_seat_map()
+        instance.holds.all().delete()
+
+
+@receiver(m2m_changed, sender=Journey.crew.through)
+def check_crew_availability(
+    sender,
+    instance,
+    action,
+    reverse,
+    pk_set,
+    **kwargs,
+):
+    if action != "pre_add" or not pk_set:
+        return
+
+    if not reverse:
+        journeys = [instance]
+        crew_ids = pk_set
+    else:
+        journeys = list(Journey.objects.filter(id__in=pk_set))
+        crew_ids = [instance.id]
+
+        overlaps = find_overlaps(
+            Interval(journey.departure_time, journey.arrival_time, journey.id)
+            for journey in journeys
+        )
+        if overlaps:
+            raise ValidationError(
+                {"crew": "added journeys overlap each other"}
+            )
+
+    # m2m changes run in a transaction, held until the rows are added
+    CrewMember.lock(crew_ids)
+    for journey in journeys:
+        Journey.validate_crew_availability(
+            crew_ids,
+            journey.departure_time,
+            journey.arrival_time,
+            ValidationError,
+            journey_id=journey.id,
+        )
+
+
+@receiver(post_save, sender=Station)
+def recompute_station_route_distances(sender, instance, created, **kwargs):
+    if not created:
+        Route.recompute_distances(
+            Route.objects.filter(
+                Q(origin=instance) | Q(destination=instance)
+            )
+        )
+
+
+@receiver(post_save, sender=Journey)
+def update_journey_connection(sender, instance, **kwargs):
+    connection_index.update_journey(instance)
+
+
+@receiver(post_delete, sender=Journey)
+def remove_journey_connection(sender, instance, **kwargs):
+    connection_index.remove_journey(instance.id)
+
+
+@receiver(post_save, sender=Route)
+def update_route_connections(sender, instance, created, **kwargs):
+    if not created:
+        for journey in instance.journeys.select_related("route"):
+            connection_index.update_journey(journey)
+
+
+@receiver(post_save, sender=Journey)
+def update_journey_departure(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(departure_board.update_journey, instance.id)
+    )
+
+
+@receiver(post_delete, sender=Journey)
+def remove_journey_departure(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(departure_board.remove_journey, instance.id)
+    )
+
+
+@receiver(post_save, sender=SeatHold)
+def add_seat_hold_departure(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(departure_board.add_hold, instance))
+
+
+@receiver(post_delete, sender=SeatHold)
+def remove_seat_hold_departure(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(
+            departure_board.remove_hold,
+            instance.journey_id,
+            instance.id,
+        )
+    )
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=TrainType)
+@receiver(post_delete, sender=TrainType)
+@receiver(post_save, sender=Train)
+@receiver(post_delete, sender=Train)
+def reset_departure_board(sender, **kwargs):
+    transaction.on_commit(departure_board.invalidate)
+
+
+@receiver(post_save, sender=Station)
+def update_station_trie(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(station_trie.update_station, instance.id, instance.name)
+    )
+
+
+@receiver(post_delete, sender=Station)
+def remove_station_trie(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(station_trie.remove_station, instance.id)
+    )
+
+
+def count_route_journey_station_trie(route_id, change):
+    transaction.on_commit(
+        partial(
+            station_trie.count_journey,
+            station_trie.route_ends(route_id),
+            change,
+        )
+    )
+
+
+@receiver(post_save, sender=Journey)
+def count_journey_station_trie(sender, instance, created, **kwargs):
+    previous_route_id = getattr(instance, "_previous_route_id", None)
+
+    if created:
+        count_route_journey_station_trie(instance.route_id, 1)
+    elif previous_route_id and previous_route_id != instance.route_id:
+        count_route_journey_station_trie(previous_route_id, -1)
+        count_route_journey_station_trie(instance.route_id, 1)
+
+
+@receiver(post_delete, sender=Journey)
+def uncount_journey_station_trie(sender, instance, **kwargs):
+    count_route_journey_station_trie(instance.route_id, -1)
+
+
+@receiver(post_save, sender=Route)
+def recount_route_station_trie(sender, instance, created, **kwargs):
+    # the journeys of the route may now count for other stations
+    if not created:
+        transaction.on_commit(station_trie.reset)
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+def reset_station_grid(sender, **kwargs):
+    station_grid.reset()
+
+
+@receiver(post_save, sender=CrewMember)
+@receiver(post_delete, sender=CrewMember)
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=TrainType)
+@receiver(post_delete, sender=TrainType)
+@receiver(post_save, sender=Train)
+@receiver(post_delete, sender=Train)
+@receiver(post_save, sender=Journey)
+@receiver(post_delete, sender=Journey)
+@receiver(post_save, sender=Tariff)
+@receiver(post_delete, sender=Tariff)
+@receiver(post_save, sender=PeakPeriod)
+@receiver(post_delete, sender=PeakPeriod)
+def invalidate_catalog_cache(sender, **kwargs):
+    # bumped after commit, a response cached in between would hold old data
+    transaction.on_commit(partial(bump_version, sender))
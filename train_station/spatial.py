@@ -0,0 +1,163 @@
+import heapq
+import time
+from collections import defaultdict
+from math import asin, cos, floor, radians, sin, sqrt
+from threading import Lock
+from typing import NamedTuple
+
+from django.conf import settings
+
+
+EARTH_RADIUS = 6371  # radius of the Earth in km
+KM_PER_DEGREE = 111.195  # length of one degree of latitude in km
+
+
+class Point(NamedTuple):
+    station_id: int
+    latitude: float
+    longitude: float
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Haversine distance between two points in km as a float"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = (
+        sin((lat2 - lat1) / 2) ** 2
+        + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * asin(min(1.0, sqrt(a))) * EARTH_RADIUS
+
+
+class StationGrid:
+    """
+    In-memory grid index of station coordinates. Stations are bucketed
+    into cells of `cell_size` degrees, so a radius or bounding box query
+    only looks at stations of the cells it overlaps.
+    Built lazily from the database, reset by station signals and
+    rebuilt once it gets older than STATION_INDEX_MAX_AGE seconds
+    """
+
+    def __init__(self, cell_size: float = 0.5) -> None:
+        self.cell_size = cell_size
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._cells = None
+            self._built_at = 0.0
+
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        return (
+            floor(latitude / self.cell_size),
+            floor(longitude / self.cell_size),
+        )
+
+    def _get_cells(self) -> dict:
+        from .models import Station
+
+        with self._lock:
+            if (
+                self._cells is None
+                or time.monotonic() - self._built_at
+                > settings.STATION_INDEX_MAX_AGE
+            ):
+                cells = defaultdict(list)
+                rows = Station.objects.values_list(
+                    "id",
+                    "latitude",
+                    "longitude",
+                )
+                for station_id, latitude, longitude in rows.iterator():
+                    point = Point(
+                        station_id,
+                        float(latitude),
+                        float(longitude),
+                    )
+                    cells[self._cell(point.latitude, point.longitude)].append(
+                        point
+                    )
+
+                self._cells = dict(cells)
+                self._built_at = time.monotonic()
+
+            return self._cells
+
+    def _points_in_box(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+    ):
+        # clamped to the globe, so a huge box does not walk empty cells
+        min_latitude = max(min_latitude, -90.0)
+        max_latitude = min(max_latitude, 90.0)
+        min_longitude = max(min_longitude, -180.0)
+        max_longitude = min(max_longitude, 180.0)
+        if min_latitude > max_latitude or min_longitude > max_longitude:
+            return
+
+        cells = self._get_cells()
+        min_row, min_column = self._cell(min_latitude, min_longitude)
+        max_row, max_column = self._cell(max_latitude, max_longitude)
+
+        for row in range(min_row, max_row + 1):
+            for column in range(min_column, max_column + 1):
+                for point in cells.get((row, column), ()):
+                    if (
+                        min_latitude <= point.latitude <= max_latitude
+                        and min_longitude <= point.longitude <= max_longitude
+                    ):
+                        yield point
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float,
+        limit: int,
+    ) -> list[tuple[float, int]]:
+        """
+        (distance, station id) pairs of at most `limit` stations
+        within `radius` km of the point, nearest first
+        """
+        latitude_span = radius / KM_PER_DEGREE
+        min_latitude = max(latitude - latitude_span, -90.0)
+        max_latitude = min(latitude + latitude_span, 90.0)
+
+        widest = max(abs(min_latitude), abs(max_latitude))
+        if widest >= 89.0:
+            min_longitude, max_longitude = -180.0, 180.0
+        else:
+            longitude_span = latitude_span / cos(radians(widest))
+            min_longitude = longitude - longitude_span
+            max_longitude = longitude + longitude_span
+
+        boxes = [(min_longitude, max_longitude)]
+        if min_longitude < -180.0:
+            boxes = [(-180.0, max_longitude), (min_longitude + 360, 180.0)]
+        elif max_longitude > 180.0:
+            boxes = [(min_longitude, 180.0), (-180.0, max_longitude - 360)]
+
+        candidates = []
+        for box_min_longitude, box_max_longitude in boxes:
+            for point in self._points_in_box(
+                min_latitude,
+                box_min_longitude,
+                max_latitude,
+                box_max_longitude,
+            ):
+                distance = distance_km(
+                    latitude,
+                    longitude,
+                    point.latitude,
+                    point.longitude,
+                )
+                if distance <= radius:
+                    candidates.append((distance, point.station_id))
+
+        return heapq.nsmallest(limit, candidates)
+
+
+station_grid = StationGrid()
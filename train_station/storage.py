@@ -0,0 +1,150 @@
+import hashlib
+import os
+import re
+import tempfile
+from contextlib import suppress
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.views.static import serve
+
+HASH_ALGORITHM = "sha256"
+
+# <directory>/<first two hex digits>/<hex digest>.<extension>
+CONTENT_ADDRESSED_NAME = re.compile(
+    r"(^|/)(?P<prefix>[0-9a-f]{2})/(?P=prefix)[0-9a-f]{62}(\.\w+)?$"
+)
+
+# Cache-Control of files that never change under their name
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class HashingUploadedFile(TemporaryUploadedFile):
+    """Temporary uploaded file that knows the hash of its content"""
+
+    content_hash = None
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every upload to a temporary file in chunks, as the regular
+    handler does for large uploads, and hashes the chunks on the way,
+    so the storage neither buffers nor reads the upload again
+    """
+
+    def new_file(self, *args, **kwargs):
+        # the parent would open a TemporaryUploadedFile of its own
+        super(TemporaryFileUploadHandler, self).new_file(*args, **kwargs)
+        self.file = HashingUploadedFile(
+            self.file_name,
+            self.content_type,
+            0,
+            self.charset,
+            self.content_type_extra,
+        )
+        self.hasher = hashlib.new(HASH_ALGORITHM)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.content_hash = self.hasher.hexdigest()
+        return super().file_complete(file_size)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files under the hash of their content, so identical files
+    are kept once and shared by every object referencing them. Only the
+    directory and the extension of the requested name are used. Stored
+    files never change and are removed by the delete_unused_media command
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # an existing name always holds the same content
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        _, extension = os.path.splitext(filename)
+
+        digest = getattr(content, "content_hash", None)
+        temporary_path = None
+        if digest is None or not hasattr(content, "temporary_file_path"):
+            digest, temporary_path = self._write_temporary(directory, content)
+
+        name = os.path.join(
+            directory,
+            digest[:2],
+            f"{digest}{extension.lower()}",
+        )
+        full_path = self.path(name)
+
+        try:
+            # a reused file is as recent as the upload for
+            # delete_unused_media, which is about to reference it
+            os.utime(full_path)
+        except FileNotFoundError:
+            pass
+        else:
+            if temporary_path:
+                os.remove(temporary_path)
+            return name.replace("\\", "/")
+
+        os.makedirs(
+            os.path.dirname(full_path),
+            mode=self.directory_permissions_mode or 0o777,
+            exist_ok=True,
+        )
+        if temporary_path:
+            os.replace(temporary_path, full_path)
+        else:
+            # a concurrent upload of the same content may have won the race
+            file_move_safe(
+                content.temporary_file_path(),
+                full_path,
+                allow_overwrite=True,
+            )
+
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+        return name.replace("\\", "/")
+
+    def _write_temporary(self, directory, content) -> tuple[str, str]:
+        """
+        Streams the content in chunks to a temporary file next to its
+        final location while hashing it, returns the digest and the path
+        """
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        hasher = hashlib.new(HASH_ALGORITHM)
+
+        descriptor, temporary_path = tempfile.mkstemp(
+            suffix=".part",
+            dir=full_directory,
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    hasher.update(chunk)
+                    file.write(chunk)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(temporary_path)
+            raise
+
+        return hasher.hexdigest(), temporary_path
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """Development media view, content-addressed files are cached forever"""
+    response = serve(request, path, document_root, show_indexes)
+    if CONTENT_ADDRESSED_NAME.search(path):
+        response["Cache-Control"] = IMMUTABLE
+    return response
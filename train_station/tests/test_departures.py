@@ -0,0 +1,194 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train_station.cache import bump_version
+from train_station.departures import BOARD_VERSION, departure_board
+from train_station.models import Journey, SeatHold
+from train_station.tests.test_journey_api import (
+    sample_station,
+    sample_route,
+    sample_train_type,
+    sample_train,
+    sample_journey,
+)
+from train_station.tests.test_order_api import (
+    ORDER_URL,
+    sample_order_payload,
+)
+from train_station.timetable import TimetableImporter
+
+
+def departures_url(station_id):
+    return reverse("train_station:station-departures", args=[station_id])
+
+
+class DepartureBoardAPITests(TestCase):
+    def setUp(self):
+        departure_board.reset()
+        self.addCleanup(departure_board.reset)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        self.kyiv = sample_station()
+        self.lviv = sample_station(name="Lviv")
+        self.route = sample_route(self.kyiv, self.lviv)
+        self.train_type = sample_train_type()
+
+    def sample_departure(self, hours, name="ICE 4", train=None):
+        departure_time = timezone.now() + timedelta(hours=hours)
+
+        return sample_journey(
+            self.route,
+            train
+            or sample_train(self.train_type, name=name, cars=2, seats_in_car=5),
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(hours=2),
+        )
+
+    def test_next_departures(self):
+        later = self.sample_departure(3, name="Later")
+        sooner = self.sample_departure(1, name="Sooner")
+        self.sample_departure(-1, name="Departed")
+        self.sample_departure(48, name="Day after")
+        sample_journey(
+            sample_route(self.lviv, self.kyiv),
+            sample_train(self.train_type, name="Back"),
+            departure_time=timezone.now() + timedelta(hours=1),
+            arrival_time=timezone.now() + timedelta(hours=2),
+        )
+
+        res = self.client.get(departures_url(self.kyiv.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [departure["journey"] for departure in res.data],
+            [sooner.id, later.id],
+        )
+        self.assertEqual(res.data[0]["destination"], "Lviv")
+        self.assertEqual(res.data[0]["train"], "Sooner (Intercity)")
+        self.assertEqual(res.data[0]["tickets_available"], 10)
+
+        res = self.client.get(departures_url(self.kyiv.id), {"limit": 1})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_board_is_served_without_queries(self):
+        self.sample_departure(1)
+        self.client.get(departures_url(self.kyiv.id))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(departures_url(self.kyiv.id))
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_board_follows_journey_changes(self):
+        journey = self.sample_departure(2)
+        train = sample_train(self.train_type, name="Earlier")
+        self.client.get(departures_url(self.kyiv.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            earlier = self.sample_departure(1, train=train)
+            journey.departure_time = timezone.now() + timedelta(hours=30)
+            journey.arrival_time = journey.departure_time + timedelta(hours=1)
+            journey.save()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(departures_url(self.kyiv.id))
+        self.assertEqual(
+            [departure["journey"] for departure in res.data],
+            [earlier.id],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            earlier.delete()
+
+        res = self.client.get(departures_url(self.kyiv.id))
+        self.assertEqual(res.data, [])
+
+    def test_tickets_available_are_live(self):
+        journey = self.sample_departure(1)
+        self.client.get(departures_url(self.kyiv.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                ORDER_URL,
+                sample_order_payload(journey, [(1, 1), (1, 2)]),
+                format="json",
+            )
+            hold = SeatHold.objects.create(
+                journey=journey,
+                user=self.user,
+                seat_map=b"\x07",
+                expires_at=timezone.now() + timedelta(minutes=5),
+            )
+
+        res = self.client.get(departures_url(self.kyiv.id))
+        self.assertEqual(res.data[0]["tickets_available"], 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            hold.delete()
+
+        res = self.client.get(departures_url(self.kyiv.id))
+        self.assertEqual(res.data[0]["tickets_available"], 8)
+
+    def test_board_follows_changes_of_other_processes(self):
+        journey = self.sample_departure(1)
+        self.client.get(departures_url(self.kyiv.id))
+
+        # a booking committed by another process
+        Journey.objects.filter(id=journey.id).update(seats_available=3)
+        res = self.client.get(departures_url(self.kyiv.id))
+        self.assertEqual(res.data[0]["tickets_available"], 10)
+
+        bump_version(BOARD_VERSION)
+        res = self.client.get(departures_url(self.kyiv.id))
+        self.assertEqual(res.data[0]["tickets_available"], 3)
+
+    def test_own_changes_keep_board(self):
+        journey = self.sample_departure(1)
+        self.client.get(departures_url(self.kyiv.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            journey.update_seat_map(journey.id, taken=[(1, 1)])
+
+        with self.assertNumQueries(0):
+            res = self.client.get(departures_url(self.kyiv.id))
+        self.assertEqual(res.data[0]["tickets_available"], 9)
+
+    def test_board_follows_timetable_import(self):
+        train = sample_train(self.train_type, name="Imported")
+        self.client.get(departures_url(self.kyiv.id))
+        departure_time = timezone.localtime() + timedelta(hours=1)
+
+        TimetableImporter().run(
+            StringIO(
+                "origin,destination,train,departure_time,arrival_time,crew\n"
+                f"Kyiv,Lviv,{train.id},{departure_time.isoformat()},"
+                f"{(departure_time + timedelta(hours=2)).isoformat()},\n"
+            )
+        )
+
+        res = self.client.get(departures_url(self.kyiv.id))
+        self.assertEqual(len(res.data), 1)
+
+    def test_unknown_station(self):
+        res = self.client.get(departures_url(self.kyiv.id + 100))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_limit(self):
+        res = self.client.get(departures_url(self.kyiv.id), {"limit": "x"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,227 @@
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train_station import fares as fares_module
+from train_station.fares import fare_table
+from train_station.models import Order, PeakPeriod, Tariff, Ticket
+from train_station.serializers import OrderListSerializer
+from train_station.tests.test_journey_api import (
+    JOURNEY_URL,
+    sample_station,
+    sample_route,
+    sample_train_type,
+    sample_train,
+    sample_journey,
+)
+from train_station.tests.test_order_api import ORDER_URL, sample_order_payload
+
+
+def sample_tariff(train_type, **params):
+    defaults = {
+        "train_type": train_type,
+        "min_distance": 0,
+        "base_price": Decimal("50.00"),
+        "price_per_km": Decimal("1.00"),
+    }
+    defaults.update(params)
+
+    return Tariff.objects.create(**defaults)
+
+
+def sample_peak_period(**params):
+    defaults = {
+        "name": "Morning",
+        "start_time": datetime.time(7),
+        "end_time": datetime.time(10),
+        "multiplier": Decimal("1.50"),
+    }
+    defaults.update(params)
+
+    return PeakPeriod.objects.create(**defaults)
+
+
+class FareTests(TestCase):
+    def setUp(self):
+        fare_table.reset()
+        self.addCleanup(fare_table.reset)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        self.train_type = sample_train_type()
+        self.route = sample_route(
+            sample_station(),
+            sample_station(name="Lviv", latitude=49.8397, longitude=24.0297),
+        )
+        self.journey = sample_journey(
+            self.route,
+            sample_train(self.train_type),
+        )
+        # aware departure time as read from the database
+        self.journey.refresh_from_db()
+        sample_tariff(self.train_type)
+        sample_tariff(
+            self.train_type,
+            min_distance=300,
+            base_price=Decimal("100.00"),
+            price_per_km=Decimal("0.50"),
+        )
+
+    def test_price_of_distance_band(self):
+        fares = fare_table.get()
+
+        for distance, price in ((0, "50.00"), (299, "349.00"), (300, "250.00")):
+            with self.subTest(distance=distance):
+                self.assertEqual(
+                    fares.price(
+                        self.train_type.id,
+                        distance,
+                        self.journey.departure_time,
+                    ),
+                    Decimal(price),
+                )
+
+    def test_price_without_tariff(self):
+        other_type = sample_train_type(name="Regional")
+
+        price = fare_table.get().price(
+            other_type.id,
+            100,
+            self.journey.departure_time,
+        )
+
+        self.assertIsNone(price)
+
+    def test_peak_multiplier(self):
+        sample_peak_period()
+        sample_peak_period(
+            name="Night",
+            start_time=datetime.time(22),
+            end_time=datetime.time(2),
+            multiplier=Decimal("1.20"),
+        )
+        sample_peak_period(
+            name="Sunday",
+            weekday=6,
+            start_time=datetime.time(0),
+            end_time=datetime.time(12),
+            multiplier=Decimal("2.00"),
+        )
+        fares = fare_table.get()
+
+        for departure, multiplier in (
+            (datetime.datetime(2024, 10, 10, 8), "1.50"),
+            (datetime.datetime(2024, 10, 10, 12), "1"),
+            (datetime.datetime(2024, 10, 10, 1), "1.20"),
+            (datetime.datetime(2024, 10, 13, 8), "2.00"),
+        ):
+            with self.subTest(departure=departure):
+                self.assertEqual(
+                    fares.multiplier(timezone.make_aware(departure)),
+                    Decimal(multiplier),
+                )
+
+    def test_tariff_change_invalidates_compiled_tariffs(self):
+        fares = fare_table.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tariff.objects.filter(min_distance=0).get().delete()
+
+        self.assertIsNot(fare_table.get(), fares)
+        self.assertIsNone(
+            fare_table.get().price(
+                self.train_type.id,
+                100,
+                self.journey.departure_time,
+            )
+        )
+
+    def test_journey_list_shows_price(self):
+        expected = str(100 + Decimal("0.50") * self.route.distance)
+
+        res = self.client.get(JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["price"], expected)
+
+    def test_order_detail_loads_tariffs_once(self):
+        res = self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1), (1, 2), (1, 3)]),
+            format="json",
+        )
+
+        with mock.patch.object(
+            fares_module,
+            "get_versions",
+            wraps=fares_module.get_versions,
+        ) as get_versions:
+            res = self.client.get(f"{ORDER_URL}{res.data['id']}/")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["tickets"]), 3)
+        self.assertEqual(get_versions.call_count, 1)
+
+    def test_order_stamps_ticket_prices(self):
+        price = fare_table.get().journey_price(self.journey)
+
+        res = self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1), (1, 2)]),
+            format="json",
+        )
+        Tariff.objects.update(base_price=Decimal("999.00"))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["tickets"][0]["price"], str(price))
+        self.assertEqual(
+            list(Ticket.objects.values_list("price", flat=True)),
+            [price, price],
+        )
+
+    def test_order_total_is_computed_by_database(self):
+        self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1), (1, 2)]),
+            format="json",
+        )
+        price = Ticket.objects.first().price
+
+        order = Order.objects.with_totals().get()
+        res = self.client.get(ORDER_URL)
+
+        self.assertEqual(order.total, price * 2)
+        self.assertEqual(res.data["results"][0]["total"], str(price * 2))
+        self.assertEqual(
+            res.data["results"],
+            [
+                OrderListSerializer(
+                    order,
+                    context={"request": res.wsgi_request},
+                ).data
+            ],
+        )
+
+    def test_order_total_is_null_with_unpriced_ticket(self):
+        self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1), (1, 2)]),
+            format="json",
+        )
+        Ticket.objects.filter(seat=1).update(price=None)
+
+        res = self.client.get(ORDER_URL)
+
+        self.assertIsNone(Order.objects.with_totals().get().total)
+        self.assertIsNone(res.data["results"][0]["total"])
@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train_station.db_pool import ConnectionPool, PoolTimeout
+
+
+HEALTH_URL = reverse("health")
+
+
+def sample_pool(**params):
+    defaults = {
+        "close": lambda connection: connection.close(),
+        "check": lambda connection: True,
+        "max_size": 2,
+        "timeout": 0.05,
+    }
+    defaults.update(params)
+
+    return ConnectionPool(**defaults)
+
+
+def connect():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_returned_connection_is_reused(self):
+        pool = sample_pool()
+
+        first = pool.getconn(connect)
+        pool.putconn(first)
+        second = pool.getconn(connect)
+
+        self.assertIs(first, second)
+        self.assertEqual(pool.stats()["connections_opened"], 1)
+        self.assertEqual(pool.stats()["in_use"], 1)
+
+    def test_timeout_when_exhausted(self):
+        pool = sample_pool()
+        pool.getconn(connect)
+        pool.getconn(connect)
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(connect)
+
+        stats = pool.stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["utilization"], 1.0)
+
+    def test_waiting_request_gets_returned_connection(self):
+        pool = sample_pool(max_size=1, timeout=5)
+        first = pool.getconn(connect)
+
+        def release():
+            while not pool.stats()["requests_waiting"]:
+                pass
+            pool.putconn(first)
+
+        thread = threading.Thread(target=release)
+        thread.start()
+        second = pool.getconn(connect)
+        thread.join()
+
+        self.assertIs(first, second)
+        self.assertGreater(pool.max_wait_seconds, 0)
+
+    def test_connection_error_frees_slot(self):
+        pool = sample_pool(max_size=1)
+
+        with self.assertRaises(sqlite3.OperationalError):
+            pool.getconn(mock.Mock(side_effect=sqlite3.OperationalError))
+        pool.getconn(connect)
+
+        stats = pool.stats()
+        self.assertEqual(stats["connection_errors"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_broken_connection_is_replaced(self):
+        pool = sample_pool(check=lambda connection: False, check_after=0)
+        first = pool.getconn(connect)
+        pool.putconn(first)
+
+        second = pool.getconn(connect)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(pool.stats()["connections_lost"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_idle_connections_are_closed(self):
+        close = mock.Mock()
+        pool = sample_pool(close=close, max_idle=0)
+        first = pool.getconn(connect)
+        second = pool.getconn(connect)
+
+        pool.putconn(first)
+        pool.putconn(second)
+
+        close.assert_called_once_with(first)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_rejects_empty_pool(self):
+        with self.assertRaises(ValueError):
+            sample_pool(max_size=0)
+
+
+class HealthAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def authenticate_admin(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                "admin@test.com",
+                "admin12345",
+            )
+        )
+
+    def test_healthy(self):
+        res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"status": "ok"})
+
+    def test_reports_databases_to_admin(self):
+        self.authenticate_admin()
+
+        res = self.client.get(HEALTH_URL)
+
+        self.assertTrue(res.data["databases"]["default"]["available"])
+
+    def test_reports_pool_stats(self):
+        self.authenticate_admin()
+
+        with mock.patch.object(
+            type(connections["default"]),
+            "pool",
+            new_callable=mock.PropertyMock,
+            return_value=sample_pool(),
+            create=True,
+        ):
+            res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(
+            res.data["databases"]["default"]["pool"]["max_size"],
+            2,
+        )
+
+    def test_database_unavailable(self):
+        with mock.patch.object(
+            connection,
+            "cursor",
+            side_effect=OperationalError,
+        ):
+            res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data, {"status": "unavailable"})
+
+
+@mock.patch("train_station.management.commands.wait_for_db.time.sleep")
+class WaitForDBTests(SimpleTestCase):
+    @mock.patch.object(
+        connection,
+        "ensure_connection",
+        side_effect=[OperationalError] * 5 + [None],
+    )
+    def test_retries_with_backoff(self, ensure_connection, sleep):
+        call_command("wait_for_db", stdout=StringIO())
+
+        self.assertEqual(ensure_connection.call_count, 6)
+        pauses = [call.args[0] for call in sleep.call_args_list]
+        for attempt, pause in enumerate(pauses):
+            self.assertLessEqual(pause, 0.1 * 2**attempt)
+
+    @mock.patch.object(
+        connection,
+        "ensure_connection",
+        side_effect=OperationalError,
+    )
+    def test_gives_up_after_timeout(self, ensure_connection, sleep):
+        with self.assertRaises(CommandError):
+            call_command("wait_for_db", timeout=0, stdout=StringIO())
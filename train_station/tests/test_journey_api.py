@@ -1,11 +1,25 @@
+import asyncio
+import base64
 import datetime
+import tempfile
+import warnings
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from django.urls import reverse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import resolve, reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 
+from train_station.export import timetable_version
+from train_station.fares import fare_table
 from train_station.models import (
     Route,
     Journey,
@@ -13,11 +27,16 @@ from train_station.models import (
     Train,
     CrewMember,
     TrainType,
+    Order,
+    Ticket,
 )
+from train_station.planner import connection_index
+from train_station.seat_map import SeatMap
 from train_station.serializers import (
     JourneyListSerializer,
     JourneyRetrieveSerializer,
 )
+from train_station.timetable import TimetableImporter
 
 
 JOURNEY_URL = reverse("train_station:journey-list")
@@ -88,6 +107,16 @@ def detail_url(journey_id):
     return reverse("train_station:journey-detail", args=[journey_id])
 
 
+JOURNEY_PLAN_URL = reverse("train_station:journey-plan")
+
+
+TIMETABLE_EXPORT_URL = reverse("train_station:timetable-export")
+
+
+def seat_map_url(journey_id):
+    return reverse("train_station:journey-seat-map", args=[journey_id])
+
+
 class UnauthenticatedJourneyAPITests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -128,8 +157,8 @@ class AuthenticatedJourneyAPITests(TestCase):
         self.journey_2 = sample_journey(
             train=self.train_2,
             route=self.route_2,
-            departure_time=datetime.datetime(2024, 10, 12),
-            arrival_time=datetime.datetime(2024, 10, 17),
+            departure_time=datetime.datetime(2024, 10, 21),
+            arrival_time=datetime.datetime(2024, 10, 25),
         )
 
         self.journey_1.crew.add(self.crew_1)
@@ -159,6 +188,65 @@ class AuthenticatedJourneyAPITests(TestCase):
 
         self.assertEqual(len(res.data["results"]), 1)
 
+    def test_filter_journeys_by_departure_local_day(self):
+        train = sample_train(
+            name="Tarpan",
+            train_type=self.train_1.train_type,
+        )
+        late = sample_journey(
+            train=self.train_2,
+            route=self.route_1,
+            departure_time=datetime.datetime(2024, 10, 10, 23, 30),
+            arrival_time=datetime.datetime(2024, 10, 11, 6),
+        )
+        sample_journey(
+            train=train,
+            route=self.route_1,
+            departure_time=datetime.datetime(2024, 10, 11, 0, 30),
+            arrival_time=datetime.datetime(2024, 10, 11, 8),
+        )
+
+        res = self.client.get(JOURNEY_URL, {"departure": "2024-10-10"})
+
+        self.assertEqual(
+            [journey["id"] for journey in res.data["results"]],
+            [self.journey_1.id, late.id],
+        )
+
+    def test_filter_journeys_by_departure_range(self):
+        res = self.client.get(
+            JOURNEY_URL,
+            {
+                "departure_after": "2024-10-11",
+                "departure_before": "2024-10-21T00:00:01",
+            },
+        )
+
+        self.assertEqual(
+            [journey["id"] for journey in res.data["results"]],
+            [self.journey_2.id],
+        )
+
+        res = self.client.get(
+            JOURNEY_URL,
+            {"departure_before": "2024-10-21"},
+        )
+
+        self.assertEqual(
+            [journey["id"] for journey in res.data["results"]],
+            [self.journey_1.id],
+        )
+
+    def test_filter_journeys_invalid_dates(self):
+        for params in (
+            {"departure": "10.10.2024"},
+            {"arrival": "2024-13-01"},
+            {"departure_after": "tomorrow"},
+        ):
+            res = self.client.get(JOURNEY_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_filter_journeys_by_train(self):
         res = self.client.get(JOURNEY_URL, {"train": self.train_1.id})
 
@@ -172,6 +260,28 @@ class AuthenticatedJourneyAPITests(TestCase):
 
         self.assertEqual(len(res.data["results"]), 1)
 
+    def test_filter_journeys_by_crew_ignores_duplicate_ids(self):
+        res = self.client.get(
+            JOURNEY_URL,
+            {"crew": f"{self.crew_2.id},{self.crew_2.id}"}
+        )
+
+        self.assertEqual(
+            [journey["id"] for journey in res.data["results"]],
+            [self.journey_2.id],
+        )
+
+    def test_filter_journeys_by_any_crew(self):
+        res = self.client.get(
+            JOURNEY_URL,
+            {"crew_any": f"{self.crew_1.id},{self.crew_2.id}"}
+        )
+
+        self.assertEqual(
+            [journey["id"] for journey in res.data["results"]],
+            [self.journey_1.id, self.journey_2.id],
+        )
+
     def test_retrieve_journey_detail(self):
         url = detail_url(self.journey_1.id)
         res = self.client.get(url)
@@ -181,6 +291,124 @@ class AuthenticatedJourneyAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_seat_map_tracks_tickets(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(journey=self.journey_1, order=order, car=1, seat=1)
+        ticket = Ticket.objects.create(
+            journey=self.journey_1,
+            order=order,
+            car=2,
+            seat=15,
+        )
+
+        res = self.client.get(seat_map_url(self.journey_1.id))
+        seat_map = SeatMap(5, 15, base64.b64decode(res.data["seat_map"]))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["tickets_available"], 73)
+        self.assertEqual(list(seat_map.taken_seats()), [(1, 1), (2, 15)])
+
+        ticket.delete()
+        self.journey_1.refresh_from_db()
+
+        self.assertEqual(
+            list(self.journey_1.get_seat_map().taken_seats()),
+            [(1, 1)],
+        )
+
+    def test_retrieve_journey_taken_seats(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(journey=self.journey_1, order=order, car=3, seat=2)
+        Ticket.objects.create(journey=self.journey_1, order=order, car=1, seat=7)
+
+        res = self.client.get(detail_url(self.journey_1.id))
+
+        self.assertEqual(
+            res.data["taken_seats"],
+            [{"car": 1, "seat": 7}, {"car": 3, "seat": 2}],
+        )
+
+    def test_list_journeys_tickets_available(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(journey=self.journey_1, order=order, car=1, seat=1)
+
+        res = self.client.get(JOURNEY_URL, {"route": self.route_1.id})
+
+        self.assertEqual(res.data["results"][0]["tickets_available"], 74)
+
+    def test_filter_journeys_with_available_seats(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.bulk_create(
+            Ticket(journey=self.journey_1, order=order, car=car, seat=seat)
+            for car in range(1, 6)
+            for seat in range(1, 16)
+        )
+        Journey.objects.filter(id=self.journey_1.id).update(seats_available=0)
+
+        res = self.client.get(JOURNEY_URL, {"available": "true"})
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["id"], self.journey_2.id)
+
+    def test_seats_available_tracks_tickets(self):
+        order = Order.objects.create(user=self.user)
+        ticket = Ticket.objects.create(
+            journey=self.journey_1,
+            order=order,
+            car=1,
+            seat=1,
+        )
+        Ticket.objects.create(journey=self.journey_1, order=order, car=1, seat=2)
+        self.journey_1.refresh_from_db()
+
+        self.assertEqual(self.journey_1.seats_available, 73)
+
+        ticket.delete()
+        self.journey_1.refresh_from_db()
+
+        self.assertEqual(self.journey_1.seats_available, 74)
+
+    def test_list_journeys_cursor_pagination(self):
+        journey_3 = sample_journey(
+            train=self.train_1,
+            route=self.route_2,
+            departure_time=datetime.datetime(2024, 10, 21),
+            arrival_time=datetime.datetime(2024, 10, 22),
+        )
+
+        res = self.client.get(
+            JOURNEY_URL,
+            {"pagination": "cursor", "page_size": 2},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", res.data)
+        self.assertIsNone(res.data["previous"])
+        self.assertEqual(
+            [journey["id"] for journey in res.data["results"]],
+            [self.journey_1.id, self.journey_2.id],
+        )
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [journey["id"] for journey in res.data["results"]],
+            [journey_3.id],
+        )
+        self.assertIsNone(res.data["next"])
+
+        res = self.client.get(res.data["previous"])
+
+        self.assertEqual(
+            [journey["id"] for journey in res.data["results"]],
+            [self.journey_1.id, self.journey_2.id],
+        )
+
+    def test_list_journeys_invalid_cursor(self):
+        res = self.client.get(JOURNEY_URL, {"cursor": "invalid"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_create_journey_forbidden(self):
         payload = {
             "route": self.route_1,
@@ -201,6 +429,426 @@ class AuthenticatedJourneyAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class JourneyPlanAPITests(TestCase):
+    def setUp(self):
+        connection_index.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        self.kyiv = sample_station()
+        self.lviv = sample_station(name="Lviv")
+        self.uzhhorod = sample_station(name="Uzhhorod")
+        train_type = sample_train_type()
+        train = sample_train(train_type)
+
+        self.direct = sample_journey(
+            sample_route(self.kyiv, self.uzhhorod),
+            sample_train(train_type, name="Hyundai"),
+            departure_time=datetime.datetime(2024, 10, 10, 8),
+            arrival_time=datetime.datetime(2024, 10, 10, 23),
+        )
+        self.first_leg = sample_journey(
+            sample_route(self.kyiv, self.lviv),
+            train,
+            departure_time=datetime.datetime(2024, 10, 10, 7),
+            arrival_time=datetime.datetime(2024, 10, 10, 12),
+        )
+        self.second_leg = sample_journey(
+            sample_route(self.lviv, self.uzhhorod),
+            train,
+            departure_time=datetime.datetime(2024, 10, 10, 13),
+            arrival_time=datetime.datetime(2024, 10, 10, 17),
+        )
+
+    def plan(self, **params):
+        defaults = {
+            "from": self.kyiv.id,
+            "to": self.uzhhorod.id,
+            "after": "2024-10-10T00:00:00",
+        }
+        defaults.update(params)
+
+        return self.client.get(JOURNEY_PLAN_URL, defaults)
+
+    def test_plan_prefers_earlier_arrival_with_transfer(self):
+        res = self.plan()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                [leg["id"] for leg in itinerary["legs"]]
+                for itinerary in res.data
+            ],
+            [[self.direct.id], [self.first_leg.id, self.second_leg.id]],
+        )
+        self.assertEqual(res.data[1]["transfers"], 1)
+        self.assertEqual(res.data[1]["legs"][0]["tickets_available"], 75)
+
+    def test_plan_without_transfers(self):
+        res = self.plan(max_transfers=0)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["legs"][0]["id"], self.direct.id)
+
+    def test_plan_respects_departure_time(self):
+        res = self.plan(after="2024-10-10T07:30:00")
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["legs"][0]["id"], self.direct.id)
+
+    def test_plan_sees_journey_changes(self):
+        self.plan()
+        self.direct.delete()
+
+        res = self.plan()
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["transfers"], 1)
+
+    def test_plan_invalid_params(self):
+        res = self.plan(**{"from": "", "max_transfers": 10})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("from", res.data)
+        self.assertIn("max_transfers", res.data)
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class JourneyQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        crew = [sample_crew(), sample_crew(first_name="Bob")]
+        order = Order.objects.create(user=self.user)
+
+        for day in range(1, 13):
+            train = sample_train(
+                sample_train_type(name=f"Type {day}"),
+                name=f"Train {day}",
+            )
+            journey = sample_journey(
+                route,
+                train,
+                departure_time=datetime.datetime(2024, 10, day),
+                arrival_time=datetime.datetime(2024, 10, day, 12),
+            )
+            journey.crew.add(*crew)
+            Ticket.objects.create(journey=journey, order=order, car=1, seat=1)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        for pagination in ("page", "cursor"):
+            with self.subTest(pagination=pagination):
+                with self.assertNumQueries(4 if pagination == "page" else 3):
+                    res = self.client.get(
+                        JOURNEY_URL,
+                        {"pagination": pagination, "page_size": 1},
+                    )
+                self.assertEqual(len(res.data["results"]), 1)
+
+                with self.assertNumQueries(4 if pagination == "page" else 3):
+                    res = self.client.get(
+                        JOURNEY_URL,
+                        {"pagination": pagination, "page_size": 12},
+                    )
+                self.assertEqual(len(res.data["results"]), 12)
+
+    def test_server_timing_header(self):
+        res = self.client.get(JOURNEY_URL)
+
+        self.assertIn('desc="4 queries"', res["Server-Timing"])
+
+
+class JourneyTimetableImportTests(TestCase):
+    def setUp(self):
+        self.kyiv = sample_station()
+        self.lviv = sample_station(name="Lviv")
+        self.route = sample_route(self.kyiv, self.lviv)
+        self.train = sample_train(sample_train_type())
+        self.crew = sample_crew()
+
+    def import_timetable(self, *rows, **options):
+        lines = ["origin,destination,train,departure_time,arrival_time,crew"]
+        lines.extend(",".join(map(str, row)) for row in rows)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write("\n".join(lines))
+            file.flush()
+            stdout, stderr = StringIO(), StringIO()
+            call_command(
+                "import_timetable",
+                file.name,
+                batch_size=2,
+                stdout=stdout,
+                stderr=stderr,
+                **options,
+            )
+
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_timetable(self):
+        stdout, stderr = self.import_timetable(
+            ("Kyiv", "Lviv", self.train.id, "2024-10-10T08:00",
+             "2024-10-10T13:00", self.crew.id),
+            ("Kyiv", "Lviv", self.train.id, "2024-10-10T14:00",
+             "2024-10-10T19:00", self.crew.id),
+            ("Kyiv", "Lviv", self.train.id, "2024-10-10T18:00",
+             "2024-10-10T20:00", ""),
+            ("Kyiv", "Odesa", self.train.id, "2024-10-11T08:00",
+             "2024-10-11T13:00", ""),
+            ("Kyiv", "Lviv", self.train.id, "2024-10-11T08:00",
+             "2024-10-11T07:00", ""),
+        )
+
+        self.assertIn("Imported 2 journeys, skipped 3 invalid rows", stdout)
+        self.assertIn("Line 4: train", stderr)
+        self.assertIn("Line 5: unknown station Odesa", stderr)
+        self.assertIn("Line 6:", stderr)
+
+        journeys = Journey.objects.all()
+        self.assertEqual(len(journeys), 2)
+        self.assertEqual(journeys[0].seats_available, self.train.capacity)
+        self.assertEqual(
+            list(self.crew.journey_set.order_by("departure_time")),
+            list(journeys),
+        )
+
+    def test_import_timetable_checks_stored_journeys(self):
+        sample_journey(
+            self.route,
+            self.train,
+            departure_time=datetime.datetime(2024, 10, 10, 8),
+            arrival_time=datetime.datetime(2024, 10, 10, 13),
+        )
+
+        stdout, stderr = self.import_timetable(
+            ("Kyiv", "Lviv", self.train.id, "2024-10-10T12:00",
+             "2024-10-10T15:00", ""),
+        )
+
+        self.assertIn("Imported 0 journeys", stdout)
+        self.assertEqual(Journey.objects.count(), 1)
+
+    def test_import_timetable_dry_run(self):
+        stdout, stderr = self.import_timetable(
+            ("Kyiv", "Lviv", self.train.id, "2024-10-10T08:00",
+             "2024-10-10T13:00", self.crew.id),
+            ("Kyiv", "Lviv", self.train.id, "2024-10-10T14:00",
+             "2024-10-10T19:00", self.crew.id),
+            ("Kyiv", "Lviv", self.train.id, "2024-10-10T12:00",
+             "2024-10-10T15:00", self.crew.id),
+            dry_run=True,
+        )
+
+        self.assertIn("Validated 2 journeys, skipped 1 invalid rows", stdout)
+        self.assertIn("Line 4:", stderr)
+        self.assertFalse(Journey.objects.exists())
+
+    def test_import_timetable_repeated_crew_member(self):
+        stdout, stderr = self.import_timetable(
+            ("Kyiv", "Lviv", self.train.id, "2024-10-10T08:00",
+             "2024-10-10T13:00", f"{self.crew.id} {self.crew.id}"),
+        )
+
+        self.assertIn("Imported 1 journeys, skipped 0 invalid rows", stdout)
+        self.assertEqual(
+            list(Journey.objects.get().crew.all()),
+            [self.crew],
+        )
+
+    def test_import_timetable_reports_errors_as_found(self):
+        errors = []
+        importer = TimetableImporter(batch_size=1, on_error=errors.append)
+
+        result = importer.run(
+            StringIO(
+                "origin,destination,train,departure_time,arrival_time,crew\n"
+                "Kyiv,Odesa,1,2024-10-10T08:00,2024-10-10T13:00,\n"
+                "Kyiv,Lviv,0,2024-10-10T08:00,2024-10-10T13:00,\n"
+            )
+        )
+
+        self.assertEqual(result, (0, 2))
+        self.assertEqual([error.line for error in errors], [2, 3])
+
+
+class TimetableExportAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        export_root = tempfile.TemporaryDirectory()
+        self.addCleanup(export_root.cleanup)
+        settings_override = override_settings(
+            TIMETABLE_EXPORT_ROOT=export_root.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        self.train = sample_train(sample_train_type())
+        self.journey = sample_journey(route, self.train)
+
+    def test_export_timetable(self):
+        res = self.client.get(TIMETABLE_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+
+        with zipfile.ZipFile(BytesIO(b"".join(res.streaming_content))) as zf:
+            self.assertEqual(
+                zf.namelist(),
+                ["stations.csv", "routes.csv", "trains.csv", "journeys.csv"],
+            )
+            journeys = zf.read("journeys.csv").decode().splitlines()
+
+        self.assertEqual(len(journeys), 2)
+        self.assertTrue(journeys[1].startswith(f"{self.journey.id},"))
+
+    def test_export_timetable_is_reused_until_schedule_changes(self):
+        res = self.client.get(TIMETABLE_EXPORT_URL)
+        content = b"".join(res.streaming_content)
+        etag = res["ETag"]
+
+        res = self.client.get(TIMETABLE_EXPORT_URL)
+
+        self.assertEqual(b"".join(res.streaming_content), content)
+        self.assertEqual(res["ETag"], etag)
+
+        res = self.client.get(TIMETABLE_EXPORT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.journey.arrival_time = datetime.datetime(2024, 10, 21)
+        self.journey.save()
+
+        res = self.client.get(TIMETABLE_EXPORT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertNotEqual(b"".join(res.streaming_content), content)
+
+    async def test_export_timetable_streamed_under_asgi(self):
+        client = AsyncClient()
+        headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+
+        for _ in range(2):
+            with warnings.catch_warnings():
+                # raised when a sync iterator is read whole
+                warnings.simplefilter("error")
+                res = await client.get(TIMETABLE_EXPORT_URL, headers=headers)
+                content = b"".join(
+                    [chunk async for chunk in res.streaming_content]
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertTrue(res.is_async)
+            with zipfile.ZipFile(BytesIO(content)) as zf:
+                self.assertIn("journeys.csv", zf.namelist())
+
+    def test_export_timetable_version_derived_from_data(self):
+        version = timetable_version()
+        cache.clear()
+
+        self.assertEqual(timetable_version(), version)
+
+        self.journey.delete()
+
+        self.assertNotEqual(timetable_version(), version)
+
+
+class AsyncJourneyAPITests(TestCase):
+    def setUp(self):
+        fare_table.reset()
+        self.addCleanup(fare_table.reset)
+
+        self.client = AsyncClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        self.journey = sample_journey(route, sample_train(sample_train_type()))
+        self.journey.crew.add(sample_crew())
+
+    def test_read_views_are_async(self):
+        for url in (
+            JOURNEY_URL,
+            detail_url(self.journey.id),
+            seat_map_url(self.journey.id),
+        ):
+            with self.subTest(url=url):
+                self.assertTrue(
+                    asyncio.iscoroutinefunction(resolve(url).func)
+                )
+
+    async def test_auth_required(self):
+        res = await self.client.get(JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_list_journeys(self):
+        res = await self.client.get(
+            JOURNEY_URL,
+            {"page_size": 5},
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["count"], 1)
+        self.assertEqual(res.json()["results"][0]["crew"], ["Alice Smith"])
+        # the user lookup of the token authentication and the tariffs
+        # compiled by the first request are counted too
+        self.assertIn('desc="7 queries"', res["Server-Timing"])
+
+        res = await self.client.get(
+            JOURNEY_URL,
+            {"pagination": "cursor"},
+            headers=self.headers,
+        )
+
+        self.assertEqual(len(res.json()["results"]), 1)
+
+    async def test_retrieve_journey(self):
+        res = await self.client.get(
+            detail_url(self.journey.id),
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["id"], self.journey.id)
+
+        res = await self.client.get(
+            seat_map_url(self.journey.id),
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.json()["tickets_available"], 75)
+
+        res = await self.client.get(detail_url(0), headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class AdminJourneyAPITests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -235,3 +883,118 @@ class AdminJourneyAPITests(TestCase):
         self.assertEqual(route, journey.route)
         self.assertEqual(train, journey.train)
         self.assertIn(crew, journey.crew.all())
+
+    def test_create_journey_with_busy_train_or_crew(self):
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        train = sample_train(sample_train_type())
+        crew = sample_crew()
+        journey = sample_journey(
+            route,
+            train,
+            departure_time=datetime.datetime(2024, 10, 12),
+            arrival_time=datetime.datetime(2024, 10, 15),
+        )
+        journey.crew.add(crew)
+
+        payload = {
+            "route": route.id,
+            "train": train.id,
+            "departure_time": datetime.datetime(2024, 10, 14),
+            "arrival_time": datetime.datetime(2024, 10, 16),
+            "crew": sample_crew(first_name="Bob").id,
+        }
+
+        res = self.client.post(JOURNEY_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("train", res.data)
+
+        payload["train"] = sample_train(train.train_type, name="Tarpan").id
+        payload["crew"] = crew.id
+
+        res = self.client.post(JOURNEY_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("crew", res.data)
+
+        payload["departure_time"] = datetime.datetime(2024, 10, 15)
+
+        res = self.client.post(JOURNEY_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_assign_busy_crew_member(self):
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        train_type = sample_train_type()
+        crew = sample_crew()
+        journey_1 = sample_journey(route, sample_train(train_type))
+        journey_2 = sample_journey(
+            route,
+            sample_train(train_type, name="Tarpan"),
+        )
+        journey_1.crew.add(crew)
+
+        with self.assertRaises(DjangoValidationError), transaction.atomic():
+            journey_2.crew.add(crew)
+
+        self.assertFalse(journey_2.crew.exists())
+
+    def test_partial_update_journey(self):
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        train = sample_train(sample_train_type())
+        journey = sample_journey(
+            route,
+            train,
+            departure_time=datetime.datetime(2024, 10, 12),
+            arrival_time=datetime.datetime(2024, 10, 15),
+        )
+        sample_journey(
+            route,
+            train,
+            departure_time=datetime.datetime(2024, 10, 16),
+            arrival_time=datetime.datetime(2024, 10, 18),
+        )
+
+        res = self.client.patch(
+            detail_url(journey.id),
+            {"arrival_time": datetime.datetime(2024, 10, 14)},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.patch(
+            detail_url(journey.id),
+            {"arrival_time": datetime.datetime(2024, 10, 17)},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("train", res.data)
+
+        res = self.client.patch(
+            detail_url(journey.id),
+            {"departure_time": datetime.datetime(2024, 10, 15)},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("arrival_time", res.data)
+
+    def test_journey_assignment_checked_under_locks(self):
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        train = sample_train(sample_train_type())
+        crew = sample_crew()
+
+        with mock.patch.object(
+            CrewMember,
+            "lock",
+            wraps=CrewMember.lock,
+        ) as lock_crew, mock.patch.object(
+            Journey,
+            "lock_assignment",
+            autospec=True,
+            side_effect=Journey.lock_assignment,
+        ) as lock_assignment:
+            journey = sample_journey(route, train)
+            journey.crew.add(crew)
+
+        lock_assignment.assert_called_once_with(journey)
+        lock_crew.assert_called_once_with({crew.id})
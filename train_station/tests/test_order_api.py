@@ -0,0 +1,254 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train_station.fares import fare_table
+from train_station.models import Order, SeatHold, Ticket
+from train_station.serializers import OrderListSerializer
+from train_station.tests.test_journey_api import (
+    sample_crew,
+    sample_station,
+    sample_route,
+    sample_train_type,
+    sample_train,
+    sample_journey,
+)
+
+
+ORDER_URL = reverse("train_station:order-list")
+
+
+def sample_order_payload(journey, seats):
+    return {
+        "tickets": [
+            {"journey": journey.id, "car": car, "seat": seat}
+            for car, seat in seats
+        ]
+    }
+
+
+class UnauthenticatedOrderAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.get(ORDER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedOrderAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        train_type = sample_train_type()
+        train = sample_train(train_type, cars=10, seats_in_car=20)
+        route = sample_route(
+            sample_station(),
+            sample_station(name="Lviv"),
+        )
+
+        self.journey = sample_journey(route, train)
+        self.other_journey = sample_journey(
+            route,
+            train,
+            departure_time=datetime.datetime(2024, 10, 21),
+            arrival_time=datetime.datetime(2024, 10, 22),
+        )
+
+    def test_create_order(self):
+        payload = sample_order_payload(self.journey, [(1, 1), (1, 2)])
+        payload["tickets"].append(
+            {"journey": self.other_journey.id, "car": 1, "seat": 1}
+        )
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["tickets"]), 3)
+        self.assertEqual(Ticket.objects.count(), 3)
+
+        self.journey.refresh_from_db()
+        self.assertEqual(
+            list(self.journey.get_seat_map().taken_seats()),
+            [(1, 1), (1, 2)],
+        )
+
+    def test_create_order_query_count_does_not_grow(self):
+        small = sample_order_payload(self.journey, [(1, 1), (1, 2)])
+        large = sample_order_payload(
+            self.journey,
+            [(car, seat) for car in range(2, 5) for seat in range(1, 21)],
+        )
+
+        with self.assertNumQueries(9):
+            self.client.post(ORDER_URL, small, format="json")
+        with self.assertNumQueries(9):
+            self.client.post(ORDER_URL, large, format="json")
+
+        self.assertEqual(Ticket.objects.count(), 62)
+
+    def test_create_order_seat_taken(self):
+        self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1)]),
+            format="json",
+        )
+
+        res = self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 2), (1, 1)]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_create_order_duplicate_seats(self):
+        res = self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1), (1, 1)]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_create_order_seat_out_of_range(self):
+        res = self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(11, 1)]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_order_unknown_journey(self):
+        res = self.client.post(
+            ORDER_URL,
+            {"tickets": [{"journey": 0, "car": 1, "seat": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_orders_only_own(self):
+        other_user = get_user_model().objects.create_user(
+            "other@test.com",
+            "user12345",
+        )
+        Order.objects.create(user=other_user)
+        self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1)]),
+            format="json",
+        )
+
+        res = self.client.get(ORDER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_list_orders_matches_nested_serializer(self):
+        self.journey.crew.add(
+            sample_crew(),
+            sample_crew(first_name="Bob"),
+        )
+        SeatHold.place(
+            self.journey.id,
+            self.user,
+            [(3, 3)],
+            datetime.timedelta(minutes=5),
+            ValueError,
+        )
+        for journey, seats in (
+            (self.journey, [(2, 1), (1, 2)]),
+            (self.other_journey, [(1, 1)]),
+            (self.journey, [(1, 1)]),
+        ):
+            self.client.post(
+                ORDER_URL,
+                sample_order_payload(journey, seats),
+                format="json",
+            )
+
+        res = self.client.get(ORDER_URL)
+
+        request = res.wsgi_request
+        expected = [
+            OrderListSerializer(order, context={"request": request}).data
+            for order in Order.objects.with_totals().filter(user=self.user)
+        ]
+        self.assertEqual(res.data["results"], expected)
+        self.assertEqual(
+            res.data["results"][2]["tickets"][0]["journey"]["crew"],
+            ["Alice Smith", "Bob Smith"],
+        )
+
+    def test_list_orders_cursor_pagination(self):
+        for seat in range(1, 4):
+            self.client.post(
+                ORDER_URL,
+                sample_order_payload(self.journey, [(1, seat)]),
+                format="json",
+            )
+        orders = list(Order.objects.values_list("id", flat=True))
+
+        res = self.client.get(ORDER_URL, {"pagination": "cursor", "page_size": 2})
+        ids = [order["id"] for order in res.data["results"]]
+
+        res = self.client.get(res.data["next"])
+        ids += [order["id"] for order in res.data["results"]]
+
+        self.assertEqual(ids, orders)
+        self.assertIsNone(res.data["next"])
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class OrderQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+
+        for day in range(1, 13):
+            train = sample_train(
+                sample_train_type(name=f"Type {day}"),
+                name=f"Train {day}",
+            )
+            journey = sample_journey(
+                route,
+                train,
+                departure_time=datetime.datetime(2024, 10, day),
+                arrival_time=datetime.datetime(2024, 10, day, 12),
+            )
+            self.client.post(
+                ORDER_URL,
+                sample_order_payload(journey, [(1, 1), (1, 2), (2, 1)]),
+                format="json",
+            )
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        with self.assertNumQueries(6):
+            res = self.client.get(ORDER_URL, {"page_size": 1})
+        self.assertEqual(len(res.data["results"]), 1)
+
+        with self.assertNumQueries(6):
+            res = self.client.get(ORDER_URL, {"page_size": 12})
+        self.assertEqual(len(res.data["results"]), 12)
+        self.assertEqual(len(res.data["results"][0]["tickets"]), 3)
@@ -0,0 +1,178 @@
+import datetime
+import decimal
+import json
+import os
+import timeit
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train_station.renderers import (
+    ORJSONRenderer,
+    MessagePackRenderer,
+    encode_default,
+    msgpack,
+)
+from train_station.tests.test_journey_api import (
+    JOURNEY_URL,
+    sample_crew,
+    sample_station,
+    sample_route,
+    sample_train_type,
+    sample_train,
+    sample_journey,
+)
+from train_station.tests.test_order_api import (
+    ORDER_URL,
+    sample_order_payload,
+)
+
+
+class RendererTestMixin:
+    journeys = 12
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        crew = [sample_crew(), sample_crew(first_name="Bob")]
+
+        for day in range(self.journeys):
+            train = sample_train(
+                sample_train_type(name=f"Type {day}"),
+                name=f"Train {day}",
+            )
+            journey = sample_journey(
+                route,
+                train,
+                departure_time=datetime.datetime(2024, 10, 1)
+                + datetime.timedelta(days=day),
+                arrival_time=datetime.datetime(2024, 10, 1, 12)
+                + datetime.timedelta(days=day),
+            )
+            journey.crew.add(*crew)
+            self.client.post(
+                ORDER_URL,
+                sample_order_payload(journey, [(1, 1), (1, 2), (2, 1)]),
+                format="json",
+            )
+
+
+class RendererTests(RendererTestMixin, TestCase):
+    def test_orjson_renderer_matches_json_renderer(self):
+        for url in (JOURNEY_URL, ORDER_URL):
+            with self.subTest(url=url):
+                data = self.client.get(url).data
+
+                self.assertEqual(
+                    json.loads(ORJSONRenderer().render(data)),
+                    json.loads(JSONRenderer().render(data)),
+                )
+
+    def test_orjson_renderer_indent(self):
+        data = self.client.get(JOURNEY_URL).data
+
+        content = ORJSONRenderer().render(
+            data,
+            "application/json; indent=2",
+        )
+
+        self.assertIn(b'\n  "count"', content)
+
+    def test_encode_default(self):
+        moment = timezone.make_aware(
+            datetime.datetime(2024, 10, 10, 8),
+            datetime.timezone.utc,
+        )
+
+        self.assertEqual(encode_default(moment), "2024-10-10T08:00:00Z")
+        self.assertEqual(encode_default(decimal.Decimal("50.5")), 50.5)
+        self.assertEqual(
+            encode_default(datetime.timedelta(minutes=1)),
+            "60.0",
+        )
+
+    def test_invalid_json_body(self):
+        res = self.client.post(
+            ORDER_URL,
+            b'{"tickets": [',
+            content_type="application/json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_negotiation(self):
+        res = self.client.get(
+            JOURNEY_URL,
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        self.assertEqual(
+            msgpack.unpackb(res.content),
+            json.loads(JSONRenderer().render(res.data)),
+        )
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_create_order_from_msgpack(self):
+        journey_id = self.client.get(JOURNEY_URL).data["results"][0]["id"]
+
+        res = self.client.post(
+            ORDER_URL,
+            msgpack.packb(
+                {"tickets": [{"journey": journey_id, "car": 3, "seat": 3}]}
+            ),
+            content_type="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+
+@skipUnless(os.environ.get("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run")
+class RendererBenchmarks(RendererTestMixin, TestCase):
+    """Serialization and rendering time of the journey and order lists"""
+
+    journeys = 100
+    repeat = 20
+
+    def benchmark(self, url):
+        renderers = {"json": JSONRenderer(), "orjson": ORJSONRenderer()}
+        if msgpack:
+            renderers["msgpack"] = MessagePackRenderer()
+
+        params = {"page_size": 100}
+        seconds = timeit.timeit(
+            lambda: self.client.get(url, params),
+            number=self.repeat,
+        )
+        print(f"\n{url} request: {seconds / self.repeat * 1000:.2f} ms")
+
+        data = self.client.get(url, params).data
+        for name, renderer in renderers.items():
+            seconds = timeit.timeit(
+                lambda: renderer.render(data),
+                number=self.repeat,
+            )
+            print(
+                f"\n{url} {name}: "
+                f"{seconds / self.repeat * 1000:.2f} ms per render, "
+                f"{len(renderer.render(data))} bytes"
+            )
+
+    def test_journey_list(self):
+        self.benchmark(JOURNEY_URL)
+
+    def test_order_list(self):
+        self.benchmark(ORDER_URL)
@@ -0,0 +1,196 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train_station.fares import fare_table
+from train_station.models import PeakPeriod, Tariff
+from train_station.replicas import PIN_KEY
+from train_station.tests.test_journey_api import (
+    JOURNEY_URL,
+    detail_url,
+    sample_crew,
+    sample_station,
+    sample_route,
+    sample_train_type,
+    sample_train,
+    sample_journey,
+)
+from train_station.tests.test_order_api import (
+    ORDER_URL,
+    sample_order_payload,
+)
+from train_station.tests.test_seat_hold_api import (
+    SEAT_HOLD_URL,
+    detail_url as seat_hold_detail_url,
+)
+
+
+REPLICA = "replica"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The test database is registered a second time under another alias
+    standing in for a replica. The second connection only sees committed
+    data, hence TransactionTestCase
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings[REPLICA] = {
+            **connections["default"].settings_dict,
+            "TEST": {"MIRROR": "default"},
+        }
+        cls.addClassCleanup(cls.remove_replica)
+
+    @classmethod
+    def remove_replica(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        self.journey = sample_journey(route, sample_train(sample_train_type()))
+        self.journey.crew.add(sample_crew())
+
+    @staticmethod
+    def is_tariff_query(query):
+        return any(
+            model._meta.db_table in query["sql"]
+            for model in (Tariff, PeakPeriod)
+        )
+
+    def get(self, url):
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections[REPLICA]) as replica:
+                res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # tariffs are always compiled from the primary
+        primary_reads = [
+            query
+            for query in primary.captured_queries
+            if not self.is_tariff_query(query)
+        ]
+        return res, len(primary_reads), len(replica)
+
+    def test_list_and_retrieve_read_from_replica(self):
+        for url in (JOURNEY_URL, detail_url(self.journey.id), ORDER_URL):
+            with self.subTest(url=url):
+                _, primary, replica = self.get(url)
+
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+
+    def test_tariffs_compiled_from_primary(self):
+        fare_table.reset()
+        self.addCleanup(fare_table.reset)
+
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections[REPLICA]) as replica:
+                res = self.client.get(JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            len(list(filter(self.is_tariff_query, primary.captured_queries))),
+            2,
+        )
+        self.assertFalse(
+            any(map(self.is_tariff_query, replica.captured_queries))
+        )
+
+    def test_other_actions_read_from_primary(self):
+        _, primary, replica = self.get(
+            f"{detail_url(self.journey.id)}seat-map/"
+        )
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_reads_stick_to_primary_after_write(self):
+        res = self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1)]),
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res, primary, replica = self.get(ORDER_URL)
+
+        self.assertEqual(res.data["count"], 1)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        cache.delete(PIN_KEY.format(self.user.id))
+        _, primary, replica = self.get(ORDER_URL)
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_seat_holds_stick_to_primary(self):
+        res = self.client.post(
+            SEAT_HOLD_URL,
+            {"journey": self.journey.id, "seats": [{"car": 1, "seat": 1}]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        _, primary, replica = self.get(JOURNEY_URL)
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        cache.delete(PIN_KEY.format(self.user.id))
+        res = self.client.delete(seat_hold_detail_url(res.data["token"]))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertTrue(cache.get(PIN_KEY.format(self.user.id)))
+
+    def test_failed_write_does_not_pin(self):
+        res = self.client.post(ORDER_URL, {"tickets": []}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        _, primary, replica = self.get(ORDER_URL)
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_writes_go_to_primary(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin@test.com",
+            "admin12345",
+        )
+        self.client.force_authenticate(admin)
+        payload = {
+            "route": self.journey.route_id,
+            "train": sample_train(
+                self.journey.train.train_type,
+                name="Other",
+            ).id,
+            "departure_time": datetime.datetime(2024, 11, 1, 8),
+            "arrival_time": datetime.datetime(2024, 11, 1, 20),
+            "crew": [self.journey.crew.get().id],
+        }
+
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            res = self.client.post(JOURNEY_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica), 0)
@@ -1,4 +1,7 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -7,6 +10,8 @@ from rest_framework import status
 from train_station.models import (
     Route,
     Station,
+    haversine,
+    haversine_many,
 )
 from train_station.serializers import (
     RouteListSerializer,
@@ -104,6 +109,100 @@ class AuthenticatedRouteAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_route_distance_is_stored(self):
+        kharkiv = sample_station(
+            name="Kharkiv",
+            latitude=49.9935,
+            longitude=36.2304,
+        )
+        route = sample_route(self.station_1, kharkiv)
+
+        self.assertEqual(
+            route.distance,
+            haversine(
+                self.station_1.latitude,
+                self.station_1.longitude,
+                kharkiv.latitude,
+                kharkiv.longitude,
+            ),
+        )
+        self.assertGreater(route.distance, 0)
+
+        kharkiv.latitude = 48.4647
+        kharkiv.longitude = 35.0462
+        kharkiv.save()
+        route.refresh_from_db()
+
+        self.assertEqual(route.distance, 395)
+
+    def test_filter_and_order_routes_by_distance(self):
+        kharkiv = sample_station(
+            name="Kharkiv",
+            latitude=49.9935,
+            longitude=36.2304,
+        )
+        odesa = sample_station(
+            name="Odesa",
+            latitude=46.4825,
+            longitude=30.7233,
+        )
+        route_3 = sample_route(self.station_1, kharkiv)
+        route_4 = sample_route(self.station_1, odesa)
+
+        res = self.client.get(
+            ROUTE_URL,
+            {"min_distance": 1, "ordering": "-distance"},
+        )
+
+        self.assertEqual(
+            [route["id"] for route in res.data],
+            [route_4.id, route_3.id],
+        )
+
+        res = self.client.get(ROUTE_URL, {"max_distance": 420})
+
+        self.assertEqual(
+            [route["id"] for route in res.data],
+            [self.route_1.id, self.route_2.id, route_3.id],
+        )
+
+    def test_recompute_route_distances_command(self):
+        Route.objects.update(distance=12345)
+
+        call_command("recompute_route_distances", stdout=StringIO())
+
+        self.assertEqual(
+            list(Route.objects.values_list("distance", flat=True)),
+            [0, 0],
+        )
+
+    def test_haversine_many_matches_haversine(self):
+        points = [
+            (50.4404, 30.4867, 49.8403, 23.9930),
+            (46.4825, 30.7233, 49.9935, 36.2304),
+        ]
+
+        self.assertEqual(
+            haversine_many(*zip(*points)),
+            [haversine(*point) for point in points],
+        )
+
+    def test_route_list_cache_invalidated_by_station_change(self):
+        self.client.get(ROUTE_URL)
+        Station.objects.filter(id=self.station_2.id).update(name="Lemberg")
+
+        res = self.client.get(ROUTE_URL)
+
+        self.assertEqual(res.data[0]["destination"], "Lviv")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.station_2.name = "Lviv-Holovnyi"
+            self.station_2.save()
+
+        res = self.client.get(ROUTE_URL)
+
+        self.assertEqual(res.data[0]["destination"], "Lviv-Holovnyi")
+
     def test_create_route_forbidden(self):
         station = sample_station(name="Kharkiv")
         payload = {
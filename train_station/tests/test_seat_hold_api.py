@@ -0,0 +1,179 @@
+import base64
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train_station.models import SeatHold, Ticket
+from train_station.seat_map import SeatMap
+from train_station.tests.test_journey_api import (
+    JOURNEY_URL,
+    detail_url as journey_detail_url,
+    seat_map_url,
+    sample_station,
+    sample_route,
+    sample_train_type,
+    sample_train,
+    sample_journey,
+)
+from train_station.tests.test_order_api import (
+    ORDER_URL,
+    sample_order_payload,
+)
+
+
+SEAT_HOLD_URL = reverse("train_station:seathold-list")
+
+
+def detail_url(token):
+    return reverse("train_station:seathold-detail", args=[token])
+
+
+class SeatHoldAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.other_user = get_user_model().objects.create_user(
+            "other@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        route = sample_route(sample_station(), sample_station(name="Lviv"))
+        train = sample_train(sample_train_type())
+        self.journey = sample_journey(route, train)
+
+    def hold_seats(self, seats, **params):
+        payload = {
+            "journey": self.journey.id,
+            "seats": [{"car": car, "seat": seat} for car, seat in seats],
+        }
+        payload.update(params)
+
+        return self.client.post(SEAT_HOLD_URL, payload, format="json")
+
+    def test_hold_seats(self):
+        res = self.hold_seats([(1, 1), (2, 3)], minutes=5)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn("token", res.data)
+        self.assertEqual(
+            res.data["seats"],
+            [{"car": 1, "seat": 1}, {"car": 2, "seat": 3}],
+        )
+
+    def test_hold_held_seat_fails(self):
+        self.hold_seats([(1, 1)])
+        self.client.force_authenticate(self.other_user)
+
+        res = self.hold_seats([(1, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_held_seats_counted_as_taken(self):
+        self.hold_seats([(1, 1), (1, 2)])
+
+        res = self.client.get(JOURNEY_URL)
+
+        self.assertEqual(res.data["results"][0]["tickets_available"], 73)
+
+    def test_held_seats_taken_in_journey_detail(self):
+        self.hold_seats([(1, 1)])
+
+        res = self.client.get(journey_detail_url(self.journey.id))
+
+        self.assertEqual(res.data["taken_seats"], [{"car": 1, "seat": 1}])
+
+    def test_held_seats_taken_in_seat_map(self):
+        self.hold_seats([(1, 1)])
+
+        res = self.client.get(seat_map_url(self.journey.id))
+
+        seat_map = SeatMap(
+            res.data["cars"],
+            res.data["seats_in_car"],
+            base64.b64decode(res.data["seat_map"]),
+        )
+        self.assertEqual(list(seat_map.taken_seats()), [(1, 1)])
+        self.assertEqual(res.data["tickets_available"], 74)
+
+    def test_held_seats_query_count_does_not_grow(self):
+        self.hold_seats([(1, 1)])
+        with self.assertNumQueries(2):
+            self.client.get(seat_map_url(self.journey.id))
+
+        self.hold_seats([(1, 2)])
+        self.client.force_authenticate(self.other_user)
+        self.hold_seats([(1, 3)])
+        with self.assertNumQueries(2):
+            self.client.get(seat_map_url(self.journey.id))
+
+    def test_order_held_seat_by_other_user_fails(self):
+        self.hold_seats([(1, 1)])
+        self.client.force_authenticate(self.other_user)
+
+        res = self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1)]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_redeem_hold(self):
+        token = self.hold_seats([(1, 1), (1, 2)]).data["token"]
+        payload = sample_order_payload(self.journey, [(1, 1), (1, 2)])
+        payload["hold"] = token
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_redeem_hold_of_other_user_fails(self):
+        token = self.hold_seats([(1, 1)]).data["token"]
+        self.client.force_authenticate(self.other_user)
+        payload = sample_order_payload(self.journey, [(1, 1)])
+        payload["hold"] = token
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_hold_releases_seats(self):
+        token = self.hold_seats([(1, 1)]).data["token"]
+        SeatHold.objects.filter(token=token).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.client.force_authenticate(self.other_user)
+
+        res = self.client.post(
+            ORDER_URL,
+            sample_order_payload(self.journey, [(1, 1)]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        call_command("release_expired_holds", stdout=StringIO())
+
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_release_hold(self):
+        token = self.hold_seats([(1, 1)]).data["token"]
+
+        res = self.client.delete(detail_url(token))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(SeatHold.objects.exists())
@@ -1,16 +1,31 @@
 import tempfile
 import os
 
+from io import StringIO
+from unittest import mock
+
 from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.test import AsyncClient, TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 
+from train_station.autocomplete import station_trie, variants
+from train_station.cache import get_versions
 from train_station.models import (
+    Journey,
+    Route,
     Station,
+    Train,
+    TrainType,
 )
+from train_station.spatial import station_grid
+from train_station.timetable import TimetableImporter
 
 STATION_URL = reverse("train_station:station-list")
 
@@ -35,6 +50,10 @@ def detail_url(station_id):
     return reverse("train_station:station-detail", args=[station_id])
 
 
+STATION_NEARBY_URL = reverse("train_station:station-nearby")
+STATION_AUTOCOMPLETE_URL = reverse("train_station:station-autocomplete")
+
+
 class StationImageUploadTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -47,6 +66,21 @@ class StationImageUploadTests(TestCase):
     def tearDown(self):
         self.station.refresh_from_db()
         self.station.image.delete()
+        for files in self.station.image_variants.values():
+            default_storage.delete(files["webp"])
+            default_storage.delete(files["jpeg"])
+
+    def upload_image(self, size=(10, 10), mode="RGB", image_format="JPEG"):
+        suffix = f".{image_format.lower()}"
+        with tempfile.NamedTemporaryFile(suffix=suffix) as ntf:
+            img = Image.new(mode, size)
+            img.save(ntf, format=image_format)
+            ntf.seek(0)
+            return self.client.post(
+                image_upload_url(self.station.id),
+                {"image": ntf},
+                format="multipart",
+            )
 
     def test_upload_image_to_station(self):
         """Test uploading an image to station"""
@@ -111,3 +145,388 @@ class StationImageUploadTests(TestCase):
         res = self.client.get(STATION_URL)
 
         self.assertIn("image", res.data[0].keys())
+
+    @override_settings(IMAGE_VARIANT_WORKERS=0)
+    def test_upload_image_generates_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload_image(size=(2400, 1200))
+        self.station.refresh_from_db()
+
+        self.assertEqual(
+            {
+                variant: (files["width"], files["height"])
+                for variant, files in self.station.image_variants.items()
+            },
+            {"full": (1920, 960), "card": (640, 320), "thumbnail": (160, 80)},
+        )
+        for files in self.station.image_variants.values():
+            with default_storage.open(files["webp"]) as file:
+                self.assertEqual(Image.open(file).format, "WEBP")
+            with default_storage.open(files["jpeg"]) as file:
+                self.assertEqual(Image.open(file).format, "JPEG")
+
+        res = self.client.get(detail_url(self.station.id))
+
+        self.assertTrue(
+            res.data["images"]["thumbnail"]["webp"].startswith(
+                "http://testserver/media/"
+            )
+        )
+
+    @override_settings(IMAGE_VARIANT_WORKERS=0)
+    def test_variants_of_transparent_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload_image(mode="RGBA", image_format="PNG")
+        self.station.refresh_from_db()
+
+        files = self.station.image_variants["thumbnail"]
+        with default_storage.open(files["webp"]) as file:
+            self.assertEqual(Image.open(file).mode, "RGBA")
+        with default_storage.open(files["jpeg"]) as file:
+            self.assertEqual(Image.open(file).mode, "RGB")
+
+    @override_settings(IMAGE_VARIANT_WORKERS=0)
+    @mock.patch(
+        "train_station.images.generate_variants",
+        side_effect=OSError("disk full"),
+    )
+    def test_upload_image_survives_failed_variants(self, generate_variants):
+        with self.assertLogs("train_station.images", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.upload_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        generate_variants.assert_called_once()
+
+    def test_generate_missing_variants_command(self):
+        self.upload_image()
+
+        call_command("generate_image_variants", stdout=StringIO())
+        self.station.refresh_from_db()
+
+        self.assertEqual(
+            set(self.station.image_variants),
+            {"full", "card", "thumbnail"},
+        )
+
+    @override_settings(IMAGE_VARIANT_WORKERS=2)
+    @mock.patch("train_station.images._get_executor")
+    def test_upload_image_returns_before_variants(self, get_executor):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.upload_image()
+        self.station.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["images"], {})
+        get_executor.return_value.submit.assert_called_once_with(
+            mock.ANY,
+            Station,
+            self.station.id,
+            self.station.image.name,
+        )
+
+
+class StationSpatialAPITests(TestCase):
+    def setUp(self):
+        station_grid.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        self.kyiv = sample_station()
+        self.darnytsia = sample_station(
+            name="Kyiv-Darnytsia",
+            latitude=50.4570,
+            longitude=30.6136,
+        )
+        self.lviv = sample_station(
+            name="Lviv",
+            latitude=49.8403,
+            longitude=23.9930,
+        )
+
+    def test_nearby_stations_ordered_by_distance(self):
+        res = self.client.get(
+            STATION_NEARBY_URL,
+            {"lat": 50.45, "lon": 30.62, "radius": 100},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [station["id"] for station in res.data],
+            [self.darnytsia.id, self.kyiv.id],
+        )
+        self.assertLess(res.data[0]["distance"], res.data[1]["distance"])
+
+    def test_nearby_stations_limit(self):
+        res = self.client.get(
+            STATION_NEARBY_URL,
+            {"lat": 50.45, "lon": 30.62, "radius": 1000, "limit": 1},
+        )
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_nearby_sees_station_changes(self):
+        self.client.get(STATION_NEARBY_URL, {"lat": 49.84, "lon": 23.99})
+        self.lviv.latitude = 48.6208
+        self.lviv.longitude = 22.2879
+        self.lviv.save()
+
+        res = self.client.get(STATION_NEARBY_URL, {"lat": 49.84, "lon": 23.99})
+
+        self.assertEqual(res.data, [])
+
+    def test_nearby_requires_coordinates(self):
+        res = self.client.get(STATION_NEARBY_URL, {"lat": 50.45})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("lon", res.data)
+
+    def test_nearby_rejects_non_finite_numbers(self):
+        for name, value in (
+            ("limit", "inf"),
+            ("limit", "nan"),
+            ("radius", "nan"),
+            ("lat", "-inf"),
+        ):
+            with self.subTest(name=name, value=value):
+                res = self.client.get(
+                    STATION_NEARBY_URL,
+                    {"lat": 49.84, "lon": 23.99, name: value},
+                )
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(name, res.data)
+
+    def test_filter_stations_by_bbox(self):
+        res = self.client.get(STATION_URL, {"bbox": "22.1,47.7,26.6,51.6"})
+
+        self.assertEqual(
+            [station["id"] for station in res.data],
+            [self.lviv.id],
+        )
+
+    def test_filter_stations_by_inverted_bbox(self):
+        res = self.client.get(STATION_URL, {"bbox": "26.6,51.6,22.1,47.7"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_filter_stations_by_invalid_bbox(self):
+        for bbox in ("22.1,47.7", "nan,0,1,1", "0,0,inf,1"):
+            with self.subTest(bbox=bbox):
+                res = self.client.get(STATION_URL, {"bbox": bbox})
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_stations_by_huge_bbox(self):
+        res = self.client.get(
+            STATION_URL,
+            {"bbox": "-1e300,-1e300,1e300,1e300"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 3)
+
+    def test_station_list_cache_keyed_on_query(self):
+        res = self.client.get(STATION_URL)
+        self.assertEqual(len(res.data), 3)
+
+        res = self.client.get(STATION_URL, {"bbox": "22.1,47.7,26.6,51.6"})
+        self.assertEqual(len(res.data), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kyiv.delete()
+        res = self.client.get(STATION_URL)
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_station_cache_version_bumped_on_commit(self):
+        versions = get_versions((Station,))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.kyiv.name = "Kyiv-Pasazhyrskyi"
+            self.kyiv.save()
+
+            self.assertEqual(get_versions((Station,)), versions)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_versions((Station,)), versions)
+
+    async def test_station_list_async(self):
+        client = AsyncClient()
+        headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+
+        for _ in range(2):
+            res = await client.get(
+                STATION_URL,
+                {"bbox": "30,50,31,51"},
+                headers=headers,
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                [station["name"] for station in res.json()],
+                ["Kyiv", "Kyiv-Darnytsia"],
+            )
+
+
+class StationAutocompleteAPITests(TestCase):
+    def setUp(self):
+        station_trie.reset()
+        self.addCleanup(station_trie.reset)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com",
+            "user12345",
+        )
+        self.client.force_authenticate(self.user)
+
+        self.kyiv = sample_station(name="Київ")
+        self.darnytsia = sample_station(name="Kyiv-Darnytsia")
+        self.kyivska = sample_station(name="Kyïvska")
+        self.lviv = sample_station(name="Lviv")
+
+        train = Train.objects.create(
+            name="ICE 4",
+            cars=5,
+            seats_in_car=15,
+            train_type=TrainType.objects.create(name="Intercity"),
+        )
+        self.route = Route.objects.create(
+            origin=self.darnytsia,
+            destination=self.lviv,
+        )
+        self.journey = Journey.objects.create(
+            route=self.route,
+            train=train,
+            departure_time="2024-10-10T10:00:00Z",
+            arrival_time="2024-10-10T16:00:00Z",
+        )
+
+    def autocomplete(self, query, **params):
+        res = self.client.get(STATION_AUTOCOMPLETE_URL, {"q": query, **params})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [station["id"] for station in res.data]
+
+    def test_variants(self):
+        self.assertEqual(variants("Київ"), {"киів", "kyiv", "kiyiv"})
+        self.assertIn("zaporizhzhia", variants("Запоріжжя"))
+        self.assertEqual(variants("Jászberény"), {"jaszbereny"})
+
+    def test_autocomplete_ranked_by_journeys(self):
+        self.assertEqual(
+            self.autocomplete("KYI"),
+            [self.darnytsia.id, self.kyivska.id, self.kyiv.id],
+        )
+        self.assertEqual(self.autocomplete("kyi", limit=1), [self.darnytsia.id])
+
+    def test_autocomplete_folds_script_and_accents(self):
+        self.assertEqual(
+            self.autocomplete("киї"),
+            [self.darnytsia.id, self.kyivska.id, self.kyiv.id],
+        )
+        self.assertEqual(self.autocomplete("львів"), [self.lviv.id])
+        self.assertEqual(self.autocomplete("darn"), [self.darnytsia.id])
+
+    def test_autocomplete_is_served_without_queries(self):
+        self.autocomplete("l")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.autocomplete("l"), [self.lviv.id])
+
+    def test_autocomplete_follows_changes(self):
+        self.autocomplete("l")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kyiv.name = "Lysychansk"
+            self.kyiv.save()
+            self.darnytsia.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.autocomplete("l"),
+                [self.lviv.id, self.kyiv.id],
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Journey.objects.create(
+                route=Route.objects.create(
+                    origin=self.kyiv,
+                    destination=self.kyivska,
+                ),
+                train=Train.objects.get(),
+                departure_time="2024-10-11T10:00:00Z",
+                arrival_time="2024-10-11T16:00:00Z",
+            )
+        self.assertEqual(self.autocomplete("l"), [self.kyiv.id, self.lviv.id])
+
+    def test_autocomplete_ignores_rolled_back_changes(self):
+        self.autocomplete("l")
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                sample_station(name="Lutsk")
+                transaction.set_rollback(True)
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.autocomplete("l"), [self.lviv.id])
+
+    def test_autocomplete_follows_journey_route_change(self):
+        self.assertEqual(self.autocomplete("kyi")[0], self.darnytsia.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.journey.route = Route.objects.create(
+                origin=self.kyivska,
+                destination=self.lviv,
+            )
+            self.journey.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.autocomplete("kyi"),
+                [self.kyivska.id, self.darnytsia.id, self.kyiv.id],
+            )
+
+    def test_autocomplete_follows_route_change(self):
+        self.autocomplete("l")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.route.origin = self.kyiv
+            self.route.save()
+
+        self.assertEqual(
+            self.autocomplete("kyi"),
+            [self.kyiv.id, self.darnytsia.id, self.kyivska.id],
+        )
+
+    def test_autocomplete_follows_timetable_import(self):
+        Route.objects.create(origin=self.kyivska, destination=self.lviv)
+        self.autocomplete("l")
+
+        TimetableImporter().run(
+            StringIO(
+                "origin,destination,train,departure_time,arrival_time,crew\n"
+                f"Kyïvska,Lviv,{self.journey.train_id},"
+                "2024-10-12T10:00:00Z,2024-10-12T16:00:00Z,\n"
+                f"Kyïvska,Lviv,{self.journey.train_id},"
+                "2024-10-13T10:00:00Z,2024-10-13T16:00:00Z,\n"
+            )
+        )
+
+        self.assertEqual(
+            self.autocomplete("kyi"),
+            [self.kyivska.id, self.darnytsia.id, self.kyiv.id],
+        )
+
+    def test_autocomplete_requires_query(self):
+        res = self.client.get(STATION_AUTOCOMPLETE_URL, {"q": " "})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import tempfile
+import time
+from io import BytesIO, StringIO
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train_station.storage import serve_media
+from train_station.tests.test_station_api import (
+    image_upload_url,
+    sample_station,
+)
+
+
+def sample_image(color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", (10, 10), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def stored_files(root):
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _, names in os.walk(root)
+        for name in names
+    )
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings.enable()
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            "admin@example.com", "admin12345"
+        )
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+
+    def upload_image(self, station, content):
+        return self.client.post(
+            image_upload_url(station.id),
+            {"image": ContentFile(content, name="photo.PNG")},
+            format="multipart",
+        )
+
+    def test_file_is_stored_under_content_hash(self):
+        content = sample_image()
+        digest = hashlib.sha256(content).hexdigest()
+
+        name = default_storage.save("uploads/a.PNG", ContentFile(content))
+
+        self.assertEqual(name, f"uploads/{digest[:2]}/{digest}.png")
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), content)
+
+    def test_identical_uploads_are_stored_once(self):
+        first = sample_station()
+        second = sample_station(name="Lviv")
+
+        for station in (first, second):
+            res = self.upload_image(station, sample_image())
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.upload_image(second, sample_image(color="blue"))
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(len(stored_files(self.media.name)), 2)
+
+    def test_delete_unused_media(self):
+        station = sample_station()
+        self.upload_image(station, sample_image())
+        self.upload_image(station, sample_image(color="blue"))
+        station.refresh_from_db()
+
+        call_command("delete_unused_media", min_age=0, stdout=StringIO())
+
+        self.assertEqual(stored_files(self.media.name), [station.image.name])
+
+    def test_delete_unused_media_keeps_recent_files(self):
+        default_storage.save("uploads/a.png", ContentFile(sample_image()))
+
+        call_command("delete_unused_media", stdout=StringIO())
+
+        self.assertEqual(len(stored_files(self.media.name)), 1)
+
+    def test_reused_file_is_kept_as_recent(self):
+        name = default_storage.save(
+            "uploads/a.png",
+            ContentFile(sample_image()),
+        )
+        hour_ago = time.time() - 3600
+        os.utime(default_storage.path(name), (hour_ago, hour_ago))
+
+        default_storage.save("uploads/b.png", ContentFile(sample_image()))
+        call_command("delete_unused_media", min_age=60, stdout=StringIO())
+
+        self.assertEqual(stored_files(self.media.name), [name])
+
+    def test_content_addressed_files_are_cached_forever(self):
+        name = default_storage.save(
+            "uploads/a.png",
+            ContentFile(sample_image()),
+        )
+        request = RequestFactory().get(f"/media/{name}")
+
+        response = serve_media(request, name, document_root=self.media.name)
+
+        self.assertIn("immutable", response["Cache-Control"])
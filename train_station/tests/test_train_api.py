@@ -4,7 +4,8 @@ import os
 
 from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -97,6 +98,10 @@ def detail_url(train_id):
     return reverse("train_station:train-detail", args=[train_id])
 
 
+def conflicts_url(train_id):
+    return reverse("train_station:train-conflicts", args=[train_id])
+
+
 class TrainImageUploadTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -111,6 +116,9 @@ class TrainImageUploadTests(TestCase):
     def tearDown(self):
         self.train.refresh_from_db()
         self.train.image.delete()
+        for files in self.train.image_variants.values():
+            default_storage.delete(files["webp"])
+            default_storage.delete(files["jpeg"])
 
     def test_upload_image_to_train(self):
         """Test uploading an image to train"""
@@ -188,6 +196,23 @@ class TrainImageUploadTests(TestCase):
 
         self.assertIn("train_image", res.data["results"][0].keys())
 
+    @override_settings(IMAGE_VARIANT_WORKERS=0)
+    def test_image_variants_are_shown_on_train_and_journey_list(self):
+        url = image_upload_url(self.train.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            img = Image.new("RGB", (800, 600))
+            img.save(ntf, format="JPEG")
+            ntf.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, {"image": ntf}, format="multipart")
+
+        train = self.client.get(TRAIN_URL).data["results"][0]
+        journey = self.client.get(JOURNEY_URL).data["results"][0]
+
+        self.assertEqual(train["images"]["card"]["width"], 640)
+        self.assertEqual(train["images"], journey["train_images"])
+        self.assertTrue(train["images"]["full"]["jpeg"].endswith(".jpg"))
+
 
 class UnauthenticatedTrainAPITests(TestCase):
     def setUp(self):
@@ -244,6 +269,29 @@ class AuthenticatedTrainAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_train_conflicts(self):
+        route = sample_route()
+        journeys = Journey.objects.bulk_create(
+            Journey(
+                route=route,
+                train=self.train_1,
+                departure_time=datetime.datetime(2024, 10, 10, start),
+                arrival_time=datetime.datetime(2024, 10, 10, end),
+            )
+            for start, end in ((8, 12), (11, 14), (14, 16))
+        )
+
+        res = self.client.get(conflicts_url(self.train_1.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["journey"], journeys[0].id)
+        self.assertEqual(res.data[0]["conflicting_journey"], journeys[1].id)
+
+        res = self.client.get(conflicts_url(self.train_2.id))
+
+        self.assertEqual(res.data, [])
+
     def test_create_train_forbidden(self):
         payload = {
             "name": "S-102",
@@ -0,0 +1,304 @@
+import csv
+from collections import defaultdict
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterator, NamedTuple, TextIO
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .autocomplete import station_trie
+from .cache import bump_version
+from .departures import departure_board
+from .intervals import Interval, IntervalIndex
+from .models import CrewMember, Journey, Route, Station, Train
+from .planner import connection_index
+
+
+TIMETABLE_FIELDS = (
+    "origin",
+    "destination",
+    "train",
+    "departure_time",
+    "arrival_time",
+    "crew",
+)
+
+
+class TimetableRow(NamedTuple):
+    line: int
+    route_id: int
+    train_id: int
+    departure_time: datetime
+    arrival_time: datetime
+    crew_ids: tuple[int, ...]
+
+
+class TimetableError(NamedTuple):
+    line: int
+    message: str
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    skipped: int
+
+
+class TimetableImporter:
+    """
+    Loads journeys from a CSV timetable with TIMETABLE_FIELDS columns:
+    origin and destination station names, train id, ISO departure and
+    arrival times and space separated crew member ids.
+    Rows are read lazily and handled in batches: references are resolved
+    through in-memory maps of the catalog, each batch is checked for
+    train and crew overlaps with one query per resource kind and
+    inserted with bulk_create, so memory use does not grow with the file.
+    Invalid rows are passed to `on_error` as they are found and only
+    counted
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 5000,
+        dry_run: bool = False,
+        progress: Callable[[int, int], None] | None = None,
+        on_error: Callable[[TimetableError], None] | None = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.progress = progress
+        self.on_error = on_error
+        self.skipped = 0
+
+        self.stations = dict(Station.objects.values_list("name", "id"))
+        self.routes = {
+            (origin_id, destination_id): route_id
+            for route_id, origin_id, destination_id in (
+                Route.objects.values_list("id", "origin_id", "destination_id")
+            )
+        }
+        self.train_capacities = {
+            train_id: cars * seats_in_car
+            for train_id, cars, seats_in_car in Train.objects.values_list(
+                "id",
+                "cars",
+                "seats_in_car",
+            )
+        }
+        self.crew_ids = set(CrewMember.objects.values_list("id", flat=True))
+
+    def run(self, file: TextIO) -> ImportResult:
+        imported = 0
+        self.skipped = 0
+
+        # a dry run imports everything in one transaction and rolls it back,
+        # so later batches are validated against the earlier ones
+        with transaction.atomic() if self.dry_run else nullcontext():
+            for batch in self._batches(csv.DictReader(file)):
+                with transaction.atomic():
+                    imported += self._import_batch(batch)
+
+                if self.progress:
+                    self.progress(imported, self.skipped)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+        if imported and not self.dry_run:
+            # bulk inserts send no signals
+            connection_index.reset()
+            departure_board.invalidate()
+            station_trie.reset()
+            bump_version(Journey)
+
+        return ImportResult(imported, self.skipped)
+
+    def _reject(self, line: int, message: str) -> None:
+        self.skipped += 1
+        if self.on_error:
+            self.on_error(TimetableError(line, message))
+
+    def _batches(
+        self,
+        reader: csv.DictReader,
+    ) -> Iterator[list[TimetableRow]]:
+        rows = self._parse_rows(reader)
+        while batch := list(islice(rows, self.batch_size)):
+            yield batch
+
+    def _parse_rows(self, reader: csv.DictReader) -> Iterator[TimetableRow]:
+        for record in reader:
+            try:
+                yield self._parse_row(reader.line_num, record)
+            except (KeyError, TypeError, ValueError) as error:
+                self._reject(reader.line_num, str(error))
+
+    def _parse_row(self, line: int, record: dict) -> TimetableRow:
+        origin = self._lookup(self.stations, record["origin"], "station")
+        destination = self._lookup(
+            self.stations,
+            record["destination"],
+            "station",
+        )
+        route_id = self._lookup(
+            self.routes,
+            (origin, destination),
+            "route",
+        )
+        train_id = int(record["train"])
+        if train_id not in self.train_capacities:
+            raise ValueError(f"unknown train {train_id}")
+
+        departure_time = self._parse_time(record["departure_time"])
+        arrival_time = self._parse_time(record["arrival_time"])
+        Journey.validate_time(departure_time, arrival_time, ValueError)
+
+        # repeated ids would break the unique crew assignments
+        crew_ids = tuple(
+            dict.fromkeys(
+                int(crew_id) for crew_id in (record["crew"] or "").split()
+            )
+        )
+        unknown = set(crew_ids) - self.crew_ids
+        if unknown:
+            raise ValueError(f"unknown crew members {sorted(unknown)}")
+
+        return TimetableRow(
+            line,
+            route_id,
+            train_id,
+            departure_time,
+            arrival_time,
+            crew_ids,
+        )
+
+    @staticmethod
+    def _lookup(mapping: dict, key, kind: str) -> int:
+        try:
+            return mapping[key]
+        except KeyError:
+            raise ValueError(f"unknown {kind} {key}")
+
+    @staticmethod
+    def _parse_time(value: str) -> datetime:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f"invalid datetime {value!r}")
+
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+
+        return moment
+
+    def _import_batch(self, batch: list[TimetableRow]) -> int:
+        rows = self._without_overlaps(batch)
+
+        journeys = Journey.objects.bulk_create(
+            Journey(
+                route_id=row.route_id,
+                train_id=row.train_id,
+                departure_time=row.departure_time,
+                arrival_time=row.arrival_time,
+                seats_available=self.train_capacities[row.train_id],
+            )
+            for row in rows
+        )
+        Journey.crew.through.objects.bulk_create(
+            Journey.crew.through(journey_id=journey.id, crewmember_id=crew_id)
+            for journey, row in zip(journeys, rows)
+            for crew_id in row.crew_ids
+        )
+
+        return len(journeys)
+
+    def _without_overlaps(
+        self,
+        batch: list[TimetableRow],
+    ) -> list[TimetableRow]:
+        """
+        Rows of the batch that overlap neither stored journeys
+        of their train and crew nor accepted rows of the batch
+        """
+        start = min(row.departure_time for row in batch)
+        end = max(row.arrival_time for row in batch)
+
+        trains = self._stored_intervals(
+            Journey.objects.filter(
+                train_id__in={row.train_id for row in batch},
+            ).values_list("train_id", "departure_time", "arrival_time", "id"),
+            start,
+            end,
+            "",
+        )
+        crew = self._stored_intervals(
+            Journey.crew.through.objects.filter(
+                crewmember_id__in={
+                    crew_id for row in batch for crew_id in row.crew_ids
+                },
+            ).values_list(
+                "crewmember_id",
+                "journey__departure_time",
+                "journey__arrival_time",
+                "journey_id",
+            ),
+            start,
+            end,
+            "journey__",
+        )
+
+        rows = []
+        for row in batch:
+            busy = [
+                f"crew member {crew_id}"
+                for crew_id in row.crew_ids
+                if crew[crew_id].overlapping(
+                    row.departure_time,
+                    row.arrival_time,
+                )
+            ]
+            if trains[row.train_id].overlapping(
+                row.departure_time,
+                row.arrival_time,
+            ):
+                busy.insert(0, f"train {row.train_id}")
+
+            if busy:
+                self._reject(
+                    row.line,
+                    f"{', '.join(busy)} already assigned "
+                    "to an overlapping journey",
+                )
+                continue
+
+            interval = Interval(row.departure_time, row.arrival_time, 0)
+            trains[row.train_id].add(interval)
+            for crew_id in row.crew_ids:
+                crew[crew_id].add(interval)
+            rows.append(row)
+
+        return rows
+
+    @staticmethod
+    def _stored_intervals(
+        queryset,
+        start: datetime,
+        end: datetime,
+        prefix: str,
+    ) -> defaultdict[int, IntervalIndex]:
+        """Per-resource indexes of stored journeys overlapping [start, end)"""
+        indexes = defaultdict(IntervalIndex)
+        for resource_id, departure_time, arrival_time, journey_id in (
+            queryset.filter(
+                **{
+                    f"{prefix}departure_time__lt": end,
+                    f"{prefix}arrival_time__gt": start,
+                }
+            ).iterator()
+        ):
+            indexes[resource_id].add(
+                Interval(departure_time, arrival_time, journey_id)
+            )
+
+        return indexes
@@ -9,6 +9,8 @@ from .views import (
     TrainViewSet,
     JourneyViewSet,
     OrderViewSet,
+    SeatHoldViewSet,
+    TimetableExportView,
 )
 
 
@@ -20,9 +22,43 @@ router.register("train_types", TrainTypeViewSet)
 router.register("trains", TrainViewSet)
 router.register("journeys", JourneyViewSet)
 router.register("orders", OrderViewSet)
+router.register("seat_holds", SeatHoldViewSet)
 
-urlpatterns = [
+# async views serving the busiest reads,
+# other methods on these paths are handled by the sync viewsets
+async_urlpatterns = [
+    path(
+        "stations/",
+        StationViewSet.as_async_view({"get": "list", "post": "create"}),
+    ),
+    path(
+        "journeys/",
+        JourneyViewSet.as_async_view({"get": "list", "post": "create"}),
+    ),
+    path(
+        "journeys/<int:pk>/",
+        JourneyViewSet.as_async_view(
+            {
+                "get": "retrieve",
+                "put": "update",
+                "patch": "partial_update",
+                "delete": "destroy",
+            }
+        ),
+    ),
+    path(
+        "journeys/<int:pk>/seat-map/",
+        JourneyViewSet.as_async_view({"get": "seat_map"}),
+    ),
+]
+
+urlpatterns = async_urlpatterns + [
     path("", include(router.urls)),
+    path(
+        "export/timetable.zip",
+        TimetableExportView.as_view(),
+        name="timetable-export",
+    ),
 ]
 
 app_name = "train_station"
@@ -1,11 +1,24 @@
-from datetime import datetime
-
-from django.db.models import F, Count
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from math import isfinite
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError, connections
+from django.db.models import Prefetch
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated,
+)
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.views import APIView
 from drf_spectacular.utils import (
     extend_schema,
     OpenApiParameter,
@@ -13,7 +26,30 @@ from drf_spectacular.utils import (
 )
 from drf_spectacular.types import OpenApiTypes
 
+from .async_views import AsyncReadMixin, iterate_in_thread
+from .autocomplete import station_trie
+from .cache import CatalogCacheMixin
+from .departures import departure_board
+from .export import (
+    export_path,
+    stream_and_store,
+    stream_timetable,
+    timetable_version,
+)
+from .fares import fare_table
+from .images import schedule_variants
+from .instrumentation import QueryBudgetMixin
+from .intervals import Interval, find_overlaps
+from .pagination import (
+    StandardResultSetPagination,
+    KeysetPaginationMixin,
+    JourneyKeysetPagination,
+    OrderKeysetPagination,
+)
 from .permissions import IsAdminOrAuthenticatedReadOnly
+from .planner import plan_journeys
+from .replicas import ReplicaReadMixin
+from .spatial import station_grid
 from .models import (
     CrewMember,
     Station,
@@ -22,17 +58,23 @@ from .models import (
     Train,
     Journey,
     Order,
+    SeatHold,
+    Ticket,
 )
 from .serializers import (
     CrewMemberSerializer,
     CrewMemberListSerializer,
     OrderListSerializer,
+    StationAutocompleteSerializer,
+    StationDepartureSerializer,
     StationImageSerializer,
     StationSerializer,
+    StationNearbySerializer,
     RouteSerializer,
     RouteListSerializer,
     RouteRetrieveSerializer,
     TrainImageSerializer,
+    TrainConflictSerializer,
     TrainTypeSerializer,
     TrainSerializer,
     TrainListSerializer,
@@ -40,20 +82,35 @@ from .serializers import (
     JourneySerializer,
     JourneyListSerializer,
     JourneyRetrieveSerializer,
+    JourneySeatMapSerializer,
+    JourneyItinerarySerializer,
     OrderSerializer,
+    SeatHoldSerializer,
 )
 
 
-class StandardResultSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
+MAX_PLAN_TRANSFERS = 5
 
+NEARBY_DEFAULT_RADIUS = 50
+NEARBY_MAX_RADIUS = 1000
+NEARBY_DEFAULT_LIMIT = 10
+NEARBY_MAX_LIMIT = 100
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+DEPARTURES_DEFAULT_LIMIT = 10
+DEPARTURES_MAX_LIMIT = 50
 
-class CrewMemberViewSet(viewsets.ModelViewSet):
+
+class CrewMemberViewSet(
+    CatalogCacheMixin,
+    QueryBudgetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = CrewMember.objects.all()
     serializer_class = CrewMemberSerializer
     permission_classes = (IsAdminOrAuthenticatedReadOnly,)
+    query_budgets = {"list": 2, "retrieve": 2}
+    cache_models = (CrewMember,)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -62,17 +119,270 @@ class CrewMemberViewSet(viewsets.ModelViewSet):
         return CrewMemberSerializer
 
 
-class StationViewSet(viewsets.ModelViewSet):
+class StationViewSet(
+    CatalogCacheMixin,
+    QueryBudgetMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
     permission_classes = (IsAdminOrAuthenticatedReadOnly,)
+    # departures and autocomplete query only to rebuild their indexes
+    # a bounding box or point query may build the station grid first
+    query_budgets = {
+        "list": 3,
+        "retrieve": 2,
+        "nearby": 3,
+        "departures": 4,
+        "autocomplete": 4,
+    }
+    cache_models = (Station,)
+    # rate of the departures action, the only one scoped
+    throttle_scope = "departures"
+
+    @staticmethod
+    def _params_to_floats(query_params, names):
+        """Converts query parameters to floats, raising a validation error"""
+        values = {}
+        errors = {}
+
+        for name in names:
+            try:
+                values[name] = float(query_params[name])
+            except (KeyError, ValueError):
+                errors[name] = "a number is required"
+                continue
+
+            if not isfinite(values[name]):
+                errors[name] = "a finite number is required"
+
+        if errors:
+            raise ValidationError(errors)
+
+        return values
+
+    def get_queryset(self):
+        queryset = self.queryset.all()
+
+        bbox = self.request.query_params.get("bbox")
+
+        if bbox:
+            bounds = bbox.split(",")
+            try:
+                min_lon, min_lat, max_lon, max_lat = map(float, bounds)
+            except ValueError:
+                raise ValidationError(
+                    {"bbox": "expected min_lon,min_lat,max_lon,max_lat"}
+                )
+            if not all(map(isfinite, (min_lon, min_lat, max_lon, max_lat))):
+                raise ValidationError({"bbox": "finite numbers are required"})
+            # clamped to the globe, the coordinate fields hold no more
+            queryset = queryset.filter(
+                latitude__range=(max(min_lat, -90.0), min(max_lat, 90.0)),
+                longitude__range=(
+                    max(min_lon, -180.0),
+                    min(max_lon, 180.0),
+                ),
+            )
+
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "upload_image":
             return StationImageSerializer
 
+        if self.action == "nearby":
+            return StationNearbySerializer
+
+        if self.action == "departures":
+            return StationDepartureSerializer
+
+        if self.action == "autocomplete":
+            return StationAutocompleteSerializer
+
         return StationSerializer
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "bbox",
+                type=str,
+                description=(
+                    "Filter by bounding box: min_lon,min_lat,max_lon,max_lat"
+                ),
+                examples=[
+                    OpenApiExample(
+                        "Example 1",
+                        summary="Return stations in western Ukraine",
+                        value="22.1,47.7,26.6,51.6",
+                    )
+                ],
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "lat",
+                type=float,
+                required=True,
+                description="Latitude of the point",
+            ),
+            OpenApiParameter(
+                "lon",
+                type=float,
+                required=True,
+                description="Longitude of the point",
+            ),
+            OpenApiParameter(
+                "radius",
+                type=float,
+                description=(
+                    f"Search radius in km, defaults to "
+                    f"{NEARBY_DEFAULT_RADIUS}, at most {NEARBY_MAX_RADIUS}"
+                ),
+            ),
+            OpenApiParameter(
+                "limit",
+                type=int,
+                description=(
+                    f"Maximum number of stations, defaults to "
+                    f"{NEARBY_DEFAULT_LIMIT}, at most {NEARBY_MAX_LIMIT}"
+                ),
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="nearby")
+    def nearby(self, request):
+        """Endpoint for listing stations nearest to a point"""
+        params = self._params_to_floats(
+            {
+                "radius": NEARBY_DEFAULT_RADIUS,
+                "limit": NEARBY_DEFAULT_LIMIT,
+                **request.query_params.dict(),
+            },
+            ("lat", "lon", "radius", "limit"),
+        )
+
+        if not (-90 <= params["lat"] <= 90 and -180 <= params["lon"] <= 180):
+            raise ValidationError({"lat": "coordinates are out of range"})
+
+        nearest = station_grid.nearby(
+            params["lat"],
+            params["lon"],
+            min(max(params["radius"], 0), NEARBY_MAX_RADIUS),
+            min(max(int(params["limit"]), 1), NEARBY_MAX_LIMIT),
+        )
+        stations = Station.objects.in_bulk(
+            [station_id for _, station_id in nearest]
+        )
+
+        results = []
+        for distance, station_id in nearest:
+            if station_id in stations:
+                station = stations[station_id]
+                station.distance = round(distance, 3)
+                results.append(station)
+
+        serializer = self.get_serializer(results, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                type=str,
+                required=True,
+                description=(
+                    "Beginning of the station name or of a word of it, "
+                    "case, accents and Cyrillic or Latin script are ignored"
+                ),
+            ),
+            OpenApiParameter(
+                "limit",
+                type=int,
+                description=(
+                    f"Maximum number of stations, defaults to "
+                    f"{AUTOCOMPLETE_DEFAULT_LIMIT}, "
+                    f"at most {AUTOCOMPLETE_MAX_LIMIT}"
+                ),
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="autocomplete")
+    def autocomplete(self, request):
+        """
+        Endpoint for completing station names as they are typed,
+        stations with the most journeys first
+        """
+        query = request.query_params.get("q", "")
+        if not query.strip():
+            raise ValidationError({"q": "this parameter is required"})
+
+        try:
+            limit = int(
+                request.query_params.get("limit", AUTOCOMPLETE_DEFAULT_LIMIT)
+            )
+        except ValueError:
+            raise ValidationError({"limit": "a number is required"})
+
+        stations = [
+            {"id": station_id, "name": name, "journeys": journeys}
+            for station_id, name, journeys in station_trie.search(
+                query,
+                min(max(limit, 1), AUTOCOMPLETE_MAX_LIMIT),
+            )
+        ]
+
+        serializer = self.get_serializer(stations, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "limit",
+                type=int,
+                description=(
+                    f"Maximum number of departures, defaults to "
+                    f"{DEPARTURES_DEFAULT_LIMIT}, "
+                    f"at most {DEPARTURES_MAX_LIMIT}"
+                ),
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="departures",
+        throttle_classes=[ScopedRateThrottle],
+    )
+    def departures(self, request, pk=None):
+        """
+        Endpoint for the next departures from a specific station
+        with the tickets available on each, served from memory
+        """
+        try:
+            limit = int(
+                request.query_params.get("limit", DEPARTURES_DEFAULT_LIMIT)
+            )
+        except ValueError:
+            raise ValidationError({"limit": "a number is required"})
+
+        if not pk.isdigit() or not departure_board.has_station(int(pk)):
+            raise Http404
+
+        departures = departure_board.departures(
+            int(pk),
+            min(max(limit, 1), DEPARTURES_MAX_LIMIT),
+        )
+
+        serializer = self.get_serializer(departures, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @action(
         methods=["POST"],
         detail=True,
@@ -85,20 +395,30 @@ class StationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(station, data=request.data)
 
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(image_variants={})
+        schedule_variants(station)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class RouteViewSet(viewsets.ModelViewSet):
+class RouteViewSet(
+    CatalogCacheMixin,
+    QueryBudgetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
     permission_classes = (IsAdminOrAuthenticatedReadOnly,)
+    query_budgets = {"list": 2, "retrieve": 2}
+    cache_models = (Route, Station)
 
     def get_queryset(self):
         queryset = self.queryset
 
         origin = self.request.query_params.get("origin")
         destination = self.request.query_params.get("destination")
+        min_distance = self.request.query_params.get("min_distance")
+        max_distance = self.request.query_params.get("max_distance")
+        ordering = self.request.query_params.get("ordering")
 
         if origin:
             queryset = queryset.filter(origin__id=int(origin))
@@ -106,6 +426,15 @@ class RouteViewSet(viewsets.ModelViewSet):
         if destination:
             queryset = queryset.filter(destination__id=int(destination))
 
+        if min_distance:
+            queryset = queryset.filter(distance__gte=int(min_distance))
+
+        if max_distance:
+            queryset = queryset.filter(distance__lte=int(max_distance))
+
+        if ordering in ("distance", "-distance"):
+            queryset = queryset.order_by(ordering, "id")
+
         if self.action in ("list", "retrieve"):
             queryset = queryset.select_related("origin", "destination")
 
@@ -132,23 +461,51 @@ class RouteViewSet(viewsets.ModelViewSet):
                 type=int,
                 description="Filter by destination station id",
             ),
+            OpenApiParameter(
+                "min_distance",
+                type=int,
+                description="Filter by minimum distance in km",
+            ),
+            OpenApiParameter(
+                "max_distance",
+                type=int,
+                description="Filter by maximum distance in km",
+            ),
+            OpenApiParameter(
+                "ordering",
+                type=str,
+                enum=["distance", "-distance"],
+                description="Order by distance",
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
-class TrainTypeViewSet(viewsets.ModelViewSet):
+class TrainTypeViewSet(
+    CatalogCacheMixin,
+    QueryBudgetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = TrainType.objects.all()
     serializer_class = TrainTypeSerializer
     permission_classes = (IsAdminOrAuthenticatedReadOnly,)
+    query_budgets = {"list": 2, "retrieve": 2}
+    cache_models = (TrainType,)
 
 
-class TrainViewSet(viewsets.ModelViewSet):
+class TrainViewSet(
+    CatalogCacheMixin,
+    QueryBudgetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Train.objects.all()
     pagination_class = StandardResultSetPagination
     serializer_class = TrainSerializer
     permission_classes = (IsAdminOrAuthenticatedReadOnly,)
+    query_budgets = {"list": 3, "retrieve": 2, "conflicts": 2}
+    cache_models = (Train, TrainType)
 
     def get_queryset(self):
         queryset = self.queryset
@@ -173,6 +530,9 @@ class TrainViewSet(viewsets.ModelViewSet):
         if self.action == "upload_image":
             return TrainImageSerializer
 
+        if self.action == "conflicts":
+            return TrainConflictSerializer
+
         return TrainSerializer
 
     @action(
@@ -187,7 +547,36 @@ class TrainViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(train, data=request.data)
 
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(image_variants={})
+        schedule_variants(train)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        methods=["GET"],
+        detail=True,
+    )
+    def conflicts(self, request, pk=None):
+        """Endpoint for listing overlapping journeys of a specific train"""
+        train = self.get_object()
+        rows = train.journeys.values_list(
+            "departure_time",
+            "arrival_time",
+            "id",
+        )
+        overlaps = find_overlaps(Interval(*row) for row in rows.iterator())
+
+        serializer = self.get_serializer(
+            [
+                {
+                    "journey": first.key,
+                    "conflicting_journey": second.key,
+                    "overlap_start": second.start,
+                    "overlap_end": min(first.end, second.end),
+                }
+                for first, second in overlaps
+            ],
+            many=True,
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -203,67 +592,162 @@ class TrainViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class JourneyViewSet(viewsets.ModelViewSet):
+class JourneyViewSet(
+    KeysetPaginationMixin,
+    QueryBudgetMixin,
+    ReplicaReadMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Journey.objects.all()
     pagination_class = StandardResultSetPagination
+    keyset_pagination_class = JourneyKeysetPagination
     serializer_class = JourneySerializer
     permission_classes = (IsAdminOrAuthenticatedReadOnly,)
+    # list and plan include the two queries compiling the tariffs,
+    # made by the first request after a tariff change
+    query_budgets = {
+        "list": 7,
+        "retrieve": 4,
+        "seat_map": 3,
+        "plan": 8,
+    }
 
     @staticmethod
     def _params_to_ints(qs):
         """Converts a list of string IDs to a list of integers"""
         return [int(str_id) for str_id in qs.split(",")]
 
+    @staticmethod
+    def _param_to_datetime(value, name):
+        """
+        Converts a date or datetime query parameter to an aware UTC datetime,
+        a date means its midnight and naive values are in the current timezone
+        """
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                moment = datetime.combine(
+                    datetime.strptime(value, "%Y-%m-%d").date(),
+                    time.min,
+                )
+        except ValueError:
+            raise ValidationError({name: "invalid date or datetime"})
+
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+
+        return moment.astimezone(dt_timezone.utc)
+
+    @staticmethod
+    def _day_bounds(value, name):
+        """
+        UTC bounds [start, end) of a calendar day in the current timezone,
+        so that date filters compare the raw column and can use an index
+        """
+        try:
+            day = datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValidationError({name: "invalid date"})
+
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        end = timezone.make_aware(
+            datetime.combine(day + timedelta(days=1), time.min)
+        )
+
+        return (
+            start.astimezone(dt_timezone.utc),
+            end.astimezone(dt_timezone.utc),
+        )
+
     def get_queryset(self):
         queryset = self.queryset
 
         route = self.request.query_params.get("route")
         departure = self.request.query_params.get("departure")
         arrival = self.request.query_params.get("arrival")
+        departure_after = self.request.query_params.get("departure_after")
+        departure_before = self.request.query_params.get("departure_before")
         train = self.request.query_params.get("train")
         crew = self.request.query_params.get("crew")
+        crew_any = self.request.query_params.get("crew_any")
+        available = self.request.query_params.get("available")
 
         if route:
             queryset = queryset.filter(route__id=int(route))
 
         if departure:
-            try:
-                departure = datetime.strptime(departure, "%Y-%m-%d").date()
-                queryset = queryset.filter(departure_time__date=departure)
-            except ValueError:
-                return None
+            start, end = self._day_bounds(departure, "departure")
+            queryset = queryset.filter(
+                departure_time__gte=start,
+                departure_time__lt=end,
+            )
 
         if arrival:
-            try:
-                arrival = datetime.strptime(arrival, "%Y-%m-%d").date()
-                queryset = queryset.filter(arrival_time__date=arrival)
-            except ValueError:
-                return None
+            start, end = self._day_bounds(arrival, "arrival")
+            queryset = queryset.filter(
+                arrival_time__gte=start,
+                arrival_time__lt=end,
+            )
+
+        if departure_after:
+            queryset = queryset.filter(
+                departure_time__gte=self._param_to_datetime(
+                    departure_after,
+                    "departure_after",
+                )
+            )
+
+        if departure_before:
+            queryset = queryset.filter(
+                departure_time__lt=self._param_to_datetime(
+                    departure_before,
+                    "departure_before",
+                )
+            )
 
         if train:
             queryset = queryset.filter(train__id=int(train))
 
         if crew:
-            crew_ids = self._params_to_ints(crew)
-            for crew_id in crew_ids:
-                queryset = queryset.filter(crew__id=crew_id)
+            queryset = queryset.with_all_crew(self._params_to_ints(crew))
 
-        if self.action in ("list", "retrieve"):
+        if crew_any:
+            queryset = queryset.with_any_crew(self._params_to_ints(crew_any))
+
+        if available and available.lower() in ("1", "true"):
+            queryset = queryset.filter(seats_available__gt=0)
+
+        if self.action in ("list", "retrieve", "plan"):
             queryset = queryset.select_related(
                 "route__origin",
                 "route__destination",
                 "train__train_type",
             ).prefetch_related("crew")
 
-        if self.action == "list":
-            queryset = queryset.annotate(
-                tickets_available=(
-                    F("train__cars") * F("train__seats_in_car")
-                    - Count("tickets")
+        if self.action in ("list", "plan"):
+            queryset = queryset.defer("seat_map")
+            # loaded here, async views serialize outside a sync thread
+            self.fares = fare_table.get()
+
+        if self.action == "seat_map":
+            queryset = queryset.select_related("train")
+
+        if self.action in ("list", "retrieve", "seat_map", "plan"):
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "holds",
+                    queryset=SeatHold.objects.active(),
+                    to_attr="active_holds",
                 )
-            ).order_by("departure_time")
+            )
 
-        return queryset.distinct()
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fares"] = getattr(self, "fares", None)
+        return context
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -272,8 +756,141 @@ class JourneyViewSet(viewsets.ModelViewSet):
         if self.action == "retrieve":
             return JourneyRetrieveSerializer
 
+        if self.action == "seat_map":
+            return JourneySeatMapSerializer
+
+        if self.action == "plan":
+            return JourneyItinerarySerializer
+
         return JourneySerializer
 
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="seat-map",
+    )
+    def seat_map(self, request, pk=None):
+        """Endpoint for retrieving a packed seat map of a specific journey"""
+        journey = self.get_object()
+        serializer = self.get_serializer(journey)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    async def aseat_map(self, request, pk=None):
+        journey = await self.aget_object()
+        serializer = self.get_serializer(journey)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _parse_plan_params(query_params):
+        """Converts journey planner query parameters to python values"""
+        errors = {}
+        params = {}
+
+        for name in ("from", "to"):
+            try:
+                params[name] = int(query_params[name])
+            except (KeyError, ValueError):
+                errors[name] = "station id is required"
+
+        after = query_params.get("after")
+        if after:
+            try:
+                params["after"] = parse_datetime(after)
+            except ValueError:
+                params["after"] = None
+            if params["after"] is None:
+                errors["after"] = "invalid datetime"
+            elif timezone.is_naive(params["after"]):
+                params["after"] = timezone.make_aware(params["after"])
+        else:
+            params["after"] = timezone.now()
+
+        try:
+            params["max_transfers"] = int(query_params.get("max_transfers", 2))
+        except ValueError:
+            params["max_transfers"] = -1
+        if not (0 <= params["max_transfers"] <= MAX_PLAN_TRANSFERS):
+            errors["max_transfers"] = (
+                f"must be in range (0, {MAX_PLAN_TRANSFERS})"
+            )
+
+        if errors:
+            raise ValidationError(errors)
+
+        return params
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=int,
+                required=True,
+                description="Origin station id",
+            ),
+            OpenApiParameter(
+                "to",
+                type=int,
+                required=True,
+                description="Destination station id",
+            ),
+            OpenApiParameter(
+                "after",
+                type=OpenApiTypes.DATETIME,
+                description="Earliest departure time, defaults to now",
+            ),
+            OpenApiParameter(
+                "max_transfers",
+                type=int,
+                description=(
+                    f"Maximum number of transfers "
+                    f"(0 - {MAX_PLAN_TRANSFERS}), defaults to 2"
+                ),
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="plan")
+    def plan(self, request):
+        """
+        Endpoint for planning a trip with transfers,
+        returns earliest-arrival itineraries from one station to another
+        """
+        params = self._parse_plan_params(request.query_params)
+        itineraries = plan_journeys(
+            params["from"],
+            params["to"],
+            params["after"],
+            params["max_transfers"],
+        )
+
+        journey_ids = {
+            journey_id
+            for itinerary in itineraries
+            for journey_id in itinerary.journey_ids
+        }
+        journeys = self.get_queryset().in_bulk(journey_ids)
+
+        results = []
+        for itinerary in itineraries:
+            legs = [
+                journeys[journey_id]
+                for journey_id in itinerary.journey_ids
+                if journey_id in journeys
+            ]
+            if len(legs) == len(itinerary.journey_ids):
+                results.append(
+                    {
+                        "departure_time": legs[0].departure_time,
+                        "arrival_time": legs[-1].arrival_time,
+                        "transfers": itinerary.transfers,
+                        "legs": legs,
+                    }
+                )
+
+        serializer = self.get_serializer(results, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -311,6 +928,22 @@ class JourneyViewSet(viewsets.ModelViewSet):
                     )
                 ]
             ),
+            OpenApiParameter(
+                "departure_after",
+                type=OpenApiTypes.DATETIME,
+                description=(
+                    "Filter by departure time not earlier than "
+                    "the given date or datetime"
+                ),
+            ),
+            OpenApiParameter(
+                "departure_before",
+                type=OpenApiTypes.DATETIME,
+                description=(
+                    "Filter by departure time earlier than "
+                    "the given date or datetime"
+                ),
+            ),
             OpenApiParameter(
                 "train",
                 type=int,
@@ -319,7 +952,17 @@ class JourneyViewSet(viewsets.ModelViewSet):
             OpenApiParameter(
                 "crew",
                 type={"type": "list", "items": {"type": "number"}},
-                description="Filter by crew member ids",
+                description="Filter by journeys with all of the crew members",
+            ),
+            OpenApiParameter(
+                "crew_any",
+                type={"type": "list", "items": {"type": "number"}},
+                description="Filter by journeys with any of the crew members",
+            ),
+            OpenApiParameter(
+                "available",
+                type=OpenApiTypes.BOOL,
+                description="Only return journeys with seats left",
             ),
         ]
     )
@@ -328,6 +971,9 @@ class JourneyViewSet(viewsets.ModelViewSet):
 
 
 class OrderViewSet(
+    KeysetPaginationMixin,
+    QueryBudgetMixin,
+    ReplicaReadMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -335,18 +981,34 @@ class OrderViewSet(
 ):
     queryset = Order.objects.all()
     pagination_class = StandardResultSetPagination
+    keyset_pagination_class = OrderKeysetPagination
     serializer_class = OrderSerializer
     permission_classes = (IsAuthenticated,)
+    query_budgets = {"list": 6, "retrieve": 5, "create": 12}
 
     def get_queryset(self):
         queryset = self.queryset
 
         if self.action in ("list", "retrieve"):
+            queryset = queryset.with_totals()
+
+        # the list serializer fetches tickets and journeys by itself
+        if self.action == "retrieve":
             queryset = queryset.prefetch_related(
-                "tickets__journey__route__origin",
-                "tickets__journey__route__destination",
-                "tickets__journey__train__train_type",
+                Prefetch(
+                    "tickets",
+                    queryset=Ticket.objects.select_related(
+                        "journey__route__origin",
+                        "journey__route__destination",
+                        "journey__train__train_type",
+                    ).defer("journey__seat_map"),
+                ),
                 "tickets__journey__crew",
+                Prefetch(
+                    "tickets__journey__holds",
+                    queryset=SeatHold.objects.active(),
+                    to_attr="active_holds",
+                ),
             )
 
         return queryset.filter(user=self.request.user)
@@ -359,3 +1021,112 @@ class OrderViewSet(
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+
+class SeatHoldViewSet(
+    ReplicaReadMixin,
+    QueryBudgetMixin,
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    queryset = SeatHold.objects.select_related("journey__train")
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+    query_budgets = {"create": 8, "retrieve": 2, "destroy": 3}
+    # holds only live for minutes, reads stay on the primary
+    # and holding or releasing seats pins the user to it
+    replica_actions = ()
+    lookup_field = "token"
+
+    def get_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class TimetableExportView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(responses={(200, "application/zip"): OpenApiTypes.BINARY})
+    def get(self, request):
+        """
+        Endpoint for downloading all stations, routes, trains and journeys
+        as CSV files in a zip archive. The archive is generated once per
+        schedule change and identified by its ETag
+        """
+        version = timetable_version()
+        etag = f'"{version}"'
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            response = FileResponse(
+                open(export_path(version), "rb"),
+                content_type="application/zip",
+            )
+        except FileNotFoundError:
+            response = StreamingHttpResponse(
+                stream_and_store(version, stream_timetable()),
+                content_type="application/zip",
+            )
+
+        if isinstance(request._request, ASGIRequest):
+            response.streaming_content = iterate_in_thread(
+                response.streaming_content
+            )
+
+        response["Content-Disposition"] = (
+            'attachment; filename="timetable.zip"'
+        )
+        response["ETag"] = etag
+        return response
+
+
+class HealthView(APIView):
+    permission_classes = (AllowAny,)
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = "health"
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT, 503: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        """
+        Endpoint for load balancer health checks, reports whether every
+        database is reachable, admin users also get the state of each
+        database and the connection pool metrics of the process
+        """
+        databases = {}
+        for alias in connections:
+            connection = connections[alias]
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                available = True
+            except DatabaseError:
+                available = False
+
+            pool = getattr(connection, "pool", None)
+            databases[alias] = {
+                "available": available,
+                "pool": pool.stats() if pool else None,
+            }
+
+        healthy = all(database["available"] for database in databases.values())
+        data = {"status": "ok" if healthy else "unavailable"}
+        if IsAdminUser().has_permission(request, self):
+            data["databases"] = databases
+
+        return Response(
+            data,
+            status=(
+                status.HTTP_200_OK
+                if healthy
+                else status.HTTP_503_SERVICE_UNAVAILABLE
+            ),
+        )